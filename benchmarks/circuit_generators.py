@@ -0,0 +1,146 @@
+import numpy as np
+
+# Synthetic netlists for benchmarking. Every generator yields netlist lines
+# (no trailing newline) of a circuit that is connected, grounded and driven
+# by at least one grounded source, so every pipeline stage has work to do.
+# `sized(name, elements)` picks parameters for roughly that many elements,
+# which is what the size sweeps use.
+
+
+def ladder(sections, r_series=100.0, r_shunt=10e3):
+    """ R-2R-style ladder: a series and a shunt resistor per section. """
+    yield "* resistor ladder"
+    yield "V1 n0 0 1"
+    for k in range(sections):
+        yield f"RS{k} n{k} n{k + 1} {r_series:g}"
+        yield f"RP{k} n{k + 1} 0 {r_shunt:g}"
+    yield ".END"
+
+def mesh2d(nx, ny=None, pitch=50, r=0.1, load=1e3):
+    """
+    nx x ny grid of `r` resistors (a power-grid-like mesh) with a grounded
+    1 V source every `pitch` nodes in each direction and a load resistor to
+    ground on every 7th node.
+    """
+    ny = nx if ny is None else ny
+    yield f"* {nx}x{ny} resistor mesh"
+    k = 0
+    for i in range(nx):
+        for j in range(ny):
+            node = f"n{i}_{j}"
+            if j + 1 < ny:
+                yield f"R{k} {node} n{i}_{j + 1} {r:g}"
+                k += 1
+            if i + 1 < nx:
+                yield f"R{k} {node} n{i + 1}_{j} {r:g}"
+                k += 1
+            if (i * ny + j) % 7 == 0:
+                yield f"RL{i}_{j} {node} 0 {load:g}"
+            if i % pitch == 0 and j % pitch == 0:
+                yield f"V{i}_{j} {node} 0 1"
+    yield ".END"
+
+def mesh3d(n, pitch=20, r=0.1, load=1e3):
+    """ n x n x n cubic mesh, sources and loads as in mesh2d. """
+    yield f"* {n}x{n}x{n} resistor mesh"
+    k = 0
+    for i in range(n):
+        for j in range(n):
+            for l in range(n):
+                node = f"n{i}_{j}_{l}"
+                for di, dj, dl in ((1, 0, 0), (0, 1, 0), (0, 0, 1)):
+                    if i + di < n and j + dj < n and l + dl < n:
+                        yield f"R{k} {node} n{i + di}_{j + dj}_{l + dl} {r:g}"
+                        k += 1
+                if ((i * n + j) * n + l) % 7 == 0:
+                    yield f"RL{i}_{j}_{l} {node} 0 {load:g}"
+                if i % pitch == 0 and j % pitch == 0 and l % pitch == 0:
+                    yield f"V{i}_{j}_{l} {node} 0 1"
+    yield ".END"
+
+def random_graph(nodes, degree=3.0, seed=0):
+    """
+    Random sparse network: a random spanning tree (so it is connected)
+    plus extra random edges up to an average `degree`, log-uniform values
+    from 1 ohm to 1 Mohm, a source on node 1 and a load on every 10th node.
+    """
+    rng = np.random.default_rng(seed)
+    # Node k > 1 hangs off a uniformly chosen earlier node; node 1 off ground
+    ids = np.arange(1, nodes + 1)
+    parents = np.where(ids > 1, 1 + (rng.random(nodes) * (ids - 1)).astype(np.int64), 0)
+    extra = max(0, int(nodes * degree / 2) - nodes)
+    a = np.concatenate([np.arange(1, nodes + 1), rng.integers(1, nodes + 1, extra)])
+    b = np.concatenate([parents, rng.integers(1, nodes + 1, extra)])
+    keep = a != b
+    values = 10.0 ** rng.uniform(0, 6, len(a))
+    yield f"* random network, {nodes} nodes"
+    yield "V1 1 0 1"
+    for k in np.flatnonzero(keep).tolist():
+        yield f"R{k} {a[k]} {b[k]} {values[k]:.6g}"
+    for node in range(10, nodes + 1, 10):
+        yield f"RL{node} {node} 0 10k"
+    yield ".END"
+
+def hierarchy(depth, fanout=4, instances=10):
+    """
+    Nested .SUBCKT cells: C0 is a T of three resistors, and each Ck chains
+    `fanout` instances of C(k-1) with a grounded resistor at every joint.
+    The top level chains `instances` copies of C(depth-1), so the
+    flattened circuit has about 4 * instances * fanout^(depth-1)
+    resistors while the netlist stays small.
+    """
+    yield f"* {depth}-level hierarchy, fanout {fanout}"
+    yield ".SUBCKT C0 a b"
+    yield "R1 a m 100"
+    yield "R2 m b 100"
+    yield "R3 m 0 10k"
+    yield ".ENDS"
+    for level in range(1, depth):
+        yield f".SUBCKT C{level} a b"
+        joints = ['a'] + [f"j{k}" for k in range(1, fanout)] + ['b']
+        for k in range(fanout):
+            yield f"X{k} {joints[k]} {joints[k + 1]} C{level - 1}"
+        for k in range(1, fanout):
+            yield f"R{k} j{k} 0 10k"
+        yield ".ENDS"
+    yield "V1 t0 0 1"
+    for k in range(instances):
+        yield f"X{k} t{k} t{k + 1} C{depth - 1}"
+    yield f"RLOAD t{instances} 0 1k"
+    yield ".END"
+
+
+GENERATORS = {
+    'ladder': ladder,
+    'mesh2d': mesh2d,
+    'mesh3d': mesh3d,
+    'random': random_graph,
+    'hierarchy': hierarchy,
+}
+
+def sized(name, elements):
+    """ Lines of generator `name` with parameters giving about `elements` elements. """
+    elements = max(int(elements), 10)
+    if name == 'ladder':
+        return ladder(elements // 2)
+    if name == 'mesh2d':
+        return mesh2d(max(2, int(round((elements / 2.14) ** 0.5))))
+    if name == 'mesh3d':
+        return mesh3d(max(2, int(round((elements / 3.14) ** (1 / 3)))))
+    if name == 'random':
+        return random_graph(max(2, int(elements / 1.6)))
+    if name == 'hierarchy':
+        # Depth grows with size: deep hierarchies are the point of this one
+        # (`elements` counts flattened resistors)
+        depth = max(1, int(np.log(max(elements / 40, 1)) / np.log(4)) + 1)
+        instances = max(1, int(elements / (4 * 4 ** (depth - 1))))
+        return hierarchy(depth, fanout=4, instances=instances)
+    raise ValueError(f"Unknown generator '{name}' (choose from {', '.join(GENERATORS)})")
+
+def write_netlist(path, lines):
+    """ Write generated lines to `path`; returns the number of bytes written. """
+    with open(path, 'w') as f:
+        for line in lines:
+            f.write(line)
+            f.write('\n')
+        return f.tell()
@@ -0,0 +1,222 @@
+# Benchmark harness: generates synthetic netlists over a size sweep, times
+# each pipeline stage, records peak memory and throughput, and compares the
+# results against a stored JSON baseline.
+#
+#     python -m benchmarks.run_benchmarks --sizes 1000 10000 100000
+#     python -m benchmarks.run_benchmarks --save-baseline   # after an intended change
+#
+# Exits with status 1 when a stage got slower (or used more memory) than the
+# baseline by more than the configured threshold.
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import scipy
+from circuit_verification.circuit_parser import CircuitParser
+from circuit_verification.circuit_simulation import DCSolver
+from circuit_verification.circuit_analysis import CircuitAnalysis
+from circuit_verification.circuit_connectivity import Connectivity
+from .circuit_generators import GENERATORS, sized, write_netlist
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines', 'baseline.json')
+DEFAULT_SIZES = (1000, 10000, 100000)
+# Stage timings below this are too noisy to gate on
+MIN_GATED_SECONDS = 0.005
+# A stage is skipped at a larger size when its time at the previous size,
+# scaled by the size ratio squared, exceeds this (direct LU on random
+# graphs and 3D meshes fills in far worse than linearly)
+STAGE_BUDGET_SECONDS = 10.0
+
+
+def _stage_parse(case, options):
+    case['compiled'] = CircuitParser(case['path']).parse_compiled()
+
+def _stage_solve(case, options):
+    DCSolver(case['compiled'], method=options['solver']).run_dc_analysis()
+
+def _stage_connectivity(case, options):
+    # From the element arrays: without roots, Connectivity runs its own
+    # union-find instead of reusing the one the parser cached
+    connectivity = Connectivity(case['compiled'], roots=None)
+    connectivity.is_connected
+    connectivity.floating_node_ids()
+
+def _stage_monte_carlo(case, options):
+    CircuitAnalysis(case['compiled']).run_monte_carlo(runs=options['mc_runs'], seed=0)
+
+# Stage name -> function(case, options); run in this order, parse first
+STAGES = {
+    'parse': _stage_parse,
+    'solve': _stage_solve,
+    'connectivity': _stage_connectivity,
+    'monte_carlo': _stage_monte_carlo,
+}
+
+
+def measure(func, repeat=3, memory=True):
+    """
+    Best wall time of `repeat` calls of func(), and the peak traced
+    allocation in MB of one extra call under tracemalloc (None without
+    `memory`). Timing runs are untraced, since tracing slows Python code.
+    """
+    best = float('inf')
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            func()
+            peak = tracemalloc.get_traced_memory()[1] / 1e6
+        finally:
+            tracemalloc.stop()
+    return best, peak
+
+def run_suite(generators=tuple(GENERATORS), sizes=DEFAULT_SIZES, stages=tuple(STAGES), repeat=3,
+              memory=True, mc_runs=100, mc_max_nodes=2000, solver='auto', workdir=None, progress=None,
+              stage_budget=STAGE_BUDGET_SECONDS):
+    """
+    Run every stage for every (generator, size) and return a dict of
+    results keyed 'generator/size/stage'. Each entry has 'seconds',
+    'peak_mb', the circuit's 'nodes' and 'elements', and throughput in
+    'elements_per_s' (plus 'mb_per_s' for parse). Monte Carlo is skipped
+    above `mc_max_nodes` unknowns, since it solves dense systems, and any
+    stage is skipped once it is predicted to exceed `stage_budget` seconds
+    (see STAGE_BUDGET_SECONDS; None runs everything).
+    """
+    options = {'mc_runs': mc_runs, 'solver': solver}
+    results = {}
+    with tempfile.TemporaryDirectory(dir=workdir) as directory:
+        for name in generators:
+            previous = {}  # stage -> (size, seconds) at the last size run
+            for size in sorted(sizes):
+                path = os.path.join(directory, f"{name}_{size}.net")
+                nbytes = write_netlist(path, sized(name, size))
+                case = {'path': path}
+                _stage_parse(case, options)
+                compiled = case['compiled']
+                elements = compiled.resistor_count + compiled.voltage_source_count + compiled.instance_count
+                for stage in STAGES:
+                    if stage not in stages:
+                        continue
+                    if stage == 'monte_carlo' and compiled.node_count > mc_max_nodes:
+                        continue
+                    if stage_budget is not None and stage in previous:
+                        last_size, last_seconds = previous[stage]
+                        if last_seconds * (size / last_size) ** 2 > stage_budget:
+                            continue
+                    seconds, peak = measure(lambda: STAGES[stage](case, options), repeat, memory)
+                    previous[stage] = (size, seconds)
+                    entry = {'seconds': seconds, 'peak_mb': peak, 'nodes': compiled.node_count,
+                             'elements': elements, 'elements_per_s': elements / seconds if seconds else None}
+                    if stage == 'parse':
+                        entry['mb_per_s'] = nbytes / 1e6 / seconds if seconds else None
+                    results[f"{name}/{size}/{stage}"] = entry
+                    if progress:
+                        progress(f"{name}/{size}/{stage}", entry)
+                os.unlink(path)
+    return results
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'scipy': scipy.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+def compare(results, baseline, threshold=0.25, memory_threshold=0.5, min_seconds=MIN_GATED_SECONDS):
+    """
+    Regressions of `results` against `baseline` (both run_suite dicts):
+    one message per stage whose time grew by more than `threshold` or
+    peak memory by more than `memory_threshold` (fractions). Stages that
+    are missing from either side, or take under `min_seconds` in both,
+    are not gated.
+    """
+    regressions = []
+    for key, entry in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if max(entry['seconds'], base['seconds']) >= min_seconds and \
+                entry['seconds'] > base['seconds'] * (1 + threshold):
+            regressions.append(f"{key}: {entry['seconds']:.4f} s vs {base['seconds']:.4f} s baseline "
+                               f"(+{entry['seconds'] / base['seconds'] - 1:.0%})")
+        if entry.get('peak_mb') is not None and base.get('peak_mb') and \
+                entry['peak_mb'] > base['peak_mb'] * (1 + memory_threshold):
+            regressions.append(f"{key}: peak {entry['peak_mb']:.1f} MB vs {base['peak_mb']:.1f} MB baseline "
+                               f"(+{entry['peak_mb'] / base['peak_mb'] - 1:.0%})")
+    return regressions
+
+def load_report(path):
+    with open(path) as f:
+        return json.load(f)
+
+def save_report(path, results):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=1, sort_keys=True)
+
+def print_row(key, entry):
+    peak = '-' if entry['peak_mb'] is None else f"{entry['peak_mb']:.1f}"
+    rate = entry['elements_per_s'] or float('inf')
+    print(f"{key:<32} {entry['seconds']:>10.4f} {peak:>10} {rate:>14.0f}", flush=True)
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description="Benchmark the verification pipeline on synthetic circuits.")
+    arg_parser.add_argument("--generators", nargs='+', choices=list(GENERATORS), default=list(GENERATORS))
+    arg_parser.add_argument("--sizes", nargs='+', type=int, default=list(DEFAULT_SIZES),
+                            help="approximate element counts to sweep")
+    arg_parser.add_argument("--stages", nargs='+', choices=list(STAGES), default=list(STAGES))
+    arg_parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage (best is kept)")
+    arg_parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak-memory run")
+    arg_parser.add_argument("--mc-runs", type=int, default=100, help="Monte Carlo runs per measurement")
+    arg_parser.add_argument("--mc-max-nodes", type=int, default=2000,
+                            help="skip Monte Carlo on circuits with more nodes")
+    arg_parser.add_argument("--solver", choices=['auto', 'dense', 'sparse', 'cg'], default='auto')
+    arg_parser.add_argument("--stage-budget", type=float, default=STAGE_BUDGET_SECONDS,
+                            help="skip a stage at sizes where it is predicted to take longer (0 = never skip)")
+    arg_parser.add_argument("--output", help="write the results as JSON to this path")
+    arg_parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON to compare against")
+    arg_parser.add_argument("--save-baseline", action="store_true",
+                            help="store these results as the baseline instead of comparing")
+    arg_parser.add_argument("--threshold", type=float, default=0.25,
+                            help="allowed slowdown per stage before failing (0.25 = 25%%)")
+    arg_parser.add_argument("--memory-threshold", type=float, default=0.5,
+                            help="allowed peak memory growth per stage before failing")
+    args = arg_parser.parse_args(argv)
+
+    print(f"{'case':<32} {'seconds':>10} {'peak MB':>10} {'elements/s':>14}")
+    results = run_suite(args.generators, args.sizes, args.stages, repeat=args.repeat,
+                        memory=not args.no_memory, mc_runs=args.mc_runs,
+                        mc_max_nodes=args.mc_max_nodes, solver=args.solver, progress=print_row,
+                        stage_budget=args.stage_budget or None)
+    if args.output:
+        save_report(args.output, results)
+    if args.save_baseline:
+        save_report(args.baseline, results)
+        print(f"Saved baseline {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+
+    regressions = compare(results, load_report(args.baseline)['results'],
+                          args.threshold, args.memory_threshold)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    print(f"{len(regressions)} regression(s) against {args.baseline}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,10 @@
+import time
 import numpy as np
-import random
+from . import circuit_profiler
+from .circuit_bounds import WorstCaseBounds
+from .circuit_corners import CornerAnalysis
+from .circuit_sampling import YieldEstimator, tolerance_factors
+from .circuit_statistics import HISTOGRAM_BINS, RunningStats, SampleWriter
 
 class CircuitAnalysis:
     """
@@ -9,79 +14,272 @@ class CircuitAnalysis:
 
     def __init__(self, circuit):
         self.circuit = circuit
+        self.compiled = circuit.compile()
 
     def run_analysis(self):
         """
         Runs general checks on the circuit (e.g., connectivity).
         Returns a dict of analysis results (e.g. 'is_connected': bool, etc.).
         """
-        results = {}
-        results['is_connected'] = self.check_connectivity()
-        results['node_count'] = len(self.circuit.get_all_nodes())
-        results['resistor_count'] = len(self.circuit.get_resistors())
-        results['voltage_source_count'] = len(self.circuit.get_voltage_sources())
+        with circuit_profiler.span('analysis'):
+            results = {}
+            with circuit_profiler.span('connectivity'):
+                results['is_connected'] = self.check_connectivity()
+                results['component_count'] = self.compiled.connectivity.component_count
+                results['floating_node_count'] = len(self.compiled.connectivity.floating_node_ids())
+            results['node_count'] = self.compiled.node_count
+            results['resistor_count'] = self.compiled.resistor_count
+            results['voltage_source_count'] = self.compiled.voltage_source_count
+            results['subcircuit_instance_count'] = self.compiled.instance_count
         return results
 
     def check_connectivity(self):
         """
-        Simple connectivity check:
-        - If there's at least one element connecting the circuit, we do an adjacency search.
+        True when all referenced nodes fall into a single connected
+        component, from the union-find built while parsing (see
+        circuit_connectivity; compiled.connectivity.report() has the
+        per-component details and the floating nodes).
         """
-        all_nodes = list(self.circuit.get_all_nodes())
-        if not all_nodes:
-            return True  # no nodes => trivially "connected"
+        return self.compiled.connectivity.is_connected
 
-        adjacency = {node: set() for node in all_nodes}
-        for elem in self.circuit.elements:
-            adjacency[elem.node1].add(elem.node2)
-            adjacency[elem.node2].add(elem.node1)
+    def run_monte_carlo(self, runs=10, tolerance=0.05, seed=None):
+        """
+        Monte Carlo over resistor tolerances. Each resistor is drawn
+        uniformly within ±tolerance around its nominal value, independently
+        for every run. Returns a list of (node_voltages, resistor_values)
+        dict pairs, one per run. The circuit itself is left untouched.
+        """
+        batch = self.run_monte_carlo_batch(runs=runs, tolerance=tolerance, seed=seed)
+        return self.batch_to_runs(batch)
+
+    @staticmethod
+    def batch_to_runs(batch):
+        """ Convert a Monte Carlo batch dict into run_monte_carlo's list of dict pairs. """
+        results = []
+        for run_voltages, run_values in zip(batch['voltages'].tolist(), batch['resistances'].tolist()):
+            node_voltages = dict(zip(batch['nodes'], run_voltages))
+            node_voltages['0'] = 0.0
+            results.append((node_voltages, dict(zip(batch['resistors'], run_values))))
+        return results
+
+    def run_monte_carlo_batch(self, runs=10, tolerance=0.05, seed=None, sampler='random',
+                              distribution='uniform'):
+        """
+        Vectorized Monte Carlo engine behind run_monte_carlo.
+        All tolerance factors are drawn at once as a (runs, n_resistors)
+        array from np.random.default_rng(seed), or from a Latin hypercube
+        ('lhs') or scrambled Sobol ('sobol') `sampler` and a 'normal' or
+        'truncnormal' `distribution` (see circuit_sampling); the G matrices for a whole
+        batch of samples are assembled as A^T diag(g) A and solved with
+        stacked np.linalg.solve calls.
+        Returns a dict with:
+          'nodes'       - unknown node names (column order of 'voltages')
+          'resistors'   - resistor names (column order of 'resistances')
+          'voltages'    - (runs, n_nodes) array of node voltages
+          'resistances' - (runs, n_resistors) array of sampled resistances
+        Resistors inside X instances stay at nominal (see
+        warn_fixed_instances).
+        """
+        from .circuit_simulation import DCSolver  # import here to avoid circular deps
 
-        visited = set()
+        self.warn_fixed_instances('Monte Carlo')
 
-        def dfs(start):
-            stack = [start]
-            while stack:
-                curr = stack.pop()
-                if curr not in visited:
-                    visited.add(curr)
-                    stack.extend(adjacency[curr] - visited)
+        nominal = self.compiled.resistances
 
-        # Start from first node
-        dfs(all_nodes[0])
-        return len(visited) == len(all_nodes)
+        start = time.perf_counter()
+        with circuit_profiler.span('monte_carlo', runs=runs):
+            with circuit_profiler.span('monte_carlo.sample'):
+                if sampler == 'random' and distribution == 'uniform':
+                    rng = np.random.default_rng(seed)
+                    factors = 1.0 + rng.uniform(-tolerance, tolerance, size=(runs, len(nominal)))
+                else:
+                    factors = tolerance_factors(runs, len(nominal), tolerance, sampler, distribution, seed)
+                resistances = nominal * factors
 
-    def run_monte_carlo(self, runs=10, tolerance=0.05):
+            with circuit_profiler.span('monte_carlo.solve'):
+                solver = DCSolver(self.compiled)
+                voltages = solver.solve_batch(solver.incidence_matrix(), 1.0 / resistances)
+        elapsed = time.perf_counter() - start
+        circuit_profiler.count('mc_samples', runs)
+        circuit_profiler.count('mc_samples_per_s', runs / elapsed if elapsed > 0 else float('inf'))
+
+        return {
+            'nodes': list(solver.node_list),
+            'resistors': list(self.compiled.res_names),
+            'voltages': voltages,
+            'resistances': resistances,
+        }
+
+    def run_monte_carlo_stats(self, runs=10, tolerance=0.05, seed=None, limits=None, workers=0,
+                              chunk_size=10000, bins=HISTOGRAM_BINS, samples_dir=None, progress=None,
+                              store=None, rules=None):
         """
-        Demonstrates a simple Monte Carlo approach where each resistor 
-        is varied ±tolerance around its nominal value. For each run:
-        1) randomize resistor values
-        2) run DC simulation
-        3) store results
+        Streaming Monte Carlo over resistor tolerances: chunks of
+        `chunk_size` runs (drawn as in ParallelMonteCarlo, in this process
+        or on `workers` processes) are folded into a RunningStats over the
+        unknown nodes and then dropped, so memory does not grow with
+        `runs`. `limits` ({node: (low, high)}) adds spec-limit failure
+        counts; with `samples_dir` the raw samples are also written there
+        chunk by chunk (see SampleWriter), and with `store` (a
+        circuit_results.ResultDataset with 'voltages' and 'resistances'
+        groups) appended to it as chunks numbered after its existing runs.
+        `rules` (a circuit_rules.RuleReport from RuleEngine.report()) is
+        updated with every chunk. Resistors inside X instances stay at
+        nominal. Returns the RunningStats.
         """
-        from .circuit_simulation import DCSolver  # import here to avoid circular deps
-        results = []
+        from .circuit_parallel import ParallelMonteCarlo  # import here to avoid circular deps
 
-        # Original resistor values (to restore after simulation)
-        original_values = [r.resistance for r in self.circuit.get_resistors()]
+        self.warn_fixed_instances('Monte Carlo')
 
-        for _ in range(runs):
-            # Randomize resistor values within ±tolerance
-            for resistor in self.circuit.get_resistors():
-                nominal = resistor.resistance
-                # random factor between (1 - tolerance) and (1 + tolerance)
-                factor = 1 + random.uniform(-tolerance, tolerance)
-                resistor.resistance = nominal * factor
+        executor = ParallelMonteCarlo(self, workers=workers, chunk_size=chunk_size, progress=progress)
+        stats = RunningStats(executor.node_list, limits, bins)
+        writer = None
+        if samples_dir is not None:
+            writer = SampleWriter(samples_dir, runs, executor.node_list, self.compiled.res_names)
+        first_run = store.next_run if store is not None else 0
+        start = time.perf_counter()
+        try:
+            with circuit_profiler.span('monte_carlo.stream', runs=runs, workers=workers):
+                for chunk_start, _, voltages, resistances in executor.iter_chunks(runs, tolerance, seed):
+                    stats.update(voltages)
+                    if rules is not None:
+                        rules.update(voltages, resistances, first_run + chunk_start)
+                    if writer is not None:
+                        writer.write(chunk_start, voltages, resistances)
+                    if store is not None:
+                        store.append(first_run + chunk_start, voltages=voltages, resistances=resistances)
+        finally:
+            if writer is not None:
+                writer.close()
+        elapsed = time.perf_counter() - start
+        circuit_profiler.count('mc_samples', runs)
+        circuit_profiler.count('mc_samples_per_s', runs / elapsed if elapsed > 0 else float('inf'))
+        return stats
 
-            # Solve
-            solver = DCSolver(self.circuit)
-            node_voltages = solver.run_dc_analysis()
+    def estimate_yield(self, limits, runs=1000, tolerance=0.05, sampler='lhs', distribution='uniform',
+                       seed=None, confidence=0.95, chunk_size=10000):
+        """
+        Probability that every node stays within `limits` ({node: (low,
+        high)}) under resistor tolerances, with a `confidence` interval,
+        from about `runs` solves. `sampler` is 'random', 'lhs', 'sobol' or
+        'importance' (for rare failures); see circuit_sampling.YieldEstimator.
+        Resistors inside X instances stay at nominal.
+        """
+        self.warn_fixed_instances('Yield estimation')
+        estimator = YieldEstimator(self, limits, tolerance, distribution, chunk_size)
+        return estimator.estimate(runs, sampler, seed, confidence)
 
-            # Capture the changed resistor values + node voltages
-            current_values = {r.name: r.resistance for r in self.circuit.get_resistors()}
-            results.append((node_voltages, current_values))
+    def run_corners(self, design='sensitivity', nodes=None, tolerance=0.05, source_tolerance=0.0,
+                    tolerances=None, chunk_size=4096, rules=None):
+        """
+        Worst-case node voltages over tolerance corners: resistors at
+        R (1 -+ tolerance), grounded sources at V (1 -+ source_tolerance),
+        per-element overrides in `tolerances` ({name: relative tolerance or
+        (low, high)}). `design` is 'full' (2^k corners), 'fractional'
+        (Hadamard design with fold-over) or 'sensitivity' (only the corners
+        the adjoint sensitivity signs point at); see
+        circuit_corners.CornerAnalysis.run for the result dict. `rules`
+        (a circuit_rules.RuleReport) is updated with every corner solved.
+        Resistors inside X instances stay at nominal.
+        """
+        self.warn_fixed_instances('Corner analysis')
+        corners = CornerAnalysis(self, tolerance, source_tolerance, tolerances, chunk_size)
+        return corners.run(design, nodes, rules)
 
-        # Restore original values
-        for resistor, orig_val in zip(self.circuit.get_resistors(), original_values):
-            resistor.resistance = orig_val
+    def run_worst_case(self, nodes=None, tolerance=0.05, tolerances=None, vertices=True):
+        """
+        Guaranteed bounds on node voltages over every resistor value within
+        ±tolerance (per-resistor overrides in `tolerances`), from one
+        forward and one adjoint solve per node instead of sampling; with
+        `vertices` the sensitivity-sign corners are solved too, and
+        'proven' marks nodes whose bounds are exact. See
+        circuit_bounds.WorstCaseBounds.run for the result dict. Raises
+        ValueError for circuits with X instances, whose internal resistors
+        cannot be varied.
+        """
+        return WorstCaseBounds(self, tolerance, tolerances).run(nodes, vertices)
 
-        return results
+    def warn_fixed_instances(self, analysis):
+        """
+        Tolerance analyses only vary top-level resistors: each X instance
+        is a fixed Kron-reduced port model, so its internal resistors stay
+        at nominal. Says so when the circuit has instances.
+        """
+        if self.compiled.instance_count:
+            print(f"Warning: {analysis} varies top-level resistors only; resistors inside the "
+                  f"{self.compiled.instance_count} subcircuit instance(s) stay at nominal")
+
+    def run_sensitivity(self, nodes=None, solver=None):
+        """
+        Adjoint DC sensitivity of node voltages to every resistor.
+        For an output node o, one transposed solve G^T lam = e_o (reusing
+        the solver's LU factorization) gives, for all resistors at once,
+            dV_o/dg_i = -(lam . p_i) (q_i . x),   dV_o/dR_i = -dV_o/dg_i / R_i^2
+        where q_i = e_a - e_b over the resistor's nodes and p_i is q_i with
+        the rows pinned by voltage sources zeroed. `nodes` defaults to all
+        non-ground nodes; pass `solver` to reuse an existing DCSolver. A
+        'cg' solver runs the solves by conjugate gradient instead: over the
+        free nodes G^T lam = e_o is just G_ff lam_f = e_o, a unit current
+        injected at o with the sources at 0 V.
+        Returns a dict with:
+          'nodes'      - output node names (row order of the arrays)
+          'resistors'  - resistor names (column order of the arrays)
+          'voltages'   - nominal voltage of each output node
+          'dV_dR'      - (n_nodes, n_resistors) array of dV/dR in V/ohm
+          'normalized' - (R / V) dV/dR, NaN where V is zero
+        """
+        from .circuit_simulation import DCSolver  # import here to avoid circular deps
+
+        if solver is None:
+            solver = DCSolver(self.compiled)
+        c = self.compiled
+        nodes = list(solver.node_list) if nodes is None else list(nodes)
+        rows = np.array([solver.node_index[node] for node in nodes], dtype=np.int64)
+
+        with circuit_profiler.span('sensitivity.adjoint_solve', outputs=len(rows), resistors=c.resistor_count):
+            E = np.zeros((len(solver.node_list), len(rows)))
+            E[rows, np.arange(len(rows))] = 1.0
+            if solver.method == 'cg':
+                x = solver.solve_iterative()
+                lam = solver.solve_iterative(pinned=np.zeros_like(E), currents=E)
+            else:
+                lu = solver.factorize()
+                x = lu.solve(solver.rhs)
+                lam = lu.solve(E, transpose=True)
+
+        # Ground and pinned rows do not carry a resistor's stamp
+        free = np.ones(len(solver.node_list), dtype=bool)
+        free[solver._fixed_nodes()[0]] = False
+        a = c.res_node1.astype(np.int64) - 1
+        b = c.res_node2.astype(np.int64) - 1
+        x0 = np.append(x, 0.0)  # index -1 (ground) reads 0 V
+        lam0 = np.vstack([lam * free[:, None], np.zeros((1, len(rows)))])
+
+        dV_dg = -(lam0[a] - lam0[b]).T * (x0[a] - x0[b])
+        dV_dR = -dV_dg / c.resistances ** 2
+        voltages = x[rows]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            normalized = np.where(voltages[:, None] != 0,
+                                  dV_dR * c.resistances / voltages[:, None], np.nan)
+        return {
+            'nodes': nodes,
+            'resistors': list(c.res_names),
+            'voltages': voltages,
+            'dV_dR': dV_dR,
+            'normalized': normalized,
+        }
+
+    @staticmethod
+    def rank_sensitivities(sensitivity, top=10):
+        """
+        The `top` (node, resistor, dV/dR, normalized) entries of a
+        run_sensitivity result, largest |normalized| first (|dV/dR| breaks
+        ties and ranks nodes at 0 V).
+        """
+        normalized = np.abs(np.nan_to_num(sensitivity['normalized']))
+        absolute = np.abs(sensitivity['dV_dR'])
+        order = np.lexsort((-absolute.ravel(), -normalized.ravel()))[:top]
+        node_idx, res_idx = np.unravel_index(order, absolute.shape)
+        return [(sensitivity['nodes'][i], sensitivity['resistors'][j],
+                 float(sensitivity['dV_dR'][i, j]), float(sensitivity['normalized'][i, j]))
+                for i, j in zip(node_idx, res_idx)]
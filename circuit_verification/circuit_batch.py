@@ -0,0 +1,252 @@
+import contextlib
+import glob
+import io
+import json
+import multiprocessing
+import os
+import time
+from multiprocessing.connection import wait
+import numpy as np
+from .circuit_parser import CircuitParser
+from .circuit_simulation import DCSolver
+from .circuit_analysis import CircuitAnalysis
+from .circuit_verifier import CircuitVerifier
+
+# Files picked up when a directory is given
+NETLIST_SUFFIXES = ('.net', '.cir', '.sp', '.spi', '.spice')
+
+def collect_netlists(spec):
+    """
+    Netlist paths for a batch: every netlist file under a directory
+    (recursively, sorted), the matches of a glob pattern, or the lines of
+    a manifest file (one path per line, '#' comments, relative paths
+    resolved against the manifest's directory).
+    """
+    if os.path.isdir(spec):
+        paths = []
+        for root, dirs, files in os.walk(spec):
+            dirs.sort()
+            paths.extend(os.path.join(root, name) for name in sorted(files)
+                         if name.lower().endswith(NETLIST_SUFFIXES))
+        return paths
+    if glob.has_magic(spec):
+        return sorted(path for path in glob.glob(spec, recursive=True) if os.path.isfile(path))
+    if not os.path.isfile(spec):
+        raise FileNotFoundError(f"No such directory, glob match or manifest: {spec}")
+
+    base = os.path.dirname(os.path.abspath(spec))
+    paths = []
+    with open(spec) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                paths.append(line if os.path.isabs(line) else os.path.join(base, line))
+    return paths
+
+def verify_netlist(path, options=None):
+    """
+    Parse, solve, analyse and verify one netlist. Returns a JSON-ready
+    record; any exception is caught and reported in the record instead.
+    Lines the pipeline prints (solver and parser warnings) are captured
+    into 'warnings'. A singular G (floating nodes) is reported as
+    'dc_error' and the circuit is still analysed and verified.
+    options: use_cache, solver (DCSolver method), tol, preconditioner,
+    include_voltages, rules (path of a rules file; the per-rule results
+    go to 'rules').
+    """
+    options = options or {}
+    start = time.perf_counter()
+    record = {'netlist': path}
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            compiled = CircuitParser(path, use_cache=options.get('use_cache', False)).parse_compiled()
+            solver = DCSolver(compiled, method=options.get('solver', 'auto'),
+                              tol=options.get('tol', 1e-10),
+                              preconditioner=options.get('preconditioner', 'jacobi'))
+            try:
+                node_voltages = solver.run_dc_analysis()
+            except np.linalg.LinAlgError as exc:
+                # Floating nodes make G singular; verification still reports why
+                node_voltages = {}
+                record['dc_error'] = f"LinAlgError: {exc}"
+            analysis_results = CircuitAnalysis(compiled).run_analysis()
+            verifier = CircuitVerifier(compiled, node_voltages, analysis_results, rules=options.get('rules'))
+            verification = verifier.verify()
+        record.update(
+            status='ok',
+            passed=all(verification.values()),
+            nodes=compiled.node_count,
+            elements=compiled.resistor_count + compiled.voltage_source_count + compiled.instance_count,
+            analysis=analysis_results,
+            verification=verification,
+        )
+        if verifier.rule_report is not None:
+            record['rules'] = verifier.rule_report.summary()
+        if solver.last_solve_info is not None:
+            record['cg_iterations'] = solver.last_solve_info['iterations']
+        if options.get('include_voltages') and node_voltages:
+            record['node_voltages'] = {node: float(v) for node, v in node_voltages.items()}
+    except Exception as exc:
+        record.update(status='error', passed=False, error=f"{type(exc).__name__}: {exc}")
+    warnings = output.getvalue().splitlines()
+    if warnings:
+        record['warnings'] = warnings
+    record['seconds'] = time.perf_counter() - start
+    return record
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def _worker_main(conn, options):
+    """ Verify paths received over `conn` until it sends None. """
+    while True:
+        task = conn.recv()
+        if task is None:
+            return
+        index, path = task
+        conn.send((index, verify_netlist(path, options)))
+
+
+class BatchVerifier:
+    """
+    Verifies many netlists with a pool of long-lived worker processes, so
+    interpreter and NumPy startup are paid once per worker rather than per
+    netlist.
+
+    Each worker gets one netlist at a time over a pipe. A worker that
+    exceeds `timeout` seconds on a netlist is killed and replaced, and one
+    that dies is replaced too, so a hanging or crashing netlist only costs
+    its own record ('status': 'timeout' or 'error'). workers=0 verifies in
+    this process, without timeouts.
+    """
+
+    def __init__(self, workers=None, timeout=60.0, options=None):
+        self.workers = os.cpu_count() if workers is None else workers
+        self.timeout = timeout
+        self.options = options or {}
+        self.stats = {}
+
+    def run(self, paths, out):
+        """
+        Verify `paths`, writing one JSON line per netlist to the text
+        stream `out` as results arrive (completion order; 'index' is the
+        position in `paths`). Returns and keeps in self.stats the counts
+        per status, elapsed seconds and netlists per second.
+        """
+        start = time.perf_counter()
+        counts = {'ok': 0, 'error': 0, 'timeout': 0}
+        passed = 0
+        for record in self.iter_results(paths):
+            counts[record['status']] += 1
+            passed += bool(record.get('passed'))
+            out.write(json.dumps(record, default=_json_default) + '\n')
+            out.flush()
+        elapsed = time.perf_counter() - start
+        self.stats = {
+            'netlists': len(paths),
+            'passed': passed,
+            **counts,
+            'seconds': elapsed,
+            'netlists_per_s': len(paths) / elapsed if elapsed > 0 else float('inf'),
+        }
+        return self.stats
+
+    def iter_results(self, paths):
+        """ Yield one record per path, each with its 'index' in `paths`. """
+        if self.workers <= 0:
+            for index, path in enumerate(paths):
+                yield {'index': index, **verify_netlist(path, self.options)}
+            return
+
+        context = multiprocessing.get_context()
+        tasks = iter(enumerate(paths))
+        workers = {}  # connection -> [process, (index, path) or None, deadline]
+        lost = []     # records of paths whose worker was found dead when sent them
+
+        def spawn():
+            parent, child = context.Pipe()
+            process = context.Process(target=_worker_main, args=(child, self.options), daemon=True)
+            process.start()
+            child.close()
+            workers[parent] = [process, None, None]
+            return parent
+
+        def dispatch(conn):
+            """
+            Hand the next path to the worker on `conn`, or stop it when none
+            is left. If the worker has died meanwhile, that path gets an
+            error record and a fresh worker takes the following one.
+            """
+            while True:
+                task = next(tasks, None)
+                if task is None:
+                    with contextlib.suppress(EOFError, OSError):
+                        conn.send(None)
+                    retire(conn, kill=False)
+                    return
+                workers[conn][1:] = [task, time.monotonic() + self.timeout]
+                try:
+                    conn.send(task)
+                    return
+                except (EOFError, OSError):
+                    process = workers[conn][0]
+                    retire(conn, kill=True)
+                    index, path = task
+                    lost.append({'index': index, 'netlist': path, 'status': 'error', 'passed': False,
+                                 'error': f"worker exited with code {process.exitcode}"})
+                    conn = spawn()
+
+        def retire(conn, kill):
+            process = workers.pop(conn)[0]
+            if kill:
+                process.kill()
+            process.join()
+            conn.close()
+
+        try:
+            for _ in range(min(self.workers, len(paths))):
+                spawn()
+            for conn in list(workers):
+                dispatch(conn)
+
+            while workers or lost:
+                while lost:
+                    yield lost.pop(0)
+                busy = [conn for conn, (_, task, _) in workers.items() if task is not None]
+                if not busy:
+                    break
+                deadline = min(workers[conn][2] for conn in busy)
+                ready = wait(busy, timeout=max(0.0, deadline - time.monotonic()))
+                replaced = 0
+                for conn in ready:
+                    process, (index, path), _ = workers[conn]
+                    try:
+                        _, record = conn.recv()
+                    except (EOFError, OSError):
+                        process.join()
+                        yield {'index': index, 'netlist': path, 'status': 'error', 'passed': False,
+                               'error': f"worker exited with code {process.exitcode}"}
+                        retire(conn, kill=False)
+                        replaced += 1
+                        continue
+                    yield {'index': index, **record}
+                    workers[conn][1] = None
+                    dispatch(conn)
+
+                now = time.monotonic()
+                for conn, (process, task, deadline) in list(workers.items()):
+                    if task is not None and conn not in ready and deadline <= now:
+                        index, path = task
+                        yield {'index': index, 'netlist': path, 'status': 'timeout', 'passed': False,
+                               'error': f"no result within {self.timeout:g} s", 'seconds': self.timeout}
+                        retire(conn, kill=True)
+                        replaced += 1
+
+                for _ in range(replaced):
+                    dispatch(spawn())
+        finally:
+            for conn in list(workers):
+                retire(conn, kill=True)
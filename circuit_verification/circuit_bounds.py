@@ -0,0 +1,165 @@
+import numpy as np
+from .circuit_corners import CornerAnalysis
+from . import circuit_profiler
+
+# Watched nodes per adjoint block (bounds the (nodes, resistors) arrays in memory)
+BOUND_BLOCK = 256
+# Relative padding of the enclosures for rounding in the nominal solves
+ROUNDING_PAD = 1e-10
+
+
+class WorstCaseBounds:
+    """
+    Guaranteed per-node voltage bounds over every resistor value inside
+    its tolerance box, without sampling.
+
+    With conductances g = g0 + dg, x = G(g)^-1 I and the nominal x0,
+    exactly
+        x_o - x0_o = -sum_i dg_i w_oi d_i,   w_oi = lam_o . p_i,  d_i = q_i . x
+    where lam_o is the nominal adjoint of node o (as in run_sensitivity)
+    and d_i the branch voltage of resistor i at g. Splitting d_i = d0_i +
+    delta_i, the part with d0_i is linear in dg and its extremes over the
+    box are exact. The remainder is bounded with the branch-error energy:
+    G's free block is symmetric positive definite, so
+        sum_i g0_i delta_i^2 <= (sum_i rho_i^2 g0_i d0_i^2) / (1 - rho)^2
+    with rho_i = max |dg_i| / g0_i and rho = max rho_i, and by
+    Cauchy-Schwarz the remainder of node o is at most
+        sqrt(sum_i rho_i^2 g0_i w_oi^2) * sqrt(energy bound),
+    which is second order in the tolerance. This costs one forward solve
+    and one transposed solve per watched node.
+
+    With `vertices`, the corner picked by the sensitivity signs is also
+    solved for every node's minimum and maximum, which gives values the
+    circuit actually reaches. When the sign of every dV_o/dg_i provably
+    stays the same over the whole box (the same energy bounds applied to
+    the adjoint and to the branch voltages), V_o is monotone along every
+    resistor and those vertices are the exact extremes.
+
+    Circuits with X instances are rejected: their internal resistors
+    live in Kron-reduced port models and cannot be varied here.
+    """
+
+    def __init__(self, analysis, tolerance=0.05, tolerances=None):
+        self.analysis = analysis
+        if analysis.compiled.instance_count:
+            raise ValueError("Worst-case bounds cannot vary the resistors inside subcircuit instances "
+                             "(they are folded into fixed port models), so no bound would be guaranteed")
+        self.corners = CornerAnalysis(analysis, tolerance, 0.0, tolerances)
+        if len(self.corners._vs_cols):
+            raise ValueError("Worst-case bounds cover resistor tolerances only; "
+                             "use run_corners for source tolerances")
+        c = analysis.compiled
+        self.solver = self.corners.solver
+        self.node_list = self.corners.node_list
+
+        g0 = np.asarray(c.conductances, dtype=float)
+        index = self.corners._res_index
+        self.dg_low = np.zeros(len(g0))
+        self.dg_high = np.zeros(len(g0))
+        self.dg_low[index] = 1.0 / self.corners.high[self.corners._res_cols] - g0[index]
+        self.dg_high[index] = 1.0 / self.corners.low[self.corners._res_cols] - g0[index]
+        self.g0 = g0
+        self.rho = np.maximum(-self.dg_low, self.dg_high) / g0
+        self.varies = np.zeros(len(g0), dtype=bool)
+        self.varies[index] = True
+        if len(g0) and self.rho.max() >= 1.0:
+            raise ValueError("Worst-case bounds need every conductance to stay within 100% of its "
+                             "nominal value (resistor tolerance below 50%)")
+
+    def run(self, nodes=None, vertices=True):
+        """
+        Bounds for the watched nodes (default: all unknown nodes).
+        Returns a dict with:
+          'nodes'                              - watched node names
+          'nominal'                            - nominal voltages
+          'lower', 'upper'                     - guaranteed bounds: every
+                                                 voltage over the box lies
+                                                 inside them (up to rounding)
+          'lower_attained', 'upper_attained'   - voltages reached at the
+                                                 sensitivity-sign vertices
+                                                 (None without `vertices`)
+          'proven'                             - per node: the attained
+                                                 values are proven extremes,
+                                                 so the bounds equal them
+          'max_rho'                            - largest relative conductance change
+        """
+        c = self.analysis.compiled
+        solver = self.solver
+        index = solver.node_index
+        nodes = self.node_list if nodes is None else list(nodes)
+        missing = [node for node in nodes if node not in index]
+        if missing:
+            raise ValueError(f"Unknown node(s): {', '.join(missing)}")
+        rows = np.array([index[node] for node in nodes], dtype=np.int64)
+
+        with circuit_profiler.span('bounds', nodes=len(rows), resistors=c.resistor_count):
+            lu = solver.factorize()
+            x = lu.solve(solver.rhs)
+            a = c.res_node1.astype(np.int64) - 1
+            b = c.res_node2.astype(np.int64) - 1
+            x0 = np.append(x, 0.0)  # index -1 (ground) reads 0 V
+            d0 = x0[a] - x0[b]
+
+            # Energy bound on the branch-voltage errors of x
+            rho, g0 = self.rho, self.g0
+            rho_max = float(rho.max()) if len(rho) else 0.0
+            branch_energy = np.sqrt(np.sum(rho ** 2 * g0 * d0 ** 2)) / (1.0 - rho_max)
+            d_radius = branch_energy / np.sqrt(g0)
+
+            free = np.ones(len(solver.node_list), dtype=bool)
+            free[solver._fixed_nodes()[0]] = False
+            # Resistors between two pinned (or ground) nodes have no effect
+            live = self.varies & ((a >= 0) & free[a] | (b >= 0) & free[b])
+
+            low = np.empty(len(rows))
+            high = np.empty(len(rows))
+            proven = np.empty(len(rows), dtype=bool)
+            for start in range(0, len(rows), BOUND_BLOCK):
+                block = rows[start:start + BOUND_BLOCK]
+                E = np.zeros((len(solver.node_list), len(block)))
+                E[block, np.arange(len(block))] = 1.0
+                lam = lu.solve(E, transpose=True)
+                lam0 = np.vstack([lam * free[:, None], np.zeros((1, len(block)))])
+                w = (lam0[a] - lam0[b]).T                       # (block, resistors)
+
+                # Exact extremes of the first-order term -sum dg_i w_oi d0_i
+                coef = -w * d0
+                high[start:start + len(block)] = np.maximum(coef * self.dg_low, coef * self.dg_high).sum(axis=1)
+                low[start:start + len(block)] = np.minimum(coef * self.dg_low, coef * self.dg_high).sum(axis=1)
+                adjoint_energy = np.sqrt(np.sum(rho ** 2 * g0 * w ** 2, axis=1))
+                remainder = adjoint_energy * branch_energy
+                high[start:start + len(block)] += remainder
+                low[start:start + len(block)] -= remainder
+
+                # Sign of dV_o/dg_i = -w_oi(g) d_i(g) fixed over the box?
+                w_radius = (adjoint_energy / (1.0 - rho_max))[:, None] / np.sqrt(g0)
+                fixed_sign = (np.abs(w) > w_radius) & (np.abs(d0) > d_radius)
+                proven[start:start + len(block)] = (fixed_sign | ~live).all(axis=1) | ~free[block]
+
+            nominal = x[rows]
+            pad = ROUNDING_PAD * (np.abs(nominal) + high - low + np.abs(solver.rhs).max(initial=0.0))
+            lower = nominal + low - pad
+            upper = nominal + high + pad
+
+            lower_attained = upper_attained = None
+            if vertices:
+                corners = self.corners.run('sensitivity', nodes)
+                lower_attained, upper_attained = corners['min'], corners['max']
+                lower = np.minimum(lower, lower_attained)
+                upper = np.maximum(upper, upper_attained)
+                lower = np.where(proven, lower_attained, lower)
+                upper = np.where(proven, upper_attained, upper)
+            else:
+                proven = np.zeros(len(rows), dtype=bool)
+        circuit_profiler.count('bounds_proven', int(proven.sum()))
+
+        return {
+            'nodes': nodes,
+            'nominal': nominal,
+            'lower': lower,
+            'upper': upper,
+            'lower_attained': lower_attained,
+            'upper_attained': upper_attained,
+            'proven': proven,
+            'max_rho': rho_max,
+        }
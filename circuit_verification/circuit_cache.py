@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import zlib
+from collections.abc import Sequence
+import numpy as np
+from .circuit_elements import CompiledCircuit
+
+# Binary sidecar layout (all offsets absolute, sections 64-byte aligned):
+#   MAGIC | uint32 FORMAT_VERSION | uint32 header length | uint32 header CRC32
+#   | JSON header | padding | array and string sections
+# String tables are '\n'-joined UTF-8 blobs; netlist tokens never contain
+# newlines. Arrays are raw little-endian data opened with np.memmap, so
+# several processes loading the same cache share its pages. Every
+# section records its CRC32, checked on load (zlib runs at GB/s, far
+# ahead of parsing), so a damaged section is rebuilt, never used.
+MAGIC = b'CVNETC\x00\x00'
+FORMAT_VERSION = 2
+CACHE_SUFFIX = '.cvc'
+_PREFIX = struct.Struct('<8sIII')
+_ALIGN = 64
+
+
+class CacheError(Exception):
+    """ Raised when a cache file is missing, stale or corrupt. """
+
+
+class StringTable(Sequence):
+    """
+    Read-only list of strings backed by a '\\n'-joined blob in a cache file.
+    Decoding is deferred to first access, so opening a cache stays cheap
+    even for millions of names.
+    """
+
+    def __init__(self, blob, count):
+        self._blob = blob
+        self._count = count
+        self._items = None
+
+    def _materialize(self):
+        if self._items is None:
+            self._items = bytes(self._blob).decode().split('\n') if self._count else []
+        return self._items
+
+    def __getitem__(self, index):
+        return self._materialize()[index]
+
+    def __len__(self):
+        return self._count
+
+    def __repr__(self):
+        return f"StringTable({self._count} strings)"
+
+
+def cache_path_for(netlist_path):
+    return netlist_path + CACHE_SUFFIX
+
+def source_fingerprint(netlist_path, with_hash=True):
+    """ Size, mtime and (optionally) SHA-256 of the netlist file. """
+    st = os.stat(netlist_path)
+    fingerprint = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+    if with_hash:
+        digest = hashlib.sha256()
+        with open(netlist_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        fingerprint['sha256'] = digest.hexdigest()
+    return fingerprint
+
+def _aligned(offset):
+    return (offset + _ALIGN - 1) // _ALIGN * _ALIGN
+
+def save_compiled(compiled, cache_path, source, parser_version):
+    """
+    Write `compiled` to cache_path atomically (temp file + rename), so
+    concurrent readers never see a half-written cache.
+    """
+    sections = []
+    for name in CompiledCircuit.STRING_FIELDS:
+        items = list(getattr(compiled, name))
+        sections.append(('string', name, '\n'.join(items).encode(), len(items)))
+    for name in CompiledCircuit.ARRAY_FIELDS:
+        array = np.ascontiguousarray(getattr(compiled, name))
+        sections.append(('array', name, array, None))
+
+    # Offsets depend on the header length, so lay out the data relative to
+    # a provisional header size and grow it until the header fits.
+    header_room = 4096
+    while True:
+        header = {
+            'parser_version': parser_version,
+            'source': source,
+            'metadata': {name: getattr(compiled, name) for name in CompiledCircuit.METADATA_FIELDS},
+            'arrays': {},
+            'strings': {},
+        }
+        offset = _aligned(_PREFIX.size + header_room)
+        for kind, name, data, count in sections:
+            raw = data if kind == 'string' else data.view(np.uint8).reshape(-1)
+            if kind == 'string':
+                header['strings'][name] = {'offset': offset, 'nbytes': len(raw), 'count': count,
+                                           'crc32': zlib.crc32(raw)}
+            else:
+                header['arrays'][name] = {'offset': offset, 'dtype': data.dtype.newbyteorder('<').str,
+                                          'shape': list(data.shape), 'crc32': zlib.crc32(raw)}
+            offset = _aligned(offset + len(raw))
+        header['file_size'] = offset
+        header_bytes = json.dumps(header).encode()
+        if len(header_bytes) <= header_room:
+            break
+        header_room = _aligned(len(header_bytes))
+
+    directory = os.path.dirname(os.path.abspath(cache_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.cvc-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header_bytes), zlib.crc32(header_bytes)))
+            f.write(header_bytes)
+            for kind, name, data, _ in sections:
+                entry = header['strings' if kind == 'string' else 'arrays'][name]
+                f.seek(entry['offset'])
+                f.write(data if kind == 'string' else data.astype(entry['dtype'], copy=False).tobytes())
+            f.truncate(header['file_size'])
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+def read_header(cache_path):
+    """ Read and structurally validate the JSON header of a cache file. """
+    try:
+        with open(cache_path, 'rb') as f:
+            prefix = f.read(_PREFIX.size)
+            if len(prefix) != _PREFIX.size:
+                raise CacheError("truncated prefix")
+            magic, version, header_len, header_crc = _PREFIX.unpack(prefix)
+            if magic != MAGIC:
+                raise CacheError("bad magic")
+            if version != FORMAT_VERSION:
+                raise CacheError(f"format version {version} != {FORMAT_VERSION}")
+            header_bytes = f.read(header_len)
+    except OSError as exc:
+        raise CacheError(str(exc)) from exc
+
+    if len(header_bytes) != header_len or zlib.crc32(header_bytes) != header_crc:
+        raise CacheError("corrupt header")
+    try:
+        header = json.loads(header_bytes)
+        file_size = header['file_size']
+    except (ValueError, KeyError, TypeError) as exc:
+        raise CacheError(f"corrupt header: {exc}") from exc
+    if os.path.getsize(cache_path) != file_size:
+        raise CacheError("file size does not match header")
+    return header
+
+def load_compiled(cache_path, netlist_path, parser_version, verify_data=True):
+    """
+    Open a cache file as a CompiledCircuit whose arrays are read-only
+    np.memmap views. Raises CacheError if the file is corrupt or does not
+    match the netlist (content hash) and parser version. The hash is only
+    recomputed when the netlist's size or mtime differ from the recorded
+    ones. The CRC32 of every section is checked too, unless verify_data
+    is False (storage known to be sound: pages are then read lazily).
+    """
+    header = read_header(cache_path)
+    if header['parser_version'] != parser_version:
+        raise CacheError("written by a different parser version")
+
+    recorded = header['source']
+    current = source_fingerprint(netlist_path, with_hash=False)
+    if (current['size'], current['mtime_ns']) != (recorded['size'], recorded['mtime_ns']):
+        if source_fingerprint(netlist_path)['sha256'] != recorded['sha256']:
+            raise CacheError("netlist content changed")
+
+    try:
+        return _open_sections(cache_path, header, verify_data)
+    except (ValueError, KeyError, TypeError) as exc:
+        raise CacheError(f"corrupt section table: {exc}") from exc
+
+def _open_sections(cache_path, header, verify_data):
+    fields = dict(header['metadata'])
+    for name, entry in header['strings'].items():
+        blob = np.memmap(cache_path, dtype=np.uint8, mode='r', offset=entry['offset'],
+                         shape=(entry['nbytes'],)) if entry['nbytes'] else b''
+        if verify_data and zlib.crc32(blob) != entry['crc32']:
+            raise CacheError(f"checksum mismatch in section '{name}'")
+        fields[name] = StringTable(blob, entry['count'])
+    for name, entry in header['arrays'].items():
+        dtype = np.dtype(entry['dtype'])
+        shape = tuple(entry['shape'])
+        if np.prod(shape, dtype=np.int64) == 0:
+            array = np.zeros(shape, dtype=dtype)
+        else:
+            array = np.memmap(cache_path, dtype=dtype, mode='r', offset=entry['offset'], shape=shape)
+        if verify_data and zlib.crc32(array.view(np.uint8).reshape(-1)) != entry['crc32']:
+            raise CacheError(f"checksum mismatch in section '{name}'")
+        fields[name] = array
+
+    return CompiledCircuit(**fields)
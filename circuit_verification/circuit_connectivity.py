@@ -0,0 +1,155 @@
+import numpy as np
+from .circuit_hierarchy import instance_edges
+
+
+class UnionFind:
+    """
+    Array-backed disjoint-set forest over integer node ids.
+    parent[x] <= x always holds: unions link the larger root under the
+    smaller one, so every component's root is its smallest id (ground,
+    id 0, is the root of its own component). Edges are merged in bulk:
+    each round finds the roots of all pending edges, hooks them with
+    np.minimum.at and compresses the touched roots by pointer jumping,
+    so nothing is ever looped over per element in Python.
+    """
+
+    def __init__(self, size=0):
+        self.parent = np.arange(max(size, 1), dtype=np.int64)
+
+    def __len__(self):
+        return len(self.parent)
+
+    def grow(self, size):
+        """ Make room for ids below `size`; new ids start as singletons. """
+        n = len(self.parent)
+        if size > n:
+            capacity = max(size, 2 * n)
+            self.parent = np.concatenate([self.parent, np.arange(n, capacity, dtype=np.int64)])
+
+    def find(self, ids):
+        """ Roots of an array of ids, compressing their paths to point at the root. """
+        ids = np.asarray(ids, dtype=np.int64)
+        parent = self.parent
+        roots = parent[ids]
+        while True:
+            up = parent[roots]
+            if (up == roots).all():
+                break
+            roots = up
+        parent[ids] = roots
+        return roots
+
+    def union(self, a, b):
+        """ Merge the components of every pair (a[k], b[k]). """
+        a = np.asarray(a, dtype=np.int64)
+        b = np.asarray(b, dtype=np.int64)
+        if not len(a):
+            return
+        self.grow(int(max(a.max(), b.max())) + 1)
+        parent = self.parent
+        while True:
+            ra, rb = self.find(a), self.find(b)
+            pending = ra != rb
+            if not pending.any():
+                return
+            a, b = ra[pending], rb[pending]
+            np.minimum.at(parent, np.maximum(a, b), np.minimum(a, b))
+            # Hooked roots only point at other touched roots: jump within them
+            # (repeats are harmless, so no sort to deduplicate)
+            touched = np.concatenate([a, b])
+            while True:
+                up = parent[parent[touched]]
+                if (up == parent[touched]).all():
+                    break
+                parent[touched] = up
+
+    def roots(self, size=None):
+        """ Root of every id below `size` (default: all), fully compressing the forest. """
+        n = len(self.parent) if size is None else size
+        parent = self.parent[:n]
+        while True:
+            up = parent[parent]
+            if (up == parent).all():
+                return parent.copy()
+            parent[:] = up
+
+
+def component_roots(compiled):
+    """ Union-find roots of every node of a CompiledCircuit, from its element arrays. """
+    uf = UnionFind(len(compiled.node_names))
+    block_a, block_b = instance_edges([m.matrix for m in compiled.port_models], compiled.inst_ptr,
+                                      compiled.inst_nodes, compiled.inst_models)
+    uf.union(np.concatenate([compiled.res_node1, compiled.vs_node1, block_a]),
+             np.concatenate([compiled.res_node2, compiled.vs_node2, block_b]))
+    return uf.roots(len(compiled.node_names))
+
+
+class Connectivity:
+    """
+    Connected components of a CompiledCircuit, from the per-node union-find
+    roots (built while parsing, or from the element arrays on first use).
+    A component is floating when it has no path to ground: with only
+    voltage sources and resistors its node voltages are undetermined.
+    When the netlist never references ground, the reserved id 0 is not
+    counted as a node.
+    """
+
+    def __init__(self, compiled, roots=None):
+        self.compiled = compiled
+        self.roots = component_roots(compiled) if roots is None else roots
+        first = 0 if compiled.has_ground else 1
+        # Component number of every node, in order of each component's root
+        unique_roots, labels = np.unique(self.roots[first:], return_inverse=True)
+        self.labels = np.concatenate([np.full(first, -1), labels])
+        self.sizes = np.bincount(labels, minlength=len(unique_roots))
+        self.component_count = len(unique_roots)
+        self.root_ids = unique_roots
+
+        source_nodes = np.concatenate([compiled.vs_node1, compiled.vs_node2])
+        self.has_source = np.zeros(self.component_count, dtype=bool)
+        self.has_source[self.labels[source_nodes[source_nodes >= first]]] = True
+        self.has_ground = np.zeros(self.component_count, dtype=bool)
+        if compiled.has_ground:
+            self.has_ground[self.labels[0]] = True
+
+    @property
+    def is_connected(self):
+        return self.component_count <= 1
+
+    def floating_node_ids(self):
+        """ Ids of all nodes without a path to ground. """
+        first = 0 if self.compiled.has_ground else 1
+        return np.flatnonzero(~self.has_ground[self.labels[first:]]) + first
+
+    def floating_nodes(self):
+        """ Names of all nodes without a path to ground. """
+        names = self.compiled.node_names
+        return [names[i] for i in self.floating_node_ids().tolist()]
+
+    def components(self):
+        """
+        One dict per component, largest first: 'root' (name of its first
+        node), 'size', 'has_ground' and 'has_source'.
+        """
+        names = self.compiled.node_names
+        order = np.argsort(-self.sizes, kind='stable')
+        return [{'root': names[int(self.root_ids[k])],
+                 'size': int(self.sizes[k]),
+                 'has_ground': bool(self.has_ground[k]),
+                 'has_source': bool(self.has_source[k])}
+                for k in order.tolist()]
+
+    def report(self):
+        """
+        Summary dict: 'component_count', 'is_connected', 'components',
+        'floating_nodes', plus the number of components without a ground
+        ('ungrounded_components') or source ('unsourced_components') path.
+        """
+        return {
+            'component_count': self.component_count,
+            'is_connected': self.is_connected,
+            'ungrounded_components': int((~self.has_ground).sum()),
+            'unsourced_components': int((~self.has_source).sum()),
+            'components': self.components(),
+            'floating_nodes': self.floating_nodes(),
+        }
@@ -0,0 +1,234 @@
+import numpy as np
+from scipy.linalg import hadamard
+from .circuit_simulation import DCSolver, LUFactorization, solve_batch_systems
+from . import circuit_profiler
+
+DESIGNS = ('sensitivity', 'full', 'fractional')
+# Largest factor count enumerated by the 'full' design (2^k corners)
+MAX_FULL_FACTORS = 20
+
+
+def corner_design(factors, design='full'):
+    """
+    Two-level design over `factors` varying elements as a (corners,
+    factors) int8 array of -1 (low) / +1 (high) levels. 'full' is every
+    combination, 2^k rows. 'fractional' takes k columns of a Hadamard
+    matrix of the next power of two above k (a resolution III design)
+    plus its fold-over, so main effects are clear of two-factor
+    interactions in 2 * 2^ceil(log2(k + 1)) rows.
+    """
+    if design == 'full':
+        if factors > MAX_FULL_FACTORS:
+            raise ValueError(f"A full-factorial design of {factors} factors has 2^{factors} corners; "
+                             f"use the 'sensitivity' or 'fractional' design above {MAX_FULL_FACTORS}")
+        bits = np.arange(2 ** factors)[:, None] >> np.arange(factors)[None, :] & 1
+        return (2 * bits - 1).astype(np.int8)
+    if design == 'fractional':
+        size = 1 << int(factors).bit_length()
+        half = hadamard(size)[:, 1:factors + 1].astype(np.int8)
+        return np.vstack([half, -half])
+    raise ValueError(f"Unknown corner design '{design}' (choose from {', '.join(DESIGNS)})")
+
+
+class CornerAnalysis:
+    """
+    Worst-case node voltages over two-level tolerance corners of a
+    CircuitAnalysis's circuit.
+
+    Every element with a non-zero spread is one factor with a low and a
+    high level. Resistors default to R (1 -+ tolerance) and grounded
+    voltage sources to V (1 -+ source_tolerance); `tolerances` overrides
+    single elements with a relative tolerance or an absolute (low, high)
+    pair (ohms or volts). Sources whose node a later source also pins
+    have no effect and are not factors.
+
+    run() evaluates a design of corners ('full', 'fractional' or
+    'sensitivity') in vectorized batches: stacked dense solves as in
+    Monte Carlo, or one sparse LU per corner above
+    DCSolver.SPARSE_THRESHOLD unknowns. The 'sensitivity' design prunes
+    the 2^k corners to the ones that can be extreme: with the adjoint
+    sensitivities S of the watched nodes, the maximum of node o is at
+    levels sign(S_o) and its minimum at -sign(S_o), so at most two
+    corners per node (fewer after deduplication) are solved. A node
+    voltage is monotone in every single conductance and linear in the
+    source voltages, so this is exact unless a sensitivity changes sign
+    inside the tolerance box; 'full' checks exhaustively.
+    """
+
+    def __init__(self, analysis, tolerance=0.05, source_tolerance=0.0, tolerances=None, chunk_size=4096):
+        c = analysis.compiled
+        self.analysis = analysis
+        self.chunk_size = chunk_size
+        self.solver = DCSolver(c)
+        self.node_list = list(self.solver.node_list)
+        tolerances = dict(tolerances or {})
+
+        unknown = [name for name in tolerances if name not in c.element_index]
+        if unknown:
+            raise ValueError(f"Tolerances for unknown element(s): {', '.join(unknown)}")
+
+        # Grounded sources and the unknown they pin; the last one per node wins
+        n1, n2 = c.vs_node1.astype(np.int64), c.vs_node2.astype(np.int64)
+        grounded = (n1 == 0) != (n2 == 0)
+        pinned = np.where(n1 == 0, n2, n1) - 1
+        last = {}
+        for k in np.flatnonzero(grounded).tolist():
+            last[int(pinned[k])] = k
+        active = set(last.values())
+
+        names, kinds, indices, low, high = [], [], [], [], []
+        for kind, element_names, values, default in (('R', c.res_names, c.resistances, tolerance),
+                                                     ('V', c.vs_names, c.voltages, source_tolerance)):
+            for k, name in enumerate(element_names):
+                spec = tolerances.get(name, default)
+                if kind == 'V' and k not in active:
+                    if name in tolerances:
+                        raise ValueError(f"Voltage source {name} does not set a node voltage on its own "
+                                         f"(not grounded, or overridden by a later source)")
+                    continue
+                nominal = float(values[k])
+                if isinstance(spec, (tuple, list)):
+                    lo, hi = (float(v) for v in spec)
+                else:
+                    spread = abs(nominal) * float(spec)
+                    lo, hi = nominal - spread, nominal + spread
+                if lo > hi:
+                    raise ValueError(f"Empty tolerance range ({lo:g}, {hi:g}) for {name}")
+                if kind == 'R' and lo <= 0:
+                    raise ValueError(f"Resistor {name} reaches {lo:g} ohm at its low corner")
+                if hi == lo:
+                    continue
+                names.append(name)
+                kinds.append(kind)
+                indices.append(k)
+                low.append(lo)
+                high.append(hi)
+
+        self.factors = names
+        kinds = np.array(kinds)
+        indices = np.array(indices, dtype=np.int64)
+        self._res_cols = np.flatnonzero(kinds == 'R')
+        self._res_index = indices[self._res_cols]
+        self._vs_cols = np.flatnonzero(kinds == 'V')
+        self._vs_rows = pinned[indices[self._vs_cols]]
+        self.low = np.array(low, dtype=float)
+        self.high = np.array(high, dtype=float)
+        self._incidence = None
+        self._fixed = None
+
+    def corner_values(self, signs):
+        """ {factor: value} of one corner given as a row of -1 / +1 levels. """
+        values = np.where(np.asarray(signs) > 0, self.high, self.low)
+        return dict(zip(self.factors, values.tolist()))
+
+    def solve(self, signs):
+        """ Node voltages (corners, n_nodes) ordered as node_list, one row per row of `signs`. """
+        return self._solve(signs)[0]
+
+    def _solve(self, signs):
+        """ (voltages, resistances) of the corners in `signs`. """
+        signs = np.asarray(signs)
+        values = np.where(signs > 0, self.high, self.low)
+        c = self.analysis.compiled
+        resistances = np.broadcast_to(c.resistances, (len(signs), c.resistor_count)).copy()
+        resistances[:, self._res_index] = values[:, self._res_cols]
+        if self._fixed is None:
+            self._fixed = self.solver._fixed_nodes()
+        fixed, I = self._fixed
+        rhs = np.broadcast_to(I, (len(signs), len(I))).copy()
+        rhs[:, self._vs_rows] = values[:, self._vs_cols]
+
+        if not self.solver._use_sparse():
+            if self._incidence is None:
+                self._incidence = self.solver.incidence_matrix()
+            return solve_batch_systems(self._incidence, 1.0 / resistances, fixed, rhs,
+                                       self.solver.instance_matrix()), resistances
+        voltages = np.empty((len(signs), len(self.node_list)))
+        for k in range(len(signs)):
+            G, _ = self.solver.assemble(1.0 / resistances[k])
+            voltages[k] = LUFactorization(G, self.solver.ordering).solve(rhs[k])
+        return voltages, resistances
+
+    def sensitivities(self, rows):
+        """
+        Linearized change of the unknowns `rows` from a factor's nominal
+        value to its high level, (len(rows), factors): adjoint dV/dR for
+        resistors and G^-1 e_r (the pinned row r) for sources, times half
+        the factor's spread.
+        """
+        nodes = [self.node_list[r] for r in rows]
+        S = np.zeros((len(rows), len(self.factors)))
+        if len(self._res_cols):
+            dV_dR = self.analysis.run_sensitivity(nodes, solver=self.solver)['dV_dR']
+            S[:, self._res_cols] = dV_dR[:, self._res_index]
+        if len(self._vs_cols):
+            E = np.zeros((len(self.node_list), len(self._vs_rows)))
+            E[self._vs_rows, np.arange(len(self._vs_rows))] = 1.0
+            S[:, self._vs_cols] = self.solver.factorize().solve(E)[rows]
+        return S * (self.high - self.low) / 2
+
+    def run(self, design='sensitivity', nodes=None, rules=None):
+        """
+        Minimum and maximum of every watched node (default: all unknown
+        nodes) over the corners of `design`; `rules` (a
+        circuit_rules.RuleReport) is updated with every solved corner,
+        numbered as rows of the design. Returns a dict with:
+          'nodes'                   - watched node names (row order)
+          'factors'                 - varying element names (column order)
+          'design', 'corners'       - the design and number of corners solved
+          'nominal'                 - nominal voltage per node
+          'min', 'max'              - worst-case voltage per node
+          'min_corner', 'max_corner' - (nodes, factors) -1 / +1 levels of
+                                      the corner reaching each extreme
+        """
+        index = self.solver.node_index
+        nodes = self.node_list if nodes is None else list(nodes)
+        missing = [node for node in nodes if node not in index]
+        if missing:
+            raise ValueError(f"Unknown node(s): {', '.join(missing)}")
+        rows = np.array([index[node] for node in nodes], dtype=np.int64)
+        k = len(self.factors)
+
+        with circuit_profiler.span('corners', design=design, factors=k, nodes=len(rows)):
+            if design == 'sensitivity' and not k:
+                signs = np.zeros((1, 0), dtype=np.int8)
+            elif design == 'sensitivity':
+                with circuit_profiler.span('corners.prune'):
+                    signs = np.where(self.sensitivities(rows) < 0, -1, 1).astype(np.int8)
+                    signs = np.unique(np.vstack([signs, -signs]), axis=0)
+            else:
+                signs = corner_design(k, design)
+
+            operating_point = self.solver.run_dc_analysis()
+            nominal = np.array([operating_point[node] for node in nodes])
+            low = np.full(len(rows), np.inf)
+            high = np.full(len(rows), -np.inf)
+            low_at = np.zeros(len(rows), dtype=np.int64)
+            high_at = np.zeros(len(rows), dtype=np.int64)
+            with circuit_profiler.span('corners.solve', corners=len(signs)):
+                for start in range(0, len(signs), self.chunk_size):
+                    voltages, resistances = self._solve(signs[start:start + self.chunk_size])
+                    if rules is not None:
+                        rules.update(voltages, resistances, start)
+                    watched = voltages[:, rows]
+                    lo, hi = watched.argmin(axis=0), watched.argmax(axis=0)
+                    columns = np.arange(len(rows))
+                    better = watched[lo, columns] < low
+                    low[better] = watched[lo, columns][better]
+                    low_at[better] = start + lo[better]
+                    better = watched[hi, columns] > high
+                    high[better] = watched[hi, columns][better]
+                    high_at[better] = start + hi[better]
+        circuit_profiler.count('corners', len(signs))
+
+        return {
+            'nodes': nodes,
+            'factors': list(self.factors),
+            'design': design,
+            'corners': len(signs),
+            'nominal': nominal,
+            'min': low,
+            'max': high,
+            'min_corner': signs[low_at],
+            'max_corner': signs[high_at],
+        }
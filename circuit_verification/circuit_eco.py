@@ -0,0 +1,484 @@
+import itertools
+import re
+import time
+import numpy as np
+from .circuit_analysis import CircuitAnalysis
+from .circuit_connectivity import UnionFind
+from .circuit_elements import CompiledCircuit
+from .circuit_parser import CircuitParser, _COMMENT_LINE_RE, _CONTINUATION_RE
+from .circuit_rules import QUANTITIES, RuleSet
+from .circuit_simulation import SolvedCircuit
+from .circuit_verifier import CircuitVerifier
+from . import circuit_profiler
+
+# Node voltage change (V) below which an edit leaves a node's rules alone
+DEFAULT_ATOL = 1e-9
+# Characters compared per C-level slice comparison while diffing netlists
+DIFF_BLOCK = 64 * 1024
+
+# A line starting with '.', after a newline (the text is searched with one prepended)
+_DIRECTIVE_RE = re.compile(r'\n[ \t]*\.')
+
+
+def read_netlist_text(path):
+    """
+    A netlist's text up to '.END', with continuations joined and comment
+    lines dropped the way CircuitParser does, and the (offset, is_start)
+    of its .SUBCKT (True) and .ENDS (False) lines.
+    """
+    with open(path) as f:
+        text = f.read()
+    if '+' in text and _CONTINUATION_RE.search(text):
+        text = _CONTINUATION_RE.sub(' ', _COMMENT_LINE_RE.sub('', text))
+    definitions = []
+    for match in _DIRECTIVE_RE.finditer('\n' + text):
+        start = match.start()
+        stop = text.find('\n', start)
+        tokens = text[start:stop if stop >= 0 else len(text)].split()
+        keyword = tokens[0].upper()
+        if keyword == '.END' and len(tokens) == 1:
+            return text[:start], definitions
+        if keyword in ('.SUBCKT', '.ENDS'):
+            definitions.append((start, keyword == '.SUBCKT'))
+    return text, definitions
+
+
+def _common_length(a, b, reverse=False):
+    """ Length of the common prefix (or suffix) of two strings, by block then bisection. """
+    n = min(len(a), len(b))
+
+    def same(start, stop):
+        if reverse:
+            return a[len(a) - stop:len(a) - start] == b[len(b) - stop:len(b) - start]
+        return a[start:stop] == b[start:stop]
+
+    done = 0
+    while done < n:
+        step = min(DIFF_BLOCK, n - done)
+        if not same(done, done + step):
+            low, high = done, done + step - 1
+            while low < high:
+                mid = (low + high + 1) // 2
+                if same(done, mid):
+                    low = mid
+                else:
+                    high = mid - 1
+            return low
+        done += step
+    return n
+
+
+def diff_region(old, new):
+    """
+    (start, old_stop, new_stop) of the edited whole lines between two
+    netlist texts: old[:start] == new[:start] and old[old_stop:] ==
+    new[new_stop:]. Unchanged stretches are compared as string slices,
+    so they cost no Python work per line.
+    """
+    start = _common_length(old, new)
+    start = old.rfind('\n', 0, start) + 1
+    suffix = min(_common_length(old, new, reverse=True), min(len(old), len(new)) - start)
+    stop = old.find('\n', len(old) - suffix)
+    if stop < 0:
+        return start, len(old), len(new)
+    return start, stop, stop + len(new) - len(old)
+
+
+class _EditedLines:
+    """ R and V lines of an edited region, through CircuitParser._add_line's builder interface. """
+
+    def __init__(self):
+        self.elements = {}
+        self.duplicate = False
+
+    def add_resistor(self, name, node1, node2, value):
+        self._add(name, ('R', name, node1, node2, value))
+
+    def add_voltage_source(self, name, node1, node2, value):
+        self._add(name, ('V', name, node1, node2, value))
+
+    def _add(self, name, spec):
+        self.duplicate |= name in self.elements
+        self.elements[name] = spec
+
+
+def patch_compiled(c, values, drop=(), add=()):
+    """
+    A new CompiledCircuit: `c` with element `values` ({name: resistance
+    or source voltage}) set, the elements named in `drop` removed and the
+    ('R' | 'V', name, node1, node2, value) specs in `add` appended. Nodes
+    left without elements are removed. Only the touched entries are
+    written; without added or removed elements the name lists, node
+    arrays and connectivity are shared with `c`. Returns the circuit and
+    whether every node kept its id.
+    """
+    index = c.element_index
+    resistances = np.array(c.resistances, dtype=float)
+    conductances = np.array(c.conductances, dtype=float)
+    voltages = np.array(c.voltages, dtype=float)
+    for name, value in values.items():
+        kind, k = index[name]
+        if kind == 'R':
+            resistances[k], conductances[k] = value, 1.0 / value
+        else:
+            voltages[k] = value
+    instances = dict(inst_names=c.inst_names, inst_ptr=c.inst_ptr, inst_models=c.inst_models,
+                     model_names=c.model_names, model_ports=c.model_ports, model_values=c.model_values)
+
+    if not drop and not add:
+        patched = CompiledCircuit(c.node_names, c.has_ground, c.res_names, c.res_node1, c.res_node2,
+                                  resistances, c.vs_names, c.vs_node1, c.vs_node2, voltages,
+                                  conductances=conductances, node_ids=c._node_ids, dc_sweeps=c.dc_sweeps,
+                                  inst_nodes=c.inst_nodes, **instances)
+        # Same structure: the element index and components carry over
+        patched._element_index = index
+        patched._connectivity = c.connectivity
+        patched._port_models = c._port_models
+        return patched, True
+
+    node_names, node_ids = c.node_names, c.node_ids
+    fresh = [node for node in dict.fromkeys(n for spec in add for n in spec[2:4]) if node not in node_ids]
+    if fresh:
+        node_names = list(node_names) + fresh
+        node_ids = dict(node_ids)
+        node_ids.update((node, len(c.node_names) + k) for k, node in enumerate(fresh))
+
+    res_keep = np.ones(c.resistor_count, dtype=bool)
+    vs_keep = np.ones(c.voltage_source_count, dtype=bool)
+    for name in drop:
+        kind, k = index[name]
+        (res_keep if kind == 'R' else vs_keep)[k] = False
+
+    def columns(kind, names, node1, node2, values, keep):
+        specs = [spec for spec in add if spec[0] == kind]
+        kept = list(names) if keep.all() else list(itertools.compress(names, keep.tolist()))
+        ids = np.array([[node_ids[s[2]], node_ids[s[3]]] for s in specs], dtype=node1.dtype).reshape(-1, 2)
+        return (kept + [s[1] for s in specs],
+                np.concatenate([node1[keep], ids[:, 0]]),
+                np.concatenate([node2[keep], ids[:, 1]]),
+                np.concatenate([values[keep], [s[4] for s in specs]]))
+
+    res_names, res_node1, res_node2, resistances = columns('R', c.res_names, c.res_node1, c.res_node2,
+                                                           resistances, res_keep)
+    conductances = np.concatenate([conductances[res_keep], 1.0 / resistances[int(res_keep.sum()):]])
+    vs_names, vs_node1, vs_node2, voltages = columns('V', c.vs_names, c.vs_node1, c.vs_node2, voltages, vs_keep)
+
+    n = len(node_names)
+    used = np.zeros(n, dtype=bool)
+    for ids in (res_node1, res_node2, vs_node1, vs_node2, c.inst_nodes):
+        used[ids] = True
+    has_ground = bool(used[0])
+    used[0] = True
+    inst_nodes = c.inst_nodes
+    roots = None
+    if not used.all():
+        # Compact the ids of the remaining nodes (first-appearance order is kept)
+        remap = (np.cumsum(used) - 1).astype(res_node1.dtype)
+        node_names = list(itertools.compress(node_names, used.tolist()))
+        node_ids = None
+        res_node1, res_node2 = remap[res_node1], remap[res_node2]
+        vs_node1, vs_node2 = remap[vs_node1], remap[vs_node2]
+        inst_nodes = remap[inst_nodes]
+    elif not drop:
+        # Additions only merge components: union the new edges into the old roots
+        uf = UnionFind(n)
+        uf.parent[:len(c.node_names)] = c.connectivity.roots
+        uf.union(np.concatenate([res_node1[int(res_keep.sum()):], vs_node1[int(vs_keep.sum()):]]),
+                 np.concatenate([res_node2[int(res_keep.sum()):], vs_node2[int(vs_keep.sum()):]]))
+        roots = uf.roots(n)
+
+    if drop:
+        index = {}
+        for kind, names in (('R', res_names), ('V', vs_names), ('X', c.inst_names)):
+            index.update(zip(names, zip(itertools.repeat(kind), range(len(names)))))
+    else:
+        index = dict(index)
+        counts = {'R': c.resistor_count, 'V': c.voltage_source_count}
+        for kind, name, *_ in add:
+            index[name] = (kind, counts[kind])
+            counts[kind] += 1
+
+    patched = CompiledCircuit(node_names, has_ground, res_names, res_node1, res_node2, resistances,
+                              vs_names, vs_node1, vs_node2, voltages, conductances=conductances,
+                              node_ids=node_ids, dc_sweeps=c.dc_sweeps, component_roots=roots,
+                              inst_nodes=inst_nodes, **instances)
+    patched._element_index = index
+    patched._port_models = c._port_models
+    return patched, not fresh and used.all()
+
+
+class IncrementalVerifier:
+    """
+    Verification that follows a netlist through small edits (ECO mode).
+
+    reverify() diffs the new netlist text against the last one (common
+    prefix and suffix, compared in blocks), parses only the edited lines
+    and patches the compiled arrays. Value edits, and
+    resistors added or removed between existing nodes, become
+    conductance changes on node pairs that SolvedCircuit applies to the
+    kept factorization as a low-rank update; source value edits only
+    move RHS rows. G is refactorized at the current circuit once the
+    pending changes exceed SolvedCircuit.MAX_RANK, become ill-conditioned,
+    or nodes or voltage sources come and go. Added elements are merged
+    into the union-find components; removals recompute them.
+
+    Only rules touching a node whose voltage moved by more than `atol`,
+    or an element that was edited or whose current changed, are
+    re-checked; the others keep their results. Added and removed
+    resistors are renumbered into the compiled rules
+    (RuleEngine.with_resistors); edits that add or remove nodes or
+    voltage sources compile and check every rule again. Anything else
+    (.SUBCKT bodies, X instances, directives, duplicate names) falls back
+    to a full parse.
+    """
+
+    def __init__(self, netlist_path, rules=None, method='auto', atol=DEFAULT_ATOL):
+        self.rules = RuleSet.load(rules) if isinstance(rules, str) else rules
+        self.method = method
+        self.atol = atol
+        self.rebuilds = 0
+        self.refactorizations = 0
+        self._rebuild(netlist_path, read_netlist_text(netlist_path))
+
+    def node_voltages(self):
+        """ Node name -> voltage of the current circuit. """
+        result = dict(zip(self.compiled.node_names[1:], self.voltages.tolist()))
+        result['0'] = 0.0
+        return result
+
+    def reverify(self, netlist_path=None):
+        """
+        Re-verify after the netlist (or `netlist_path`, an edited copy)
+        changed. Returns a dict with:
+          'mode'           - 'unchanged', 'incremental' or 'rebuild'
+          'reason'         - why a full parse was needed (else None)
+          'values', 'added', 'removed' - names of the edited elements
+          'rank'           - node-pair changes pending on the factorization
+          'refactorized'   - whether G was factorized again
+          'changed_nodes'  - nodes whose voltage moved by more than atol
+                             (None when the node set changed)
+          'rules_checked'  - names of the re-checked rules
+          'verification'   - the CircuitVerifier checks of the new circuit
+          'seconds'        - elapsed time
+        """
+        start = time.perf_counter()
+        path = self.path if netlist_path is None else netlist_path
+        with circuit_profiler.span('eco', netlist=path):
+            netlist = read_netlist_text(path)
+            edit = self._diff(path, *netlist)
+            if isinstance(edit, str):
+                result = self._rebuild(path, netlist, edit)
+            else:
+                result = self._apply(*edit)
+                self.path, (self._text, self._definitions) = path, netlist
+        result['seconds'] = time.perf_counter() - start
+        circuit_profiler.count('eco_seconds', result['seconds'])
+        return result
+
+    def _rebuild(self, path, netlist, reason=None):
+        """ Parse, factorize, solve and check from scratch. """
+        c = CircuitParser(path).parse_compiled()
+        self._refactorize(c)
+        self.path = path
+        self._text, self._definitions = netlist
+        self._unique_names = len(c.element_index) == c.resistor_count + c.voltage_source_count + c.instance_count
+        self.voltages = self.solved._x.copy()
+        self.engine = self.rules.compile(c) if self.rules is not None else None
+        self.rule_report = self.engine.evaluate(self.voltages) if self.engine is not None else None
+        self.verification = self._verify()
+        self.rebuilds += 1
+        return self._result('rebuild', reason=reason, rules_checked=self._rule_names())
+
+    def _refactorize(self, compiled):
+        """ Factorize G at `compiled`, which becomes the current circuit with no changes pending. """
+        self.solved = SolvedCircuit(compiled, method=self.method)
+        self.compiled = compiled
+        self._edges = {}
+        self.refactorizations += 1
+
+    def _diff(self, path, text, definitions):
+        """
+        (values, drop, add) for the elements edited between the last and
+        the new netlist text, or the reason a full parse is needed.
+        """
+        if text == self._text:
+            return {}, [], []
+        if not self._unique_names:
+            return "duplicate element names"
+        start, old_stop, new_stop = diff_region(self._text, text)
+        # Unchanged prefix, so the same definitions are open in both texts
+        if sum(1 if opens else -1 for offset, opens in definitions if offset < start) > 0:
+            return "edit inside a .SUBCKT definition"
+
+        parser = CircuitParser(path)
+        parser._skipped = {}
+        regions = []
+        for region in (self._text[start:old_stop], text[start:new_stop]):
+            edited = _EditedLines()
+            for line in region.split('\n'):
+                line = line.strip()
+                if not line or line[0] == '*':
+                    continue
+                if line[0] in '.+Xx':
+                    return f"edited line '{line.split()[0]}'"
+                if line[0] in 'RrVv':
+                    parser._add_line(edited, line)
+            if edited.duplicate:
+                return "duplicate element names"
+            regions.append(edited.elements)
+        old, new = regions
+
+        index = self.compiled.element_index
+        values, drop, add = {}, [], []
+        for name, spec in old.items():
+            if name not in index:
+                return f"unknown element '{name}'"
+            if name not in new:
+                drop.append(name)
+            elif new[name][:4] != spec[:4]:
+                drop.append(name)
+                add.append(new[name])
+            elif new[name][4] != spec[4]:
+                values[name] = new[name][4]
+        for name, spec in new.items():
+            if name not in old:
+                if name in index:
+                    return "duplicate element names"
+                add.append(spec)
+        return values, drop, add
+
+    def _apply(self, values, drop, add):
+        """ Patch the circuit, update the solution and re-check the touched rules. """
+        edited = dict(values=sorted(values), added=sorted(s[1] for s in add), removed=sorted(drop))
+        if not values and not drop and not add:
+            return self._result('unchanged', **edited)
+        old = self.compiled
+        compiled, same_ids = patch_compiled(old, values, drop, add)
+        refactorized = False
+        with circuit_profiler.span('eco.solve', values=len(values), added=len(add), removed=len(drop)):
+            sources_moved = any(spec[0] == 'V' for spec in add) or any(old.element_index[n][0] == 'V' for n in drop)
+            if same_ids and not sources_moved:
+                edges = dict(self._edges)
+                self._add_edges(edges, old, values, drop, add)
+                a, b = (np.array([key[k] for key in edges], dtype=np.int64) for k in (0, 1))
+                V = self.solved._solve_edges(a, b, np.array(list(edges.values())), compiled.voltages)
+            else:
+                V = None
+            if V is None:
+                self._refactorize(compiled)
+                V, refactorized = self.solved._x.copy(), True
+            else:
+                self.compiled, self._edges = compiled, edges
+
+        changed_nodes = None
+        if same_ids:
+            moved = np.abs(V - self.voltages) > self.atol
+            changed_nodes = int(moved.sum())
+        self.voltages = V
+        if self.engine is None:
+            checked = []
+        elif not same_ids or sources_moved:
+            self.engine = self.rules.compile(compiled)
+            self.rule_report = self.engine.evaluate(V)
+            checked = self._rule_names()
+        else:
+            # Rules that lose a removed resistor are re-checked too
+            keep = np.ones(old.resistor_count, dtype=bool)
+            keep[[old.element_index[name][1] for name in drop]] = False
+            lost = {rule.name for rule in self.engine.rules
+                    if rule.code is None and QUANTITIES[rule.quantity] == 'resistor' and not keep[rule.columns].all()}
+            added = [spec[1] for spec in add]
+            removed = ~keep
+            branches = np.concatenate([old.res_node1[removed], old.res_node2[removed]]).astype(np.int64) - 1
+            if drop or add:
+                self.engine = self.engine.with_resistors(compiled, keep, added)
+            checked = self._recheck_rules(moved, list(values) + added, branches, lost)
+        self.verification = self._verify()
+        return self._result('incremental', refactorized=refactorized, changed_nodes=changed_nodes,
+                            rules_checked=checked, **edited)
+
+    def _add_edges(self, edges, c, values, drop, add):
+        """ Add the conductance changes of an edit to `edges` ({(a, b): dg} over unknown nodes). """
+        index = c.element_index
+        changes = []
+        for name, value in values.items():
+            kind, k = index[name]
+            if kind == 'R':
+                changes.append((c.res_node1[k], c.res_node2[k], 1.0 / value - c.conductances[k]))
+        for name in drop:
+            k = index[name][1]
+            changes.append((c.res_node1[k], c.res_node2[k], -c.conductances[k]))
+        for _, _, node1, node2, value in add:
+            changes.append((c.node_ids[node1], c.node_ids[node2], 1.0 / value))
+        for node1, node2, dg in changes:
+            a, b = sorted((int(node1) - 1, int(node2) - 1))
+            total = edges.get((a, b), 0.0) + dg
+            # Back to the factorized value (up to rounding): nothing pending
+            if abs(total) <= 1e-12 * abs(dg):
+                edges.pop((a, b), None)
+            else:
+                edges[(a, b)] = total
+
+    def _recheck_rules(self, moved, edited, branches, forced):
+        """
+        Re-check the rules over nodes that moved, resistors with a moved
+        terminal and `edited` elements, sources whose current or voltage
+        may have changed (also through removed resistors at the
+        `branches` nodes), and the `forced` ones; the others keep their
+        last results.
+        """
+        e = self.engine
+        e.compiled = self.compiled
+        node = np.append(moved, False)  # index -1 (ground) never moves
+        resistor = node[e.res_a] | node[e.res_b]
+        source = node[e.source_node]
+        for name in edited:
+            if name in e.names['resistor']:
+                resistor[e.names['resistor'][name]] = True
+            else:
+                source[e.names['source'][name]] = True
+        # A grounded source's current is the sum over the branches at its node
+        at_node = np.zeros(len(node), dtype=bool)
+        at_node[branches] = True
+        at_node[e.res_a[resistor]] = True
+        at_node[e.res_b[resistor]] = True
+        source |= at_node[e.source_node]
+        if e.instances is not None and moved.any():
+            source[:] = True
+        source &= e.source_node >= 0
+        masks = {'node': moved, 'resistor': resistor, 'source': source}
+
+        checked = [rule.name for rule in e.rules if rule.code is not None or rule.name in forced
+                   or masks[QUANTITIES[rule.quantity]][rule.columns].any()]
+        report = e.report()
+        for name, entry in self.rule_report.rules.items():
+            if name not in checked:
+                report.rules[name] = entry
+        self.rule_report = e.evaluate(self.voltages, report=report, only=set(checked))
+        return checked
+
+    def _rule_names(self):
+        return [rule.name for rule in self.engine.rules] if self.engine is not None else []
+
+    def _verify(self):
+        analysis_results = CircuitAnalysis(self.compiled).run_analysis()
+        # Rules are checked here (only the touched ones), not by the verifier
+        checks = CircuitVerifier(self.compiled, None, analysis_results).verify()
+        if self.rule_report is not None:
+            checks['rules_passed'] = self.rule_report.passed
+        return checks
+
+    def _result(self, mode, reason=None, values=(), added=(), removed=(), refactorized=None,
+                changed_nodes=None, rules_checked=()):
+        return {
+            'mode': mode,
+            'reason': reason,
+            'values': list(values),
+            'added': list(added),
+            'removed': list(removed),
+            'rank': len(self._edges),
+            'refactorized': mode == 'rebuild' if refactorized is None else refactorized,
+            'changed_nodes': 0 if mode == 'unchanged' else changed_nodes,
+            'rules_checked': list(rules_checked),
+            'verification': self.verification,
+        }
@@ -46,11 +46,20 @@
 
 #     def __repr__(self):
 #         return f"{self.name}(V={self.voltage}V, nodes=({self.node1}, {self.node2}))"
+from array import array
+from itertools import count
+import numpy as np
+from .circuit_connectivity import Connectivity, UnionFind
+from .circuit_hierarchy import PortModel, instance_edges, reduce_subcircuit
+
+GROUND = '0'
+
 class Circuit:
     """ Holds circuit elements (resistors, voltage sources, etc.). """
 
     def __init__(self):
         self.elements = []
+        self.dc_sweeps = []
 
     def add_element(self, element):
         self.elements.append(element)
@@ -59,8 +68,11 @@ class Circuit:
         """ Return a set of all unique node names. """
         nodes = set()
         for elem in self.elements:
-            nodes.add(elem.node1)
-            nodes.add(elem.node2)
+            if isinstance(elem, SubcircuitInstance):
+                nodes.update(elem.nodes)
+            else:
+                nodes.add(elem.node1)
+                nodes.add(elem.node2)
         return nodes
 
     def get_resistors(self):
@@ -71,12 +83,34 @@ class Circuit:
         """ Return a list of VoltageSource objects """
         return [e for e in self.elements if isinstance(e, VoltageSource)]
 
+    def get_subcircuit_instances(self):
+        """ Return a list of SubcircuitInstance objects """
+        return [e for e in self.elements if isinstance(e, SubcircuitInstance)]
+
+    def compile(self):
+        """
+        Return a CompiledCircuit snapshot of the current elements.
+        Later edits to this Circuit are not reflected in the snapshot.
+        """
+        builder = CircuitBuilder()
+        builder.dc_sweeps = list(self.dc_sweeps)
+        for elem in self.elements:
+            if isinstance(elem, Resistor):
+                builder.add_resistor(elem.name, elem.node1, elem.node2, elem.resistance)
+            elif isinstance(elem, VoltageSource):
+                builder.add_voltage_source(elem.name, elem.node1, elem.node2, elem.voltage)
+            elif isinstance(elem, SubcircuitInstance):
+                builder.add_instance(elem.name, elem.subckt, elem.nodes, elem.model)
+        return builder.build()
+
     def __repr__(self):
         return f"Circuit({self.elements})"
 
 
 class CircuitElement:
     """ Base class for any circuit element. """
+    __slots__ = ('name', 'node1', 'node2')
+
     def __init__(self, name, node1, node2):
         self.name = name
         self.node1 = node1
@@ -87,6 +121,8 @@ class CircuitElement:
 
 
 class Resistor(CircuitElement):
+    __slots__ = ('resistance',)
+
     def __init__(self, name, node1, node2, resistance):
         super().__init__(name, node1, node2)
         self.resistance = resistance
@@ -96,9 +132,396 @@ class Resistor(CircuitElement):
 
 
 class VoltageSource(CircuitElement):
+    __slots__ = ('voltage',)
+
     def __init__(self, name, node1, node2, voltage):
         super().__init__(name, node1, node2)
         self.voltage = voltage
 
     def __repr__(self):
         return f"{self.name}(V={self.voltage}V, nodes=({self.node1}, {self.node2}))"
+
+
+class SubcircuitInstance(CircuitElement):
+    """
+    X instance of a .SUBCKT, connected to `nodes` (one per port) and
+    represented by the subcircuit's Kron-reduced PortModel.
+    node1/node2 are its first and last node.
+    """
+    __slots__ = ('nodes', 'subckt', 'model')
+
+    def __init__(self, name, nodes, subckt, model):
+        super().__init__(name, nodes[0], nodes[-1])
+        self.nodes = list(nodes)
+        self.subckt = subckt
+        self.model = model
+
+    def __repr__(self):
+        return f"{self.name}({self.subckt}, nodes={tuple(self.nodes)})"
+
+
+class CircuitBuilder:
+    """
+    Incrementally builds a CompiledCircuit.
+    Node names are interned into integer ids as elements are added (ground
+    '0' is always id 0) and element data goes into growable typed arrays,
+    so no per-element Python objects are kept. X instances only record
+    their subcircuit name and nodes; each subcircuit used is reduced to a
+    PortModel once, in build(), when all .SUBCKT definitions are known.
+    update_connectivity()
+    merges the nodes of newly added elements into a union-find, so the
+    connected components are known as soon as the circuit is built.
+    """
+
+    def __init__(self):
+        # Interning hands out provisional ids from a running counter, so a
+        # whole list can be interned in one C-level map(setdefault, ...)
+        # pass; build() compacts them to 0..n-1 in first-appearance order.
+        self.node_ids = {GROUND: 0}
+        self._next_id = count(1)
+        self.res_names = []
+        self.res_node1 = array('q')
+        self.res_node2 = array('q')
+        self.resistances = array('d')
+        self.vs_names = []
+        self.vs_node1 = array('q')
+        self.vs_node2 = array('q')
+        self.voltages = array('d')
+        self.dc_sweeps = []
+        self.definitions = {}
+        self.port_models = {}
+        self.inst_names = []
+        self.inst_subckts = []
+        self.inst_ptr = array('q', [0])
+        self.inst_nodes = array('q')
+        self.connectivity = UnionFind()
+        self._connected = (0, 0)
+
+    def intern_node(self, name):
+        """ Return the provisional id of a node name, assigning a new one if needed. """
+        return self.node_ids.setdefault(name, next(self._next_id))
+
+    def intern_nodes(self, names):
+        """ Bulk intern_node: returns the list of provisional ids for a list of names. """
+        return list(map(self.node_ids.setdefault, names, self._next_id))
+
+    def add_resistor(self, name, node1, node2, resistance):
+        self.res_names.append(name)
+        self.res_node1.append(self.intern_node(node1))
+        self.res_node2.append(self.intern_node(node2))
+        self.resistances.append(resistance)
+
+    def add_resistors(self, names, node1, node2, resistances):
+        """ Bulk add_resistor from parallel sequences (resistances may be an ndarray). """
+        self.res_names.extend(names)
+        self.res_node1.extend(self.intern_nodes(node1))
+        self.res_node2.extend(self.intern_nodes(node2))
+        self.resistances.frombytes(np.asarray(resistances, dtype=np.float64).tobytes())
+
+    def add_voltage_source(self, name, node1, node2, voltage):
+        self.vs_names.append(name)
+        self.vs_node1.append(self.intern_node(node1))
+        self.vs_node2.append(self.intern_node(node2))
+        self.voltages.append(voltage)
+
+    def add_subcircuit(self, definition):
+        """ Register a circuit_hierarchy.SubcircuitDefinition. """
+        if definition.name in self.definitions:
+            raise ValueError(f"Subcircuit {definition.name} is defined twice")
+        self.definitions[definition.name] = definition
+
+    def add_instance(self, name, subckt, nodes, model=None):
+        """ Add an X instance; `model` supplies the PortModel directly. """
+        if model is not None:
+            self.port_models[subckt] = model
+        self.inst_names.append(name)
+        self.inst_subckts.append(subckt)
+        self.inst_nodes.extend(self.intern_nodes(nodes))
+        self.inst_ptr.append(len(self.inst_nodes))
+
+    def add_dc_sweep(self, source, start, stop, step, source2=None, start2=None, stop2=None, step2=None):
+        sweep = {'source': source, 'start': start, 'stop': stop, 'step': step}
+        if source2 is not None:
+            sweep.update(source2=source2, start2=start2, stop2=stop2, step2=step2)
+        self.dc_sweeps.append(sweep)
+
+    def update_connectivity(self):
+        """ Union the nodes of every element added since the last call. """
+        r, v = self._connected
+        self.connectivity.union(
+            np.concatenate([np.frombuffer(self.res_node1, dtype=np.int64)[r:],
+                            np.frombuffer(self.vs_node1, dtype=np.int64)[v:]]),
+            np.concatenate([np.frombuffer(self.res_node2, dtype=np.int64)[r:],
+                            np.frombuffer(self.vs_node2, dtype=np.int64)[v:]]))
+        self._connected = (len(self.res_node1), len(self.vs_node1))
+
+    def build(self):
+        node_names = list(self.node_ids)
+        provisional = np.fromiter(self.node_ids.values(), dtype=np.int64, count=len(node_names))
+        self.update_connectivity()
+        self.connectivity.grow(int(provisional.max()) + 1)
+        # Provisional ids increase with first appearance, as does dict order
+        remap = np.zeros(int(provisional.max()) + 1, dtype=np.int32)
+        remap[provisional] = np.arange(len(node_names), dtype=np.int32)
+
+        def compact(ids):
+            return remap[np.frombuffer(ids, dtype=np.int64)]
+
+        # One port model per subcircuit in use, in order of first use
+        model_index = {}
+        for subckt in self.inst_subckts:
+            model_index.setdefault(subckt, len(model_index))
+        models = [self._port_model(subckt) for subckt in model_index]
+        inst_models = np.array([model_index[s] for s in self.inst_subckts], dtype=np.int32)
+        inst_ptr = np.frombuffer(self.inst_ptr, dtype=np.int64).copy()
+        for name, subckt, width in zip(self.inst_names, self.inst_subckts, np.diff(inst_ptr).tolist()):
+            ports = len(models[model_index[subckt]].ports)
+            if width != ports:
+                raise ValueError(f"Instance {name}: {width} nodes for {ports} ports of {subckt}")
+        block_a, block_b = instance_edges([m.matrix for m in models], inst_ptr,
+                                          np.frombuffer(self.inst_nodes, dtype=np.int64), inst_models)
+        self.connectivity.union(block_a, block_b)
+
+        res_node1, res_node2 = compact(self.res_node1), compact(self.res_node2)
+        vs_node1, vs_node2 = compact(self.vs_node1), compact(self.vs_node2)
+        inst_nodes = compact(self.inst_nodes)
+        has_ground = any((ids == 0).any() for ids in (res_node1, res_node2, vs_node1, vs_node2,
+                                                         inst_nodes, block_b))
+        # A component's root is its smallest provisional id, i.e. its first node
+        roots = remap[self.connectivity.find(provisional)]
+        return CompiledCircuit(
+            node_names=node_names,
+            has_ground=bool(has_ground),
+            res_names=self.res_names,
+            res_node1=res_node1,
+            res_node2=res_node2,
+            resistances=np.frombuffer(self.resistances, dtype=np.float64),
+            vs_names=self.vs_names,
+            vs_node1=vs_node1,
+            vs_node2=vs_node2,
+            voltages=np.frombuffer(self.voltages, dtype=np.float64),
+            dc_sweeps=self.dc_sweeps,
+            component_roots=roots,
+            inst_names=self.inst_names,
+            inst_ptr=inst_ptr,
+            inst_nodes=inst_nodes,
+            inst_models=inst_models,
+            model_names=list(model_index),
+            model_ports=[' '.join(m.ports) for m in models],
+            model_values=np.concatenate([np.zeros(0)] + [m.matrix.ravel() for m in models]),
+        )
+
+    def _port_model(self, subckt):
+        if subckt not in self.port_models:
+            self.port_models[subckt] = reduce_subcircuit(subckt, self.definitions)
+        return self.port_models[subckt]
+
+
+class CompiledCircuit:
+    """
+    Array-backed, read-only circuit representation.
+      - node_names[i] is the name of node id i; id 0 is always ground '0'.
+      - Resistors and voltage sources are stored column-wise: name lists,
+        int32 node-id arrays and float64 value arrays (resistances,
+        conductances, voltages).
+      - element_index maps an element name to ('R' or 'V', index).
+      - X instances: inst_nodes[inst_ptr[i]:inst_ptr[i + 1]] are the port
+        nodes of instance i, which uses port model inst_models[i]. Model m
+        is subcircuit model_names[m], with its space-separated port names
+        in model_ports[m] and its k x k matrix stored row-major, models
+        back to back, in model_values.
+      - dc_sweeps lists the netlist's .DC analysis directives.
+      - connectivity is a circuit_connectivity.Connectivity over the nodes.
+    Offers the same query methods as Circuit, so it can be passed anywhere
+    a Circuit is expected; `elements` yields lightweight views.
+    """
+
+    # Fields persisted by circuit_cache, by storage kind
+    ARRAY_FIELDS = ('res_node1', 'res_node2', 'resistances', 'conductances',
+                    'vs_node1', 'vs_node2', 'voltages',
+                    'inst_ptr', 'inst_nodes', 'inst_models', 'model_values')
+    STRING_FIELDS = ('node_names', 'res_names', 'vs_names', 'inst_names', 'model_names', 'model_ports')
+    METADATA_FIELDS = ('has_ground', 'dc_sweeps')
+
+    def __init__(self, node_names, has_ground, res_names, res_node1, res_node2,
+                 resistances, vs_names, vs_node1, vs_node2, voltages,
+                 conductances=None, node_ids=None, dc_sweeps=None, component_roots=None,
+                 inst_names=(), inst_ptr=None, inst_nodes=None, inst_models=None,
+                 model_names=(), model_ports=(), model_values=None):
+        self.node_names = node_names
+        self.has_ground = has_ground
+        # .DC directives: dicts with 'source', 'start', 'stop', 'step' and
+        # optionally 'source2', 'start2', 'stop2', 'step2'
+        self.dc_sweeps = dc_sweeps or []
+        self.res_names = res_names
+        self.res_node1 = res_node1
+        self.res_node2 = res_node2
+        self.resistances = resistances
+        self.conductances = 1.0 / resistances if conductances is None else conductances
+        self.vs_names = vs_names
+        self.vs_node1 = vs_node1
+        self.vs_node2 = vs_node2
+        self.voltages = voltages
+        self.inst_names = inst_names
+        self.inst_ptr = np.zeros(1, dtype=np.int64) if inst_ptr is None else inst_ptr
+        self.inst_nodes = np.zeros(0, dtype=np.int32) if inst_nodes is None else inst_nodes
+        self.inst_models = np.zeros(0, dtype=np.int32) if inst_models is None else inst_models
+        self.model_names = model_names
+        self.model_ports = model_ports
+        self.model_values = np.zeros(0) if model_values is None else model_values
+        self._port_models = None
+        self._node_ids = node_ids
+        self._element_index = None
+        self._component_roots = component_roots
+        self._connectivity = None
+
+    @property
+    def node_ids(self):
+        """ node name -> id, built on first use. """
+        if self._node_ids is None:
+            self._node_ids = {name: i for i, name in enumerate(self.node_names)}
+        return self._node_ids
+
+    @property
+    def connectivity(self):
+        """ Connected components, from the parser's union-find or built on first use. """
+        if self._connectivity is None:
+            self._connectivity = Connectivity(self, self._component_roots)
+        return self._connectivity
+
+    @property
+    def element_index(self):
+        """ element name -> ('R' | 'V', index), built on first use. """
+        if self._element_index is None:
+            index = {name: ('R', i) for i, name in enumerate(self.res_names)}
+            index.update((name, ('V', i)) for i, name in enumerate(self.vs_names))
+            index.update((name, ('X', i)) for i, name in enumerate(self.inst_names))
+            self._element_index = index
+        return self._element_index
+
+    @property
+    def node_count(self):
+        """ Number of distinct nodes referenced by elements (ground included if used). """
+        return len(self.node_names) - (0 if self.has_ground else 1)
+
+    @property
+    def resistor_count(self):
+        return len(self.res_names)
+
+    @property
+    def voltage_source_count(self):
+        return len(self.vs_names)
+
+    @property
+    def instance_count(self):
+        return len(self.inst_names)
+
+    @property
+    def port_models(self):
+        """ PortModel of every model index, split out of model_values on first use. """
+        if self._port_models is None:
+            models, offset = [], 0
+            for name, ports in zip(self.model_names, self.model_ports):
+                ports = ports.split()
+                k = len(ports)
+                matrix = np.asarray(self.model_values[offset:offset + k * k]).reshape(k, k)
+                models.append(PortModel(name, ports, matrix))
+                offset += k * k
+            self._port_models = models
+        return self._port_models
+
+    def compile(self):
+        return self
+
+    def get_all_nodes(self):
+        """ Return a set of all unique node names. """
+        nodes = set(self.node_names)
+        if not self.has_ground:
+            nodes.discard(GROUND)
+        return nodes
+
+    def get_resistors(self):
+        return [ResistorView(self, i) for i in range(self.resistor_count)]
+
+    def get_voltage_sources(self):
+        return [VoltageSourceView(self, i) for i in range(self.voltage_source_count)]
+
+    def get_subcircuit_instances(self):
+        models = self.port_models
+        instances = []
+        for i, name in enumerate(self.inst_names):
+            ids = self.inst_nodes[self.inst_ptr[i]:self.inst_ptr[i + 1]].tolist()
+            model = models[self.inst_models[i]]
+            instances.append(SubcircuitInstance(name, [self.node_names[k] for k in ids], model.name, model))
+        return instances
+
+    @property
+    def elements(self):
+        return self.get_voltage_sources() + self.get_resistors() + self.get_subcircuit_instances()
+
+    def to_circuit(self):
+        """ Materialize a mutable object-based Circuit. """
+        circuit = Circuit()
+        circuit.dc_sweeps = list(self.dc_sweeps)
+        for view in self.elements:
+            if isinstance(view, Resistor):
+                circuit.add_element(Resistor(view.name, view.node1, view.node2, view.resistance))
+            elif isinstance(view, VoltageSource):
+                circuit.add_element(VoltageSource(view.name, view.node1, view.node2, view.voltage))
+            else:
+                circuit.add_element(view)
+        return circuit
+
+    def __repr__(self):
+        return (f"CompiledCircuit(nodes={self.node_count}, resistors={self.resistor_count}, "
+                f"voltage_sources={self.voltage_source_count}, instances={self.instance_count})")
+
+
+class ResistorView(Resistor):
+    """ Read-only Resistor facade over one row of a CompiledCircuit. """
+    __slots__ = ('_circuit', '_index')
+
+    def __init__(self, circuit, index):
+        self._circuit = circuit
+        self._index = index
+
+    @property
+    def name(self):
+        return self._circuit.res_names[self._index]
+
+    @property
+    def node1(self):
+        return self._circuit.node_names[self._circuit.res_node1[self._index]]
+
+    @property
+    def node2(self):
+        return self._circuit.node_names[self._circuit.res_node2[self._index]]
+
+    @property
+    def resistance(self):
+        return float(self._circuit.resistances[self._index])
+
+
+class VoltageSourceView(VoltageSource):
+    """ Read-only VoltageSource facade over one row of a CompiledCircuit. """
+    __slots__ = ('_circuit', '_index')
+
+    def __init__(self, circuit, index):
+        self._circuit = circuit
+        self._index = index
+
+    @property
+    def name(self):
+        return self._circuit.vs_names[self._index]
+
+    @property
+    def node1(self):
+        return self._circuit.node_names[self._circuit.vs_node1[self._index]]
+
+    @property
+    def node2(self):
+        return self._circuit.node_names[self._circuit.vs_node2[self._index]]
+
+    @property
+    def voltage(self):
+        return float(self._circuit.voltages[self._index])
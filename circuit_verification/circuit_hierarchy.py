@@ -0,0 +1,192 @@
+import hashlib
+from collections import OrderedDict
+import numpy as np
+
+GROUND = '0'
+
+# Port models by definition digest, shared by every parse in this process:
+# a cell defined identically in many netlists (or under several names) is
+# reduced only once.
+MODEL_CACHE_SIZE = 1024
+_model_cache = OrderedDict()
+
+
+class SubcircuitDefinition:
+    """
+    The body of one .SUBCKT: its formal port names, resistors and nested
+    X instances. Node names other than the ports are internal, except
+    ground '0', which is the global ground.
+    """
+
+    def __init__(self, name, ports):
+        if GROUND in ports:
+            raise ValueError(f"Subcircuit {name}: ground '0' cannot be a port")
+        if len(set(ports)) != len(ports):
+            raise ValueError(f"Subcircuit {name}: duplicate port names")
+        self.name = name
+        self.ports = list(ports)
+        self.resistors = []   # (name, node1, node2, resistance)
+        self.instances = []   # (name, subcircuit name, [nodes])
+
+    def add_resistor(self, name, node1, node2, resistance):
+        self.resistors.append((name, node1, node2, resistance))
+
+    def add_instance(self, name, subckt, nodes):
+        self.instances.append((name, subckt, list(nodes)))
+
+    def __repr__(self):
+        return (f"SubcircuitDefinition({self.name}, ports={self.ports}, "
+                f"resistors={len(self.resistors)}, instances={len(self.instances)})")
+
+
+class PortModel:
+    """
+    Conductance matrix of a subcircuit seen from its ports (k x k, ports
+    in definition order), after Kron reduction of all internal nodes.
+    Row sums that are not zero are conductance to ground inside the cell.
+    `digest` identifies the definition up to element and node names.
+    """
+    __slots__ = ('name', 'ports', 'matrix', 'digest')
+
+    def __init__(self, name, ports, matrix, digest=None):
+        self.name = name
+        self.ports = list(ports)
+        self.matrix = np.asarray(matrix, dtype=float)
+        self.digest = digest
+
+    def __repr__(self):
+        return f"PortModel({self.name}, ports={self.ports})"
+
+
+def kron_reduce(G, port_count):
+    """
+    Schur complement G_pp - G_pi G_ii^-1 G_ip of a nodal matrix whose
+    first `port_count` rows/columns are the ports. Internal islands with
+    no path to a port or ground leave G_ii singular; they do not couple to
+    the ports, so a least-squares solve gives the same reduced matrix.
+    """
+    p = port_count
+    if G.shape[0] == p:
+        return G.copy()
+    G_pi, G_ii = G[:p, p:], G[p:, p:]
+    try:
+        X = np.linalg.solve(G_ii, G_pi.T)
+    except np.linalg.LinAlgError:
+        X = np.linalg.lstsq(G_ii, G_pi.T, rcond=None)[0]
+    return G[:p, :p] - G_pi @ X
+
+def reduce_subcircuit(name, definitions, _active=()):
+    """
+    PortModel of subcircuit `name` from a {name: SubcircuitDefinition}
+    dict. Nested instances are reduced first and stamped as dense blocks,
+    so only the definition's own nodes are ever assembled. Models are
+    memoized by definition digest (see _model_cache).
+    """
+    if name in _active:
+        raise ValueError(f"Subcircuit {name} instantiates itself")
+    definition = definitions.get(name)
+    if definition is None:
+        raise ValueError(f"Unknown subcircuit '{name}'")
+
+    children = []
+    for inst_name, subckt, nodes in definition.instances:
+        child = reduce_subcircuit(subckt, definitions, _active + (name,))
+        if len(nodes) != len(child.ports):
+            raise ValueError(f"Instance {inst_name} in {name}: {len(nodes)} nodes for "
+                             f"{len(child.ports)} ports of {subckt}")
+        children.append((child, nodes))
+
+    # Local numbering: ports first, internal nodes in order of appearance
+    index = {port: i for i, port in enumerate(definition.ports)}
+    for _, n1, n2, _ in definition.resistors:
+        index.setdefault(n1, len(index))
+        index.setdefault(n2, len(index))
+    for _, nodes in children:
+        for node in nodes:
+            index.setdefault(node, len(index))
+    index.pop(GROUND, None)
+    local = {node: i for i, node in enumerate(index)}
+
+    digest = _definition_digest(definition, local, children)
+    model = _model_cache.get(digest)
+    if model is not None:
+        _model_cache.move_to_end(digest)
+        return PortModel(name, definition.ports, model.matrix, digest)
+
+    m = len(local)
+    G = np.zeros((m, m))
+    for res_name, n1, n2, resistance in definition.resistors:
+        g = 1.0 / resistance
+        a, b = local.get(n1), local.get(n2)
+        if a is not None:
+            G[a, a] += g
+        if b is not None:
+            G[b, b] += g
+        if a is not None and b is not None:
+            G[a, b] -= g
+            G[b, a] -= g
+    for child, nodes in children:
+        ids = [local.get(node) for node in nodes]
+        keep = [i for i, node in enumerate(ids) if node is not None]
+        rows = [ids[i] for i in keep]
+        G[np.ix_(rows, rows)] += child.matrix[np.ix_(keep, keep)]
+
+    model = PortModel(name, definition.ports, kron_reduce(G, len(definition.ports)), digest)
+    _model_cache[digest] = model
+    if len(_model_cache) > MODEL_CACHE_SIZE:
+        _model_cache.popitem(last=False)
+    return model
+
+def _definition_digest(definition, local, children):
+    """ sha256 of a definition with node names replaced by local indices. """
+    def key(node):
+        return 'G' if node == GROUND else str(local[node])
+
+    h = hashlib.sha256()
+    h.update(f"ports={len(definition.ports)};".encode())
+    for _, n1, n2, resistance in definition.resistors:
+        h.update(f"R {key(n1)} {key(n2)} {resistance!r};".encode())
+    for child, nodes in children:
+        h.update(f"X {child.digest} {' '.join(map(key, nodes))};".encode())
+    return h.hexdigest()
+
+def instance_blocks(models, inst_ptr, inst_nodes, inst_models):
+    """
+    Yield (nodes, matrix) per port model in use: nodes is the
+    (instances, k) array of node ids of all instances of that model.
+    """
+    inst_models = np.asarray(inst_models)
+    starts = np.asarray(inst_ptr[:-1], dtype=np.int64)
+    for m in np.unique(inst_models).tolist():
+        matrix = models[m]
+        k = matrix.shape[0]
+        first = starts[inst_models == m]
+        nodes = np.asarray(inst_nodes, dtype=np.int64)[first[:, None] + np.arange(k)]
+        yield nodes, matrix
+
+def instance_triplets(models, inst_ptr, inst_nodes, inst_models):
+    """ COO stamps (rows, cols, vals) of every instance block, in node-id space. """
+    rows, cols, vals = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)], [np.zeros(0)]
+    for nodes, matrix in instance_blocks(models, inst_ptr, inst_nodes, inst_models):
+        k = matrix.shape[0]
+        rows.append(np.repeat(nodes, k, axis=1).ravel())
+        cols.append(np.tile(nodes, (1, k)).ravel())
+        vals.append(np.broadcast_to(matrix.ravel(), (len(nodes), k * k)).ravel())
+    return np.concatenate(rows), np.concatenate(cols), np.concatenate(vals)
+
+def instance_edges(models, inst_ptr, inst_nodes, inst_models):
+    """
+    Connectivity edges (a, b) implied by the instances: ports coupled by a
+    non-zero entry of the port model, and ports with conductance to ground
+    inside the cell (edge to node 0).
+    """
+    edges_a, edges_b = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+    for nodes, matrix in instance_blocks(models, inst_ptr, inst_nodes, inst_models):
+        i, j = np.nonzero(np.triu(matrix, 1))
+        edges_a.append(nodes[:, i].ravel())
+        edges_b.append(nodes[:, j].ravel())
+        scale = np.abs(matrix).max() if matrix.size else 0.0
+        grounded = np.flatnonzero(np.abs(matrix.sum(axis=1)) > 1e-12 * scale)
+        edges_a.append(nodes[:, grounded].ravel())
+        edges_b.append(np.zeros(len(nodes) * len(grounded), dtype=np.int64))
+    return np.concatenate(edges_a), np.concatenate(edges_b)
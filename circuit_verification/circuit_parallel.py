@@ -0,0 +1,162 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+import numpy as np
+from .circuit_simulation import DCSolver, solve_batch_systems
+from . import circuit_profiler
+
+# Topology arrays of the circuit being sampled. In pool workers they are
+# views into the shared-memory block attached by _init_worker; for
+# in-process runs they are the parent's own arrays.
+_topology = None
+_shm = None
+
+def _share_arrays(arrays):
+    """ Copy a dict of arrays into one new shared-memory block. """
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = (offset + 63) // 64 * 64
+        layout[name] = (offset, array.dtype.str, array.shape)
+        offset += array.nbytes
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for name, view in _view_arrays(shm, layout).items():
+        view[...] = arrays[name]
+    return shm, layout
+
+def _view_arrays(shm, layout):
+    return {
+        name: np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+        for name, (offset, dtype, shape) in layout.items()
+    }
+
+def _init_worker(shm_name, layout):
+    global _topology, _shm
+    # Pool workers share the parent's resource tracker, so attaching here
+    # does not add a second owner; the parent unlinks the block when done.
+    _shm = shared_memory.SharedMemory(name=shm_name)
+    _topology = _view_arrays(_shm, layout)
+
+def _run_chunk(start, stop, seed_seq, tolerance):
+    """ Sample and solve runs [start, stop) from their own seed stream. """
+    topo = _topology
+    nominal = topo['nominal']
+    rng = np.random.default_rng(seed_seq)
+    resistances = nominal * (1.0 + rng.uniform(-tolerance, tolerance, size=(stop - start, len(nominal))))
+    voltages = solve_batch_systems(topo['A'], 1.0 / resistances, topo['fixed'], topo['I'],
+                                   topo.get('G_const'))
+    return start, stop, voltages, resistances
+
+
+class ParallelMonteCarlo:
+    """
+    Process-pool Monte Carlo over resistor tolerances for a CircuitAnalysis.
+
+    The sampled runs are split into fixed-size chunks; chunk k draws its
+    factors from the k-th child of SeedSequence(seed), so results depend
+    only on (seed, chunk_size) and are bit-identical for any worker count.
+    The circuit topology (incidence matrix, nominal values, fixed nodes,
+    subcircuit blocks) is placed in multiprocessing.shared_memory once and
+    attached by every worker. Chunks are streamed back as they finish.
+
+      workers   - pool size; 0 or 1 runs the chunks in this process
+      chunk_size - runs per task
+      progress  - optional callback(done_runs, total_runs)
+    """
+
+    def __init__(self, analysis, workers=None, chunk_size=10000, progress=None):
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        self.analysis = analysis
+        self.workers = os.cpu_count() if workers is None else workers
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.entropy = None
+
+        solver = DCSolver(analysis.compiled)
+        fixed, I = solver._fixed_nodes()
+        self.node_list = list(solver.node_list)
+        self.topology = {
+            'A': solver.incidence_matrix(),
+            'nominal': np.ascontiguousarray(analysis.compiled.resistances, dtype=float),
+            'fixed': fixed,
+            'I': I,
+        }
+        G_const = solver.instance_matrix()
+        if G_const is not None:
+            self.topology['G_const'] = G_const
+
+    def iter_chunks(self, runs, tolerance=0.05, seed=None):
+        """
+        Yield (start, stop, voltages, resistances) per finished chunk, in
+        completion order. voltages is (stop - start, n_nodes) in the order
+        of self.node_list; resistances is (stop - start, n_resistors).
+        The root seed entropy is kept in self.entropy, so a run with
+        seed=None can be reproduced.
+        """
+        root = np.random.SeedSequence(seed)
+        self.entropy = root.entropy
+        bounds = [(start, min(start + self.chunk_size, runs)) for start in range(0, runs, self.chunk_size)]
+        tasks = [(start, stop, child) for (start, stop), child in zip(bounds, root.spawn(len(bounds)))]
+
+        done = 0
+        for start, stop, voltages, resistances in self._execute(tasks, tolerance):
+            done += stop - start
+            if self.progress is not None:
+                self.progress(done, runs)
+            yield start, stop, voltages, resistances
+
+    def run(self, runs, tolerance=0.05, seed=None):
+        """ Collect all chunks into the dict layout of CircuitAnalysis.run_monte_carlo_batch. """
+        voltages = np.empty((runs, len(self.node_list)))
+        resistances = np.empty((runs, len(self.topology['nominal'])))
+        began = time.perf_counter()
+        with circuit_profiler.span('monte_carlo.parallel', runs=runs, workers=self.workers):
+            for start, stop, chunk_voltages, chunk_resistances in self.iter_chunks(runs, tolerance, seed):
+                voltages[start:stop] = chunk_voltages
+                resistances[start:stop] = chunk_resistances
+        elapsed = time.perf_counter() - began
+        circuit_profiler.count('mc_samples', runs)
+        circuit_profiler.count('mc_samples_per_s', runs / elapsed if elapsed > 0 else float('inf'))
+        return {
+            'nodes': list(self.node_list),
+            'resistors': list(self.analysis.compiled.res_names),
+            'voltages': voltages,
+            'resistances': resistances,
+        }
+
+    def _execute(self, tasks, tolerance):
+        global _topology
+        if self.workers <= 1:
+            _topology = self.topology
+            try:
+                for start, stop, child in tasks:
+                    yield _run_chunk(start, stop, child, tolerance)
+            finally:
+                _topology = None
+            return
+
+        shm, layout = _share_arrays(self.topology)
+        executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                       initargs=(shm.name, layout))
+        try:
+            # Keep a bounded number of chunks in flight so finished results
+            # never pile up faster than the consumer takes them.
+            pending = set()
+            queue = iter(tasks)
+            for start, stop, child in queue:
+                pending.add(executor.submit(_run_chunk, start, stop, child, tolerance))
+                if len(pending) >= 2 * self.workers:
+                    break
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    yield future.result()
+                    task = next(queue, None)
+                    if task is not None:
+                        pending.add(executor.submit(_run_chunk, *task, tolerance))
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            shm.close()
+            shm.unlink()
@@ -62,61 +62,330 @@
 #                     print(f"Warning: Skipping unsupported element '{element_name}'")
 
 #         return circuit
+import gc
+import os
 import re
-from .circuit_elements import Circuit, Resistor, VoltageSource
+import time
+import numpy as np
+from .circuit_elements import Circuit, CircuitBuilder
+from .circuit_hierarchy import SubcircuitDefinition
+from . import circuit_cache
+from . import circuit_profiler
+
+# Bump whenever parsing semantics or the CompiledCircuit layout change, so
+# binary caches written by older versions are rebuilt.
+PARSER_VERSION = 3
+
+# SPICE engineering suffixes (case-insensitive; 'M' is milli, 'MEG' is mega)
+_SUFFIXES = {
+    't': 1e12, 'g': 1e9, 'meg': 1e6, 'k': 1e3, 'm': 1e-3,
+    'mil': 25.4e-6, 'u': 1e-6, 'n': 1e-9, 'p': 1e-12, 'f': 1e-15,
+}
+_VALUE_RE = re.compile(
+    r'^([+-]?(?:\d+\.?\d*|\.\d+)(?:e[+-]?\d+)?)(meg|mil|[tgkmunpf])?[a-z]*$',
+    re.IGNORECASE,
+)
+_COMMENT_LINE_RE = re.compile(r'^[ \t]*\*.*(?:\n|$)', re.MULTILINE)
+_CONTINUATION_RE = re.compile(r'\n[ \t]*\+')
+_SUBCKT_RE = re.compile(r'^[ \t]*\.subckt\b', re.IGNORECASE | re.MULTILINE)
+_R_PREFIX = ('R', 'r')
+_NOT_A_LINE_START = (b'+', b'*', b'')
+
+def parse_value(token):
+    """
+    Convert a SPICE number such as '1000', '4.7k', '2meg', '10uF' or
+    '1e-3' to a float. Trailing unit letters after the suffix are ignored.
+    """
+    try:
+        return float(token)
+    except ValueError:
+        pass
+    match = _VALUE_RE.match(token)
+    if match is None:
+        raise ValueError(f"Invalid numeric value '{token}'")
+    number, suffix = match.groups()
+    if suffix is None:
+        return float(number)
+    return float(number) * _SUFFIXES[suffix.lower()]
+
+def parse_values(tokens):
+    """ Vectorized parse_value over a list of tokens, as a float64 array. """
+    try:
+        return np.array(tokens, dtype=np.float64)
+    except ValueError:
+        return np.array([parse_value(t) for t in tokens], dtype=np.float64)
+
 
 class CircuitParser:
     """
-    Reads a simple netlist (R, V only) and builds a Circuit object.
+    Reads a simple netlist (R, V and subcircuits) and builds a Circuit object.
     Example lines:
       V1 1 0 DC 5
-      R1 1 2 1000
+      R1 1 2 1k
+      + (a leading '+' continues the previous line)
+      .SUBCKT DIV in out
+      RA in out 1k
+      RB out 0 1k
+      .ENDS
+      X1 2 3 DIV
+      .DC V1 0 5 0.5
       .END
+
+    Subcircuits are never flattened: each one used is Kron-reduced to a
+    dense port model once (see circuit_hierarchy) and every X instance
+    stamps that block onto its nodes.
+
+    The file is streamed in CHUNK_SIZE blocks. Each block is tokenized in
+    bulk, node names are interned into integer ids and element data is
+    written straight into the typed arrays of a CompiledCircuit, so memory
+    stays bounded by one block plus the compiled arrays. After parsing,
+    `stats` holds the byte count, element count, elapsed seconds and
+    throughput in MB/s.
+
+    With use_cache=True the compiled arrays are also kept in a binary
+    sidecar next to the netlist (see circuit_cache) and memory-mapped on
+    later runs; a stale or corrupt sidecar is silently rebuilt. Structure,
+    staleness and section checksums are checked on every load;
+    verify_cache=False skips the checksums, which read every page.
     """
 
-    def __init__(self, filepath):
+    CHUNK_SIZE = 16 * 1024 * 1024
+
+    def __init__(self, filepath, chunk_size=None, use_cache=False, verify_cache=True):
         self.filepath = filepath
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.use_cache = use_cache
+        self.verify_cache = verify_cache
+        self.stats = {}
 
     def parse(self) -> Circuit:
-        circuit = Circuit()
+        """ Parse into a mutable object-based Circuit. """
+        return self.parse_compiled().to_circuit()
 
-        with open(self.filepath, 'r') as f:
-            for line in f:
-                line = line.strip()
-                # Ignore comments and empty lines
-                if not line or line.startswith('*'):
-                    continue
-                if line.upper() == '.END':
+    def parse_compiled(self):
+        """ Parse straight into an array-backed CompiledCircuit. """
+        with circuit_profiler.span('parse', netlist=self.filepath) as span:
+            compiled = self._load_compiled()
+            span.set(source=self.stats['source'])
+        circuit_profiler.count('nodes', compiled.node_count)
+        circuit_profiler.count('elements', self.stats['elements'])
+        circuit_profiler.count('parse_mb_per_s', self.stats['mb_per_s'])
+        return compiled
+
+    def _load_compiled(self):
+        if not self.use_cache:
+            return self._parse_netlist()
+
+        start = time.perf_counter()
+        cache_path = circuit_cache.cache_path_for(self.filepath)
+        try:
+            with circuit_profiler.span('parse.cache_load'):
+                compiled = circuit_cache.load_compiled(cache_path, self.filepath, PARSER_VERSION,
+                                                       verify_data=self.verify_cache)
+        except circuit_cache.CacheError:
+            compiled = None
+        if compiled is not None:
+            elapsed = time.perf_counter() - start
+            self.stats = {
+                'source': 'cache',
+                'bytes': os.path.getsize(cache_path),
+                'elements': compiled.resistor_count + compiled.voltage_source_count + compiled.instance_count,
+                'seconds': elapsed,
+                'mb_per_s': os.path.getsize(cache_path) / 1e6 / elapsed if elapsed > 0 else float('inf'),
+            }
+            return compiled
+
+        # Fingerprint before parsing so edits made meanwhile invalidate the cache
+        source = circuit_cache.source_fingerprint(self.filepath)
+        compiled = self._parse_netlist()
+        try:
+            with circuit_profiler.span('parse.cache_save'):
+                circuit_cache.save_compiled(compiled, cache_path, source, PARSER_VERSION)
+        except OSError as exc:
+            print(f"Warning: could not write netlist cache {cache_path}: {exc}")
+        return compiled
+
+    def _parse_netlist(self):
+        start = time.perf_counter()
+        builder = CircuitBuilder()
+        self._skipped = {}
+        self._definition = None
+        nbytes = 0
+
+        # Millions of short-lived token lists would otherwise trigger
+        # repeated full collections without ever freeing anything.
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for block in self._read_blocks():
+                nbytes += len(block)
+                with circuit_profiler.span('parse.block', bytes=len(block)):
+                    done = self._parse_block(builder, block)
+                if done:
                     break
+        finally:
+            if gc_was_enabled:
+                gc.enable()
 
-                tokens = line.split()
-                element_name = tokens[0].upper()
-
-                if element_name.startswith('R'):
-                    # R1 1 2 1000
-                    node1 = tokens[1]
-                    node2 = tokens[2]
-                    resistance = float(tokens[3])
-                    circuit.add_element(
-                        Resistor(name=element_name, node1=node1, node2=node2, resistance=resistance)
-                    )
-
-                elif element_name.startswith('V'):
-                    # V1 1 0 DC 5
-                    node1 = tokens[1]
-                    node2 = tokens[2]
-                    # Next token might be DC + value, or something else
-                    if tokens[3].upper() == 'DC':
-                        voltage_value = float(tokens[4])
-                    else:
-                        voltage_value = float(tokens[3])
-
-                    circuit.add_element(
-                        VoltageSource(name=element_name, node1=node1, node2=node2, voltage=voltage_value)
-                    )
+        if self._definition is not None:
+            raise ValueError(f"{self.filepath}: .SUBCKT {self._definition.name} has no .ENDS")
+        with circuit_profiler.span('parse.build'):
+            compiled = builder.build()
+        self._report_skipped()
 
+        elapsed = time.perf_counter() - start
+        self.stats = {
+            'source': 'netlist',
+            'bytes': nbytes,
+            'elements': compiled.resistor_count + compiled.voltage_source_count + compiled.instance_count,
+            'seconds': elapsed,
+            'mb_per_s': nbytes / 1e6 / elapsed if elapsed > 0 else float('inf'),
+        }
+        return compiled
+
+    def _read_blocks(self):
+        """
+        Yield byte blocks that each end on a logical-line boundary: a block
+        is cut before its last element/directive line (skipping trailing
+        continuations, comments and blank lines), because the next read may
+        still continue that line.
+        """
+        tail = b''
+        with open(self.filepath, 'rb') as f:
+            while True:
+                chunk = f.read(self.chunk_size)
+                data = tail + chunk
+                if not chunk:
+                    yield data
+                    return
+
+                cut = data.rfind(b'\n', 0, len(data) - 1)
+                while cut >= 0 and data[cut + 1:cut + 64].lstrip()[:1] in _NOT_A_LINE_START:
+                    cut = data.rfind(b'\n', 0, cut)
+                if cut < 0:
+                    tail = data
+                    continue
+                yield data[:cut + 1]
+                tail = data[cut + 1:]
+
+    def _parse_block(self, builder, block):
+        """ Parse one block of complete lines. Returns True once '.END' is seen. """
+        text = block.decode()
+        if '+' in text:
+            if _CONTINUATION_RE.search(text):
+                # Drop comment lines first so they cannot split a continued line
+                text = _CONTINUATION_RE.sub(' ', _COMMENT_LINE_RE.sub('', text))
+            if text.lstrip().startswith('+'):
+                raise ValueError(f"{self.filepath}: continuation line with nothing to continue")
+        lines = text.split('\n')
+        if self._definition is not None or _SUBCKT_RE.search(text):
+            lines = self._take_definitions(builder, lines)
+
+        # Everything that is not a plain resistor line goes through the
+        # per-line path; '.END' can only be among those.
+        others = [line for line in lines if line[:1] not in _R_PREFIX]
+        ended = False
+        for line in others:
+            if line.strip().upper() == '.END':
+                lines = lines[:lines.index(line)]
+                others = others[:others.index(line)]
+                ended = True
+                break
+
+        # Fast path: 'Rname n1 n2 value' lines are joined into one string
+        # with a NUL token between lines, tokenized with a single split and
+        # sliced into columns. Every fifth token must be a separator, so a
+        # line with a missing or extra token cannot shift the columns.
+        r_lines = [line for line in lines if line[:1] in _R_PREFIX]
+        if r_lines:
+            joined = ' \0 '.join(r_lines)
+            tokens = joined.split()
+            n = len(r_lines)
+            values = None
+            if len(tokens) == 5 * n - 1 and tokens[4::5].count('\0') == n - 1 == joined.count('\0'):
+                try:
+                    values = parse_values(tokens[3::5])
+                except ValueError:
+                    pass
+            if values is not None:
+                builder.add_resistors(list(map(str.upper, tokens[0::5])),
+                                      tokens[1::5], tokens[2::5], values)
+            else:
+                others = lines
+
+        for line in others:
+            line = line.strip()
+            # Ignore comments and empty lines
+            if line and line[0] != '*':
+                self._add_line(builder, line)
+        builder.update_connectivity()
+        return ended
+
+    def _take_definitions(self, builder, lines):
+        """
+        Move the lines of .SUBCKT ... .ENDS bodies (possibly continuing
+        from the previous block) into SubcircuitDefinitions and return the
+        remaining top-level lines.
+        """
+        top = []
+        for i, line in enumerate(lines):
+            tokens = line.split()
+            keyword = tokens[0].upper() if tokens else ''
+            if self._definition is None:
+                if keyword == '.SUBCKT':
+                    if len(tokens) < 2:
+                        raise ValueError(f"{self.filepath}: cannot parse '{line}': missing subcircuit name")
+                    self._definition = SubcircuitDefinition(tokens[1].upper(), tokens[2:])
+                elif keyword == '.END':
+                    return top + lines[i:]
                 else:
-                    # Unsupported element for this example
-                    print(f"Warning: Skipping unsupported element '{element_name}'")
+                    top.append(line)
+            elif keyword == '.ENDS':
+                builder.add_subcircuit(self._definition)
+                self._definition = None
+            elif keyword == '.SUBCKT':
+                raise ValueError(f"{self.filepath}: nested .SUBCKT {tokens[1:2]} inside "
+                                 f"{self._definition.name} is not supported")
+            elif keyword and keyword[0] != '*':
+                self._add_line(self._definition, line.strip())
+        return top
+
+    def _add_line(self, builder, line):
+        """ Add one logical line to the builder (slow path). """
+        tokens = line.split()
+        kind = tokens[0][0].upper()
+        try:
+            if kind == 'R':
+                # R1 1 2 1000
+                builder.add_resistor(tokens[0].upper(), tokens[1], tokens[2], parse_value(tokens[3]))
+            elif kind == 'X':
+                # X1 in out gnd CELL (the last token names the subcircuit)
+                if len(tokens) < 3:
+                    raise ValueError("expected 'Xname node... subckt'")
+                builder.add_instance(tokens[0].upper(), tokens[-1].upper(), tokens[1:-1])
+            elif isinstance(builder, SubcircuitDefinition):
+                raise ValueError(f"only R and X lines are supported inside .SUBCKT {builder.name}")
+            elif kind == 'V':
+                # V1 1 0 DC 5
+                # Next token might be DC + value, or something else
+                value = tokens[4] if tokens[3].upper() == 'DC' else tokens[3]
+                builder.add_voltage_source(tokens[0].upper(), tokens[1], tokens[2], parse_value(value))
+            elif tokens[0].upper() == '.DC':
+                # .DC V1 0 5 0.1 [V2 0 1 0.5]
+                if len(tokens) not in (5, 9):
+                    raise ValueError("expected '.DC src start stop step [src2 start2 stop2 step2]'")
+                sweep = [tokens[1].upper()] + [parse_value(t) for t in tokens[2:5]]
+                if len(tokens) == 9:
+                    sweep += [tokens[5].upper()] + [parse_value(t) for t in tokens[6:9]]
+                builder.add_dc_sweep(*sweep)
+            else:
+                # Unsupported element for this example; reported once per kind
+                key = tokens[0].upper() if kind == '.' else kind
+                count, example = self._skipped.get(key, (0, tokens[0]))
+                self._skipped[key] = (count + 1, example)
+        except (IndexError, ValueError) as exc:
+            raise ValueError(f"{self.filepath}: cannot parse '{line}': {exc}") from exc
 
-        return circuit
+    def _report_skipped(self):
+        for key, (count, example) in self._skipped.items():
+            print(f"Warning: Skipping {count} unsupported line(s) of type '{key}' (e.g. '{example}')")
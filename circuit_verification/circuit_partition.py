@@ -0,0 +1,275 @@
+import multiprocessing
+import os
+import time
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import dijkstra
+from scipy.sparse.linalg import splu
+from .circuit_simulation import DCSolver, LUFactorization
+from . import circuit_profiler
+
+# Separator columns pushed through an interior factorization at once when
+# a Schur complement contribution has to be formed from solves
+SCHUR_COLUMNS = 256
+
+
+def _bfs_levels(adjacency, start):
+    """ Hop distance of every node from `start` (inf where unreachable). """
+    return dijkstra(adjacency, directed=False, indices=start, unweighted=True)
+
+def partition_nodes(G, parts):
+    """
+    Split the unknowns of G into `parts` interiors and a vertex separator
+    by recursive bisection: each subgraph is ordered by breadth-first
+    distance from a pseudo-peripheral node (the far end of a BFS) and cut
+    at the size ratio of its two halves; the nodes of the far half
+    adjacent to the near half form that cut's separator. On meshes the
+    BFS fronts are straight lines (planes), so separators stay about
+    sqrt(n) (n^(2/3)) in size. Returns labels: part index per node, or
+    -1 for separator nodes. No edge of G joins two different parts.
+    """
+    n = G.shape[0]
+    pattern = sp.csr_matrix(G, dtype=bool)
+    adjacency = (pattern + pattern.T).tocsr()
+    adjacency.setdiag(False)
+    adjacency.eliminate_zeros()
+    labels = np.full(n, -1, dtype=np.int64)
+
+    # (nodes, first part label, part count) still to split
+    pending = [(np.arange(n), 0, max(1, parts))]
+    while pending:
+        nodes, first, count = pending.pop()
+        if count == 1 or len(nodes) < 2:
+            labels[nodes] = first
+            continue
+        sub = adjacency[nodes][:, nodes]
+        distance = _bfs_levels(sub, 0)
+        reached = np.isfinite(distance)
+        distance = _bfs_levels(sub, int(np.argmax(np.where(reached, distance, -1))))
+        # Unreached nodes (other components) go last, away from the cut
+        order = np.argsort(np.where(np.isfinite(distance), distance, np.inf), kind='stable')
+        near_count = count // 2
+        split = int(round(len(nodes) * near_count / count))
+        near = np.zeros(len(nodes), dtype=bool)
+        near[order[:split]] = True
+        separator = ~near & ((sub @ near.astype(np.int8)) > 0)
+        far = ~near & ~separator
+        pending.append((nodes[near], first, near_count))
+        pending.append((nodes[far], first + near_count, count - near_count))
+    return labels
+
+
+def _part_system(G, b, interior, boundary):
+    """ The blocks of G and b one part needs: G_II, G_IS, G_SI, b_I. """
+    G_rows = G[interior]
+    return {
+        'G_II': G_rows[:, interior].tocsc(),
+        'G_IS': G_rows[:, boundary].tocsc(),
+        'G_SI': G[boundary][:, interior].tocsr(),
+        'b_I': b[interior],
+    }
+
+def _part_schur(system, ordering):
+    """
+    Factorize G_II and return (factorization, C, y) with the part's Schur
+    contributions C = G_SI G_II^-1 G_IS and y = G_SI G_II^-1 b_I.
+
+    C comes from a second LU of the bordered matrix [[G_II, G_IS],
+    [G_SI, -d I]] with the interior in G_II's elimination order and the
+    boundary last: without pivoting its trailing factors give
+    L22 U22 = -d I - C, which costs about one more factorization instead of
+    one solve per boundary column. Should SuperLU pivot anyway, C is
+    formed from column solves instead.
+    """
+    lu = LUFactorization(system['G_II'], ordering)
+    G_IS, G_SI = system['G_IS'], system['G_SI']
+    n, m = G_IS.shape
+    y = G_SI @ lu.solve(system['b_I'])
+    if not m:
+        return lu, np.zeros((0, 0)), y
+
+    # The corner block -d*I keeps every trailing pivot nonzero, also for
+    # boundary nodes pinned by a source (whose G_SI rows are empty)
+    order = lu.column_order
+    d = float(abs(system['G_II'].diagonal()).max())
+    bordered = sp.bmat([[system['G_II'][order][:, order], G_IS[order]],
+                        [G_SI[:, order], -d * sp.identity(m)]], format='csc')
+    try:
+        factors = splu(bordered, permc_spec='NATURAL', diag_pivot_thresh=0.0,
+                       options={'SymmetricMode': True})
+        if (factors.perm_r == np.arange(n + m)).all():
+            trailing = (factors.L[n:, n:] @ factors.U[n:, n:]).toarray()
+            trailing[np.diag_indices(m)] += d
+            return lu, -trailing, y
+    except RuntimeError:
+        pass
+
+    contribution = np.empty((G_SI.shape[0], m))
+    for start in range(0, m, SCHUR_COLUMNS):
+        stop = min(start + SCHUR_COLUMNS, m)
+        contribution[:, start:stop] = G_SI @ lu.solve(G_IS[:, start:stop].toarray())
+    return lu, contribution, y
+
+def _part_back(lu, system, x_boundary):
+    """ Interior voltages G_II^-1 (b_I - G_IS x_S). """
+    return lu.solve(system['b_I'] - system['G_IS'] @ x_boundary)
+
+def _worker_main(conn, systems, ordering):
+    """
+    Serve the Schur and back-substitution phases of `systems` ({part:
+    system}) over `conn`; an exception is sent back in place of a result.
+    """
+    try:
+        factors = {}
+        for part, system in systems.items():
+            lu, contribution, y = _part_schur(system, ordering)
+            factors[part] = lu
+            conn.send((part, contribution, y))
+        boundary_values = conn.recv()
+        for part, system in systems.items():
+            conn.send((part, _part_back(factors[part], system, boundary_values[part])))
+    except Exception as exc:
+        conn.send(exc)
+    finally:
+        conn.close()
+
+def _receive(conn):
+    message = conn.recv()
+    if isinstance(message, Exception):
+        raise message
+    return message
+
+
+class PartitionedSolver(DCSolver):
+    """
+    DCSolver whose operating point comes from a domain-decomposition solve.
+
+    partition_nodes() splits the unknowns into `parts` interiors I_k that
+    only couple through a separator S. Each interior block G_II is
+    factorized on its own worker process, which also returns its Schur
+    contribution G_SI G_II^-1 G_IS and G_SI G_II^-1 b_I. The parent
+    assembles and solves the separator system
+        (G_SS - sum_k G_SI G_II^-1 G_IS) x_S = b_S - sum_k G_SI G_II^-1 b_I
+    and the workers back-substitute x_I = G_II^-1 (b_I - G_IS x_S) in
+    parallel. The result matches the monolithic solve to rounding.
+
+      parts   - number of interiors (default: workers, or the CPU count)
+      workers - processes; 0 or 1 runs every part in this process
+
+    Sweeps and sensitivities (which reuse a factorization of the whole
+    G) fall back to the inherited monolithic sparse LU. partition_info
+    holds the part and separator sizes and the time spent per phase.
+    """
+
+    def __init__(self, circuit, parts=None, workers=None, ordering='amd'):
+        super().__init__(circuit, method='sparse', ordering=ordering)
+        self.workers = os.cpu_count() if workers is None else workers
+        self.parts = parts or max(1, self.workers)
+        self.partition_info = None
+
+    def run_dc_analysis(self, x0=None):
+        if not self.node_list:
+            return {'0': 0.0}
+        timings = {}
+        start = time.perf_counter()
+        with circuit_profiler.span('stamp', unknowns=len(self.node_list)):
+            G, I = self.assemble()
+        G = sp.csr_matrix(G)
+        with circuit_profiler.span('partition', parts=self.parts):
+            labels = partition_nodes(G, self.parts)
+        timings['partition'] = time.perf_counter() - start
+
+        separator = np.flatnonzero(labels < 0)
+        G_sep_cols = G[:, separator].tocsr()
+        G_sep_rows = G[separator].tocsc()
+        systems, boundaries = {}, {}
+        for part in range(self.parts):
+            interior = np.flatnonzero(labels == part)
+            if not len(interior):
+                continue
+            # Separator nodes this part couples to, in either direction
+            touched = np.union1d(G_sep_cols[interior].indices, G_sep_rows[:, interior].nonzero()[0])
+            boundary = separator[touched]
+            boundaries[part] = (interior, touched)
+            systems[part] = _part_system(G, I, interior, boundary)
+
+        start = time.perf_counter()
+        x = np.empty(len(labels))
+        with circuit_profiler.span('partition.solve', parts=len(systems), separator=len(separator)):
+            if self.workers <= 1:
+                factors = {}
+                contributions = []
+                for part, system in systems.items():
+                    lu, contribution, y = _part_schur(system, self.ordering)
+                    factors[part] = lu
+                    contributions.append((part, contribution, y))
+                x_sep = self._solve_separator(G, I, separator, boundaries, contributions)
+                for part, system in systems.items():
+                    x[boundaries[part][0]] = _part_back(factors[part], system, x_sep[boundaries[part][1]])
+            else:
+                x_sep = self._solve_parallel(G, I, separator, systems, boundaries, x)
+        x[separator] = x_sep
+        timings['solve'] = time.perf_counter() - start
+
+        sizes = np.bincount(labels[labels >= 0], minlength=self.parts)
+        self.partition_info = {'parts': self.parts, 'part_sizes': sizes.tolist(),
+                               'separator': len(separator), 'workers': self.workers, **timings}
+        circuit_profiler.count('separator_size', len(separator))
+        node_voltages = dict(zip(self.node_list, x))
+        node_voltages['0'] = 0.0
+        return node_voltages
+
+    def _solve_separator(self, G, b, separator, boundaries, contributions):
+        """ Assemble and solve the Schur complement system on the separator. """
+        if not len(separator):
+            return np.zeros(0)
+        rows, cols, vals = [], [], []
+        rhs = b[separator].copy()
+        for part, contribution, y in contributions:
+            touched = boundaries[part][1]
+            rows.append(np.repeat(touched, len(touched)))
+            cols.append(np.tile(touched, len(touched)))
+            vals.append(-contribution.ravel())
+            rhs[touched] -= y
+        G_SS = G[separator][:, separator].tocoo()
+        m = len(separator)
+        S = sp.coo_matrix((np.concatenate([G_SS.data] + vals),
+                           (np.concatenate([G_SS.row] + rows), np.concatenate([G_SS.col] + cols))),
+                          shape=(m, m)).tocsr()
+        if m <= self.SPARSE_THRESHOLD:
+            S = S.toarray()
+        with circuit_profiler.span('partition.separator', unknowns=m):
+            return LUFactorization(S, self.ordering).solve(rhs)
+
+    def _solve_parallel(self, G, b, separator, systems, boundaries, x):
+        """ Run the parts on worker processes (round-robin); fills x at the interiors. """
+        context = multiprocessing.get_context()
+        count = min(self.workers, len(systems))
+        assigned = [{} for _ in range(count)]
+        for k, (part, system) in enumerate(systems.items()):
+            assigned[k % count][part] = system
+        workers = []
+        try:
+            for share in assigned:
+                parent, child = context.Pipe()
+                process = context.Process(target=_worker_main, args=(child, share, self.ordering), daemon=True)
+                process.start()
+                child.close()
+                workers.append((parent, process, share))
+
+            contributions = [_receive(conn) for conn, _, share in workers for _ in share]
+            x_sep = self._solve_separator(G, b, separator, boundaries, contributions)
+            for conn, _, share in workers:
+                conn.send({part: x_sep[boundaries[part][1]] for part in share})
+            for conn, _, share in workers:
+                for _ in share:
+                    part, values = _receive(conn)
+                    x[boundaries[part][0]] = values
+        finally:
+            for conn, process, _ in workers:
+                conn.close()
+                process.join(timeout=1.0)
+                if process.is_alive():
+                    process.kill()
+                    process.join()
+        return x_sep
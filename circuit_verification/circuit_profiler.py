@@ -0,0 +1,168 @@
+import json
+import os
+import sys
+import threading
+import time
+
+# The Profiler collecting events, or None. Instrumented code calls the
+# module-level span()/count() helpers, which do nothing but this check
+# while profiling is off.
+_active = None
+
+
+class _NullSpan:
+    """ Shared do-nothing context manager returned by span() when profiling is off. """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+
+def _max_rss_mb():
+    """
+    Process memory high-water mark (ru_maxrss is KB on Linux, bytes on
+    macOS); 0.0 where the resource module is missing, e.g. on Windows.
+    """
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1e6 if sys.platform == 'darwin' else rss / 1e3
+
+
+class _Span:
+    __slots__ = ('profiler', 'name', 'args', 'start', 'depth')
+
+    def __init__(self, profiler, name, args):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        stack = self.profiler._stack()
+        self.depth = len(stack)
+        stack.append(self.name)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter_ns()
+        self.profiler._stack().pop()
+        self.profiler._record(self, end)
+        return False
+
+    def set(self, **args):
+        """ Attach values (sizes, counts) to this span's event. """
+        self.args.update(args)
+
+
+class Profiler:
+    """
+    Collects nested timing spans, counters and the memory high-water mark
+    of a run. While active (`with Profiler() as p:`), every span() and
+    count() in circuit_verification is recorded here; spans nest per
+    thread. Export with to_json() (per-name totals plus counters) or
+    chrome_trace() (trace-event JSON for chrome://tracing or Perfetto).
+    """
+
+    def __init__(self):
+        self.events = []      # (name, start_ns, duration_ns, thread id, depth, args, max_rss_mb)
+        self.counters = {}    # name -> last value
+        self.samples = []     # (name, ns, value) for every count()
+        self.origin = time.perf_counter_ns()
+        self._local = threading.local()
+        self._previous = None
+
+    def __enter__(self):
+        global _active
+        self._previous, _active = _active, self
+        return self
+
+    def __exit__(self, *exc):
+        global _active
+        _active = self._previous
+        return False
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, span, end):
+        self.events.append((span.name, span.start - self.origin, end - span.start,
+                            threading.get_ident(), span.depth, span.args, _max_rss_mb()))
+
+    def span(self, name, args=None):
+        return _Span(self, name, args or {})
+
+    def count(self, name, value):
+        self.counters[name] = value
+        self.samples.append((name, time.perf_counter_ns() - self.origin, value))
+
+    def summary(self):
+        """
+        Per span name, in order of first appearance: 'calls', 'seconds'
+        (total) and 'max_rss_mb' (high-water mark at the latest exit).
+        """
+        totals = {}
+        for name, _, duration, _, _, _, rss in sorted(self.events, key=lambda e: e[1]):
+            entry = totals.setdefault(name, {'calls': 0, 'seconds': 0.0, 'max_rss_mb': 0.0})
+            entry['calls'] += 1
+            entry['seconds'] += duration / 1e9
+            entry['max_rss_mb'] = max(entry['max_rss_mb'], rss)
+        return totals
+
+    def to_json(self):
+        return {
+            'spans': self.summary(),
+            'counters': dict(self.counters),
+            'max_rss_mb': _max_rss_mb(),
+            'events': [{'name': name, 'start': start / 1e9, 'seconds': duration / 1e9,
+                        'thread': tid, 'depth': depth, 'args': args, 'max_rss_mb': rss}
+                       for name, start, duration, tid, depth, args, rss in self.events],
+        }
+
+    def chrome_trace(self):
+        """ Complete ('X') events per span and counter ('C') events per count(). """
+        pid = os.getpid()
+        trace = []
+        for name, start, duration, tid, _, args, rss in self.events:
+            trace.append({'name': name, 'cat': name.split('.')[0], 'ph': 'X', 'pid': pid, 'tid': tid,
+                          'ts': start / 1e3, 'dur': duration / 1e3, 'args': {**args, 'max_rss_mb': rss}})
+        for name, ns, value in self.samples:
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                trace.append({'name': name, 'ph': 'C', 'pid': pid, 'tid': 0, 'ts': ns / 1e3,
+                              'args': {'value': value}})
+        return {'traceEvents': trace, 'displayTimeUnit': 'ms'}
+
+    def save(self, path, format='chrome'):
+        """ Write chrome_trace() (format='chrome') or to_json() (format='json') to path. """
+        data = self.chrome_trace() if format == 'chrome' else self.to_json()
+        with open(path, 'w') as f:
+            json.dump(data, f, default=float)
+
+
+def enabled():
+    """ True while a Profiler is active; guard counters that cost work to compute. """
+    return _active is not None
+
+def span(name, **args):
+    """ Context manager timing a block as `name` in the active Profiler, if any. """
+    if _active is None:
+        return _NULL_SPAN
+    return _active.span(name, args)
+
+def count(name, value):
+    """ Record counter `name` in the active Profiler, if any. """
+    if _active is not None:
+        _active.count(name, value)
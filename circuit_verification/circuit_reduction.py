@@ -0,0 +1,239 @@
+import time
+import numpy as np
+from .circuit_elements import CompiledCircuit
+from . import circuit_profiler
+
+
+class CircuitReduction:
+    """
+    Topological reduction of a CompiledCircuit before it is solved.
+
+      1. Nodes pinned by grounded voltage sources are constants. Nodes
+         pinned to the same voltage merge into one node, unless a .DC
+         sweep moves their source. Resistors between two constants
+         (ground included) carry no information for the other nodes and
+         are dropped.
+      2. Parallel resistors merge into one conductance.
+      3. Dangling internal nodes (one neighbour) are removed with their
+         resistor. Degree-2 internal nodes are eliminated, joining their
+         two resistors in series. Both steps repeat until no internal
+         node has fewer than three neighbours. This collapses chains, trees
+         and series/parallel bundles.
+
+    Ground, voltage source terminals, subcircuit ports and the `keep`
+    nodes are never eliminated. Every elimination is recorded as
+    v_u = w_a * v_a + w_b * v_b over its neighbours at that time, so
+    eliminated voltages can be recovered from a solution of the reduced
+    circuit: expand() and node_voltages() for all of them, or
+    node_voltage() for one. Merged resistors get the name '~R<k>', so
+    per-resistor analyses (sensitivity, Monte Carlo) belong on the
+    original circuit.
+    """
+
+    def __init__(self, circuit, keep=()):
+        self.original = circuit.compile()
+        start = time.perf_counter()
+        with circuit_profiler.span('reduce', nodes=len(self.original.node_names) - 1):
+            self._reduce(set(keep))
+        seconds = time.perf_counter() - start
+        c, r = self.original, self.compiled
+        self.stats = {
+            'nodes': len(c.node_names) - 1,
+            'reduced_nodes': len(r.node_names) - 1,
+            'resistors': c.resistor_count,
+            'reduced_resistors': r.resistor_count,
+            'merged_constants': int((self.alias != np.arange(len(c.node_names))).sum()),
+            'dangling': self._dangling,
+            'series': self._series,
+            'seconds': seconds,
+        }
+        circuit_profiler.count('reduced_nodes', self.stats['reduced_nodes'])
+
+    def _reduce(self, keep):
+        c = self.original
+        n = len(c.node_names)
+        unknown = [name for name in keep if name not in c.node_ids]
+        if unknown:
+            raise ValueError(f"Unknown node(s) to keep: {', '.join(unknown)}")
+
+        # Constants: merge nodes pinned by grounded, unswept sources to equal voltages
+        n1, n2 = c.vs_node1.astype(np.int64), c.vs_node2.astype(np.int64)
+        grounded = (n1 == 0) != (n2 == 0)
+        pinned = np.where(n1 == 0, n2, n1)
+        swept = {name for sweep in c.dc_sweeps for name in (sweep['source'], sweep.get('source2'))}
+        pin_count = np.bincount(pinned[grounded], minlength=n)
+        alias = np.arange(n, dtype=np.int64)
+        representative = {}
+        for k in np.flatnonzero(grounded).tolist():
+            node = int(pinned[k])
+            if pin_count[node] == 1 and c.vs_names[k] not in swept:
+                alias[node] = representative.setdefault(float(c.voltages[k]), node)
+        constant = np.zeros(n, dtype=bool)
+        constant[0] = True
+        constant[alias[pinned[grounded]]] = True
+
+        terminal = constant.copy()
+        terminal[n1] = terminal[n2] = True
+        terminal[c.inst_nodes] = True
+        terminal[[c.node_ids[name] for name in keep]] = True
+
+        # Parallel resistors: one conductance per unordered node pair
+        a, b = alias[c.res_node1], alias[c.res_node2]
+        useful = (a != b) & ~(constant[a] & constant[b])
+        low, high = np.minimum(a, b)[useful], np.maximum(a, b)[useful]
+        pairs, inverse, counts = np.unique(low * n + high, return_inverse=True, return_counts=True)
+        g = np.bincount(inverse, weights=c.conductances[useful]).tolist()
+        first = np.zeros(len(pairs), dtype=np.int64)
+        first[inverse] = np.flatnonzero(useful)
+        names = [c.res_names[k] if single else None for k, single in zip(first.tolist(), (counts == 1).tolist())]
+        ends_a, ends_b = (pairs // n).tolist(), (pairs % n).tolist()
+
+        # adj[u][v] is the edge between u and v
+        adj = [{} for _ in range(n)]
+        for e, (u, v) in enumerate(zip(ends_a, ends_b)):
+            adj[u][v] = e
+            adj[v][u] = e
+        alive = [True] * len(g)
+
+        # Eliminate internal nodes of degree 1 and 2, worklist-driven
+        records = []   # (node, a, w_a, b, w_b)
+        dangling = series = 0
+        degree = np.bincount(np.concatenate([pairs // n, pairs % n]), minlength=n)
+        stack = np.flatnonzero(~terminal & (degree >= 1) & (degree <= 2)).tolist()
+        # Plain lists: per-element numpy indexing dominates this loop otherwise
+        eliminated = [False] * n
+        terminal = terminal.tolist()
+        while stack:
+            u = stack.pop()
+            if eliminated[u] or terminal[u]:
+                continue
+            neighbours = adj[u]
+            if len(neighbours) == 1:
+                (v, e), = neighbours.items()
+                del adj[v][u]
+                alive[e] = False
+                records.append((u, v, 1.0, 0, 0.0))
+                dangling += 1
+                touched = (v,)
+            elif len(neighbours) == 2:
+                (v, ev), (w, ew) = neighbours.items()
+                gv, gw = g[ev], g[ew]
+                del adj[v][u], adj[w][u]
+                alive[ev] = alive[ew] = False
+                records.append((u, v, gv / (gv + gw), w, gw / (gv + gw)))
+                joined = gv * gw / (gv + gw)
+                if w in adj[v]:
+                    e = adj[v][w]
+                    g[e] += joined
+                    names[e] = None
+                else:
+                    adj[v][w] = adj[w][v] = len(g)
+                    g.append(joined)
+                    names.append(None)
+                    alive.append(True)
+                    ends_a.append(v)
+                    ends_b.append(w)
+                series += 1
+                touched = (v, w)
+            else:
+                continue
+            adj[u] = {}
+            eliminated[u] = True
+            stack.extend(x for x in touched if not terminal[x] and len(adj[x]) <= 2)
+
+        self.alias = alias
+        self.records = records
+        self._dangling, self._series = dangling, series
+        self._build(np.flatnonzero(alive), g, names, ends_a, ends_b, np.array(eliminated, dtype=bool))
+
+    def _build(self, edges, g, names, ends_a, ends_b, eliminated):
+        c = self.original
+        n = len(c.node_names)
+        survivors = np.flatnonzero(~eliminated & (self.alias == np.arange(n)))
+        new_id = np.full(n, -1, dtype=np.int64)
+        new_id[survivors] = np.arange(len(survivors))
+        self.survivors = survivors
+
+        conductances = np.array(g)[edges]
+        merged = 0
+        res_names = []
+        for e in edges.tolist():
+            if names[e] is None:
+                names[e] = f"~R{merged}"
+                merged += 1
+            res_names.append(names[e])
+        node_ids = new_id[self.alias]
+        self.compiled = CompiledCircuit(
+            node_names=[c.node_names[k] for k in survivors.tolist()],
+            has_ground=c.has_ground,
+            res_names=res_names,
+            res_node1=new_id[np.array(ends_a, dtype=np.int64)[edges]].astype(np.int32),
+            res_node2=new_id[np.array(ends_b, dtype=np.int64)[edges]].astype(np.int32),
+            resistances=1.0 / conductances,
+            conductances=conductances,
+            vs_names=c.vs_names,
+            vs_node1=node_ids[c.vs_node1].astype(np.int32),
+            vs_node2=node_ids[c.vs_node2].astype(np.int32),
+            voltages=c.voltages,
+            dc_sweeps=c.dc_sweeps,
+            inst_names=c.inst_names,
+            inst_ptr=c.inst_ptr,
+            inst_nodes=node_ids[c.inst_nodes].astype(np.int32),
+            inst_models=c.inst_models,
+            model_names=c.model_names,
+            model_ports=c.model_ports,
+            model_values=c.model_values,
+        )
+
+    def expand(self, voltages):
+        """
+        Voltages of every original unknown node (ordered as
+        DCSolver(original).node_list) from an array over the reduced
+        circuit's unknowns. Accepts (..., n_reduced) batches, e.g. Monte
+        Carlo or sweep results.
+        """
+        voltages = np.asarray(voltages, dtype=float)
+        full = np.zeros(voltages.shape[:-1] + (len(self.original.node_names),))
+        full[..., self.survivors[1:]] = voltages
+        if full.ndim == 1:
+            values = full.tolist()
+            for u, a, wa, b, wb in reversed(self.records):
+                values[u] = wa * values[a] + wb * values[b]
+            full = np.array(values)
+        else:
+            for u, a, wa, b, wb in reversed(self.records):
+                full[..., u] = wa * full[..., a] + wb * full[..., b]
+        full = full[..., self.alias]
+        return full[..., 1:]
+
+    def node_voltages(self, reduced):
+        """ run_dc_analysis()-style dict for the original circuit from one over the reduced circuit. """
+        x = np.array([reduced[name] for name in self.compiled.node_names[1:]])
+        full = self.expand(x)
+        result = dict(zip(self.original.node_names[1:], full.tolist()))
+        result['0'] = 0.0
+        return result
+
+    def node_voltage(self, name, reduced):
+        """ Voltage of one original node, following only the eliminations it depends on. """
+        if not hasattr(self, '_record_index'):
+            self._record_index = {u: k for k, (u, *_) in enumerate(self.records)}
+        names = self.original.node_names
+        known = {0: 0.0}
+        stack = [int(self.alias[self.original.node_ids[name]])]
+        while stack:
+            node = stack[-1]
+            if node in known:
+                stack.pop()
+                continue
+            k = self._record_index.get(node)
+            if k is None:
+                known[stack.pop()] = reduced[names[node]]
+                continue
+            _, a, wa, b, wb = self.records[k]
+            pending = [x for x in (a, b) if x not in known]
+            if pending:
+                stack.extend(pending)
+            else:
+                known[stack.pop()] = wa * known[a] + wb * known[b]
+        return known[int(self.alias[self.original.node_ids[name]])]
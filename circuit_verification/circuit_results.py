@@ -0,0 +1,262 @@
+import json
+import os
+import numpy as np
+
+# On-disk layout of a ResultStore directory:
+#
+#   <store>/<dataset>/header.json    groups and their column names, attrs
+#   <store>/<dataset>/chunks.i64     (first_run, rows) int64 pair per chunk
+#   <store>/<dataset>/<group>.f64    float64 blocks, one per chunk, back to
+#                                    back; a chunk of `rows` runs over k
+#                                    columns is stored as (k, rows), so each
+#                                    column's values within a chunk are
+#                                    contiguous
+#
+# Appends write the data blocks first and the chunk record last, so a
+# crash mid-append leaves a dataset that simply ends at the previous
+# chunk; trailing bytes beyond the recorded chunks are cut off by the next
+# append.
+
+_CHUNK_RECORD = 2   # int64 values per chunks.i64 record
+
+
+class _ChunkColumns:
+    """ Read-only {column name: values} view of one chunk, materializing columns on access. """
+
+    def __init__(self, dataset, group, block):
+        self._index = dataset.column_index(group)
+        self._block = block
+
+    def __getitem__(self, name):
+        return self._block[self._index[name]]
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def keys(self):
+        return self._index.keys()
+
+
+def bounds_predicate(limits):
+    """
+    Predicate for ResultDataset queries from {column: (low, high)}: true
+    for runs with every listed column inside its bounds (None = open).
+    """
+    def predicate(columns):
+        mask = None
+        for name, (low, high) in limits.items():
+            values = columns[name]
+            inside = np.ones(len(values), dtype=bool)
+            if low is not None:
+                inside &= values >= low
+            if high is not None:
+                inside &= values <= high
+            mask = inside if mask is None else mask & inside
+        return mask
+    return predicate
+
+
+class ResultDataset:
+    """
+    Append-only columnar float64 table of runs, split into named groups of
+    columns (e.g. 'voltages' over nodes, 'resistances' over resistors)
+    that share run numbers. Every append() adds one chunk per group;
+    reads memory-map the group files, so a query touches only the chunks
+    and columns it needs and datasets can be far larger than memory.
+
+    Query with read() (columns and run range), iter_chunks() (the same,
+    streamed chunk by chunk) or query() (adds a filter predicate over any
+    columns). Runs come back in run order whatever order chunks were
+    appended in.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'header.json')) as f:
+            header = json.load(f)
+        self.groups = {group: list(columns) for group, columns in header['groups'].items()}
+        self.attrs = header.get('attrs', {})
+        self._indexes = {}
+        self._maps = {}
+        self._load_chunks()
+
+    @classmethod
+    def create(cls, path, groups, attrs=None):
+        """ Create an empty dataset at `path` with {group: column names}. """
+        os.makedirs(path)
+        for group in groups:
+            open(os.path.join(path, f'{group}.f64'), 'wb').close()
+        open(os.path.join(path, 'chunks.i64'), 'wb').close()
+        header = {'format': 1, 'dtype': '<f8',
+                  'groups': {group: list(columns) for group, columns in groups.items()},
+                  'attrs': attrs or {}}
+        with open(os.path.join(path, 'header.json'), 'w') as f:
+            json.dump(header, f, default=float)
+        return cls(path)
+
+    def _load_chunks(self):
+        raw = np.fromfile(os.path.join(self.path, 'chunks.i64'), dtype='<i8')
+        # A torn record from an interrupted append is ignored
+        records = raw[:len(raw) // _CHUNK_RECORD * _CHUNK_RECORD].reshape(-1, _CHUNK_RECORD)
+        self.chunk_runs = records[:, 0].copy()
+        self.chunk_rows = records[:, 1].copy()
+        self.chunk_offsets = np.concatenate([[0], np.cumsum(self.chunk_rows)])
+        self._maps = {}
+
+    @property
+    def runs(self):
+        """ Number of runs stored. """
+        return int(self.chunk_rows.sum())
+
+    @property
+    def next_run(self):
+        """ First run number after every stored run. """
+        if not len(self.chunk_rows):
+            return 0
+        return int((self.chunk_runs + self.chunk_rows).max())
+
+    def column_index(self, group):
+        if group not in self._indexes:
+            self._indexes[group] = {name: k for k, name in enumerate(self.groups[group])}
+        return self._indexes[group]
+
+    def append(self, first_run=None, **arrays):
+        """
+        Append one chunk: an (n, len(columns)) array for every group, all
+        with the same n, covering runs first_run .. first_run + n - 1
+        (default: right after the highest stored run). Returns first_run.
+        """
+        if set(arrays) != set(self.groups):
+            raise ValueError(f"append needs exactly the groups {', '.join(self.groups)}")
+        rows = {len(values) for values in arrays.values()}
+        if len(rows) != 1:
+            raise ValueError("Every group of a chunk needs the same number of runs")
+        rows = rows.pop()
+        first_run = self.next_run if first_run is None else int(first_run)
+        for group, values in arrays.items():
+            values = np.asarray(values, dtype='<f8')
+            if values.ndim != 2 or values.shape[1] != len(self.groups[group]):
+                raise ValueError(f"Group {group} needs shape (runs, {len(self.groups[group])}), "
+                                 f"got {values.shape}")
+            path = os.path.join(self.path, f'{group}.f64')
+            with open(path, 'r+b') as f:
+                f.truncate(int(self.chunk_offsets[-1]) * len(self.groups[group]) * 8)
+                f.seek(0, os.SEEK_END)
+                f.write(np.ascontiguousarray(values.T).tobytes())
+        with open(os.path.join(self.path, 'chunks.i64'), 'r+b') as f:
+            f.truncate(len(self.chunk_rows) * _CHUNK_RECORD * 8)
+            f.seek(0, os.SEEK_END)
+            f.write(np.array([first_run, rows], dtype='<i8').tobytes())
+        self._load_chunks()
+        return first_run
+
+    def _flat(self, group):
+        if group not in self._maps:
+            size = int(self.chunk_offsets[-1]) * len(self.groups[group])
+            if size == 0:
+                self._maps[group] = np.zeros(0)
+            else:
+                self._maps[group] = np.memmap(os.path.join(self.path, f'{group}.f64'), dtype='<f8',
+                                              mode='r', shape=(size,))
+        return self._maps[group]
+
+    def chunk(self, group, k):
+        """ Memory-mapped (columns, rows) block of chunk k of a group. """
+        width = len(self.groups[group])
+        start, stop = self.chunk_offsets[k], self.chunk_offsets[k + 1]
+        return self._flat(group)[start * width:stop * width].reshape(width, stop - start)
+
+    def iter_chunks(self, group='voltages', columns=None, start=0, stop=None, where=None, where_group=None):
+        """
+        Yield (runs, values) per chunk overlapping runs [start, stop), in
+        run order: runs is an int64 array of run numbers and values a
+        (len(runs), len(columns)) array. `where` is an optional predicate
+        called with a {column: values} view of the chunk (of
+        `where_group`, default `group`) that returns a boolean mask of
+        the runs to keep; only the columns it reads are loaded.
+        """
+        index = self.column_index(group)
+        names = self.groups[group] if columns is None else list(columns)
+        missing = [name for name in names if name not in index]
+        if missing:
+            raise KeyError(f"No column(s) {', '.join(missing)} in group {group}")
+        picks = [index[name] for name in names]
+        stop = self.next_run if stop is None else stop
+        where_group = where_group or group
+
+        for k in np.argsort(self.chunk_runs, kind='stable').tolist():
+            first, rows = int(self.chunk_runs[k]), int(self.chunk_rows[k])
+            lo, hi = max(start, first) - first, min(stop, first + rows) - first
+            if lo >= hi:
+                continue
+            runs = np.arange(first + lo, first + hi)
+            block = self.chunk(group, k)
+            keep = slice(lo, hi)
+            if where is not None:
+                mask = np.asarray(where(_ChunkColumns(self, where_group, self.chunk(where_group, k)[:, lo:hi])))
+                keep = lo + np.flatnonzero(mask)
+                runs = runs[mask]
+                if not len(runs):
+                    continue
+            # Columns are rows of the block, so each pick reads contiguous values
+            yield runs, np.stack([block[c, keep] for c in picks], axis=1) if picks else np.zeros((len(runs), 0))
+
+    def read(self, group='voltages', columns=None, start=0, stop=None):
+        """ (runs, values) of the given columns for runs [start, stop). """
+        return self.query(group, columns, start, stop)
+
+    def query(self, group='voltages', columns=None, start=0, stop=None, where=None, where_group=None):
+        """
+        iter_chunks() gathered into one (runs, values) pair. `where` may
+        also be a {column: (low, high)} dict (see bounds_predicate).
+        """
+        if isinstance(where, dict):
+            where = bounds_predicate(where)
+        width = len(self.groups[group]) if columns is None else len(columns)
+        parts = list(self.iter_chunks(group, columns, start, stop, where, where_group))
+        if not parts:
+            return np.zeros(0, dtype=np.int64), np.zeros((0, width))
+        return (np.concatenate([runs for runs, _ in parts]),
+                np.concatenate([values for _, values in parts]))
+
+    def column(self, name, group='voltages', start=0, stop=None):
+        """ Values of one column for runs [start, stop). """
+        return self.read(group, [name], start, stop)[1][:, 0]
+
+
+class ResultStore:
+    """
+    Directory of named ResultDatasets (one subdirectory each), e.g. the
+    DC operating point, each .DC sweep and Monte Carlo samples of a run.
+    """
+
+    def __init__(self, path):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+
+    def datasets(self):
+        return sorted(name for name in os.listdir(self.path)
+                      if os.path.isfile(os.path.join(self.path, name, 'header.json')))
+
+    def __contains__(self, name):
+        return os.path.isfile(os.path.join(self.path, name, 'header.json'))
+
+    def __getitem__(self, name):
+        if name not in self:
+            raise KeyError(f"No dataset {name} in {self.path}")
+        return ResultDataset(os.path.join(self.path, name))
+
+    def dataset(self, name, groups, attrs=None):
+        """
+        Open dataset `name` for appending, creating it with {group:
+        columns} if needed. An existing dataset must have the same groups
+        and columns, so later runs keep appending to it.
+        """
+        if os.sep in name or name.startswith('.'):
+            raise ValueError(f"Invalid dataset name '{name}'")
+        if name not in self:
+            return ResultDataset.create(os.path.join(self.path, name), groups, attrs)
+        dataset = self[name]
+        if dataset.groups != {group: list(columns) for group, columns in groups.items()}:
+            raise ValueError(f"Dataset {name} already exists with different columns")
+        return dataset
@@ -0,0 +1,424 @@
+import ast
+import copy
+import fnmatch
+import itertools
+import json
+import numpy as np
+import scipy.sparse as sp
+from .circuit_simulation import DCSolver
+from . import circuit_profiler
+
+# Quantity a rule can limit -> the element kind it runs over
+QUANTITIES = {
+    'voltage': 'node',               # node voltage
+    'branch_voltage': 'resistor',    # V(node1) - V(node2)
+    'current': 'resistor',           # from node1 to node2
+    'power': 'resistor',             # dissipated
+    'source_current': 'source',      # delivered into the circuit by a grounded source
+    'source_power': 'source',        # delivered by a grounded source
+}
+# Names an 'expr' rule can use besides V(), I(), P() and IS()
+EXPR_FUNCTIONS = {name: getattr(np, name) for name in
+                  ('abs', 'sqrt', 'exp', 'log', 'log10', 'minimum', 'maximum', 'where')}
+# Syntax an 'expr' rule may use: arithmetic, comparisons and calls by
+# name. Attribute access, subscripts, lambdas and the like are rejected
+# before compiling, as eval() without builtins is no sandbox. So are
+# 'and', 'or', 'not' and chained comparisons: Python gives them a single
+# truth value, which a block of samples does not have
+EXPR_NAMES = frozenset(EXPR_FUNCTIONS) | {'V', 'I', 'P', 'IS'}
+EXPR_NODES = (ast.Expression, ast.Name, ast.Load, ast.Constant, ast.BinOp, ast.UnaryOp, ast.Compare,
+              ast.Call, ast.operator, ast.unaryop, ast.cmpop)
+# Samples per evaluation block; a rule that fails stops at the end of its block
+BLOCK_ROWS = 4096
+# Violations listed per rule in a report
+MAX_REPORTS = 10
+
+
+class Rule:
+    """
+    One electrical rule: `quantity` over the elements (or nodes) whose
+    names match `select` (glob patterns), or a NumPy expression `expr`
+    over V('node'), I('resistor'), P('resistor') and IS('source'), must
+    stay within [min, max] (either may be omitted); `abs` compares
+    magnitudes.
+    """
+
+    def __init__(self, name, quantity=None, select='*', min=None, max=None, expr=None, abs=False):
+        if (quantity is None) == (expr is None):
+            raise ValueError(f"Rule {name}: give exactly one of 'quantity' and 'expr'")
+        if quantity is not None and quantity not in QUANTITIES:
+            raise ValueError(f"Rule {name}: unknown quantity '{quantity}' (choose from {', '.join(QUANTITIES)})")
+        if min is None and max is None:
+            raise ValueError(f"Rule {name}: needs 'min' and/or 'max'")
+        self.name = name
+        self.quantity = quantity
+        self.select = [select] if isinstance(select, str) else list(select)
+        self.min = -np.inf if min is None else float(min)
+        self.max = np.inf if max is None else float(max)
+        self.expr = expr
+        self.abs = bool(abs)
+
+    @classmethod
+    def from_dict(cls, spec, default_name):
+        known = {'name', 'quantity', 'select', 'min', 'max', 'expr', 'abs'}
+        unknown = set(spec) - known
+        if unknown:
+            raise ValueError(f"Rule {spec.get('name', default_name)}: unknown field(s) {', '.join(sorted(unknown))}")
+        return cls(**{'name': default_name, **spec})
+
+
+class _CompiledRule:
+    """ A Rule bound to a circuit: column indices (or code) and element labels. """
+
+    def __init__(self, rule):
+        self.name = rule.name
+        self.quantity = rule.quantity
+        self.min, self.max, self.abs = rule.min, rule.max, rule.abs
+        self.select = rule.select
+        self.columns = None
+        self.code = None
+        self.labels = []
+
+
+class RuleSet:
+    """
+    Rules loaded from a JSON file: a list of rule objects, or an object
+    with a "rules" list, e.g.
+        {"rules": [
+          {"name": "out", "quantity": "voltage", "select": "out*", "min": 1.2, "max": 1.8},
+          {"name": "r_power", "quantity": "power", "select": ["R*"], "max": 0.125},
+          {"name": "load", "quantity": "source_current", "select": "VDD", "abs": true, "max": 0.5},
+          {"name": "ratio", "expr": "V('out') / V('in')", "min": 0.45, "max": 0.55}
+        ]}
+    compile() binds them to one circuit.
+    """
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        names = [rule.name for rule in self.rules]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise ValueError(f"Duplicate rule name(s): {', '.join(duplicates)}")
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        specs = data.get('rules', []) if isinstance(data, dict) else data
+        return cls(Rule.from_dict(spec, f"rule{k}") for k, spec in enumerate(specs))
+
+    def compile(self, circuit):
+        return RuleEngine(self, circuit)
+
+
+class RuleReport:
+    """
+    Outcome of a RuleEngine over one or more evaluate() calls, per rule:
+    'passed', 'violations' ((sample, element) pairs out of limits among
+    the checked samples), 'checked' (samples evaluated), 'complete'
+    (False once an early exit skipped samples) and 'first' (the first
+    MAX_REPORTS violations as sample, element and value). Reports made
+    by RuleEngine.report() also accumulate chunks through update(), like
+    RunningStats does for Monte Carlo.
+    """
+
+    def __init__(self, rules, engine=None, early_exit=True):
+        self.rules = {rule.name: {'passed': True, 'violations': 0, 'checked': 0, 'complete': True, 'first': []}
+                      for rule in rules}
+        self.engine = engine
+        self.early_exit = early_exit
+
+    def update(self, voltages, resistances=None, first_sample=0):
+        """ Check one more chunk of samples with the engine this report belongs to. """
+        self.engine.evaluate(voltages, resistances, first_sample, self, self.early_exit)
+
+    @property
+    def passed(self):
+        return all(entry['passed'] for entry in self.rules.values())
+
+    def failed(self):
+        return [name for name, entry in self.rules.items() if not entry['passed']]
+
+    def summary(self):
+        """ JSON-ready copy of the per-rule results. """
+        return {name: {**entry, 'first': [dict(v) for v in entry['first']]} for name, entry in self.rules.items()}
+
+
+class _Batch:
+    """ Electrical quantities of one block of samples, computed on first use. """
+
+    def __init__(self, engine, voltages, conductances):
+        self.engine = engine
+        self.voltages = voltages
+        self.conductances = conductances
+        self._cache = {}
+
+    def node_voltage(self, nodes):
+        # Column -1 of the padded array is ground
+        return self.padded()[:, nodes]
+
+    def padded(self):
+        if 'padded' not in self._cache:
+            self._cache['padded'] = np.hstack([self.voltages, np.zeros((len(self.voltages), 1))])
+        return self._cache['padded']
+
+    def branch(self, resistors):
+        e = self.engine
+        V = self.padded()
+        return V[:, e.res_a[resistors]] - V[:, e.res_b[resistors]]
+
+    def current(self, resistors):
+        return self.branch(resistors) * self.conductances[:, resistors]
+
+    def power(self, resistors):
+        d = self.branch(resistors)
+        return d * d * self.conductances[:, resistors]
+
+    def node_currents(self):
+        """ (samples, n_nodes) net current out of every unknown node into the network. """
+        if 'out' not in self._cache:
+            e = self.engine
+            currents = self.current(np.arange(len(e.res_a)))
+            out = (e.incidence_t @ currents.T).T
+            if e.instances is not None:
+                out += (e.instances @ self.voltages.T).T
+            self._cache['out'] = np.asarray(out)
+        return self._cache['out']
+
+    def source_current(self, sources):
+        e = self.engine
+        out = np.hstack([self.node_currents(), np.full((len(self.voltages), 1), np.nan)])
+        return out[:, e.source_node[sources]]
+
+    def source_power(self, sources):
+        return self.source_current(sources) * self.padded()[:, self.engine.source_node[sources]]
+
+    def values(self, rule):
+        quantity = rule.quantity
+        if quantity == 'voltage':
+            return self.node_voltage(rule.columns)
+        if quantity == 'branch_voltage':
+            return self.branch(rule.columns)
+        if quantity == 'current':
+            return self.current(rule.columns)
+        if quantity == 'power':
+            return self.power(rule.columns)
+        if quantity == 'source_current':
+            return self.source_current(rule.columns)
+        return self.source_power(rule.columns)
+
+    def expression(self, rule):
+        e = self.engine
+
+        def lookup(kind, name):
+            index = e.names[kind]
+            if name not in index:
+                raise KeyError(f"Rule {rule.name}: no {kind} named '{name}'")
+            return index[name]
+
+        namespace = dict(EXPR_FUNCTIONS,
+                         V=lambda name: self.node_voltage([lookup('node', name)])[:, 0],
+                         I=lambda name: self.current([lookup('resistor', name)])[:, 0],
+                         P=lambda name: self.power([lookup('resistor', name)])[:, 0],
+                         IS=lambda name: self.source_current([lookup('source', name)])[:, 0])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            value = eval(rule.code, {'__builtins__': {}}, namespace)
+        return np.broadcast_to(np.asarray(value, dtype=float), (len(self.voltages),))[:, None]
+
+
+def _compile_expression(rule):
+    """ Code object of an expression rule, after checking its syntax tree against EXPR_NODES. """
+    try:
+        tree = ast.parse(rule.expr, f"<rule {rule.name}>", 'eval')
+    except SyntaxError as exc:
+        raise ValueError(f"Rule {rule.name}: invalid expression: {exc.msg}") from None
+    nodes = list(ast.walk(tree))
+    for node in nodes:
+        if isinstance(node, (ast.BoolOp, ast.Not)) or (isinstance(node, ast.Compare) and len(node.ops) > 1):
+            raise ValueError(f"Rule {rule.name}: 'and', 'or', 'not' and chained comparisons need one truth "
+                             f"value, not one per sample; use &, |, ~ on parenthesized comparisons or where()")
+        if not isinstance(node, EXPR_NODES):
+            raise ValueError(f"Rule {rule.name}: {type(node).__name__} is not allowed in an expression")
+    for node in nodes:
+        if isinstance(node, ast.Name) and node.id not in EXPR_NAMES:
+            raise ValueError(f"Rule {rule.name}: unknown name '{node.id}' "
+                             f"(use {', '.join(sorted(EXPR_NAMES))})")
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float, str)):
+            raise ValueError(f"Rule {rule.name}: constant {node.value!r} is not allowed in an expression")
+        if isinstance(node, ast.Call) and not isinstance(node.func, ast.Name):
+            raise ValueError(f"Rule {rule.name}: only calls of {', '.join(sorted(EXPR_NAMES))} are allowed")
+    return compile(tree, f"<rule {rule.name}>", 'eval')
+
+
+class RuleEngine:
+    """
+    A RuleSet compiled against one circuit: name patterns are resolved
+    to column indices once, expressions to code objects. evaluate() runs
+    every rule over a (samples, unknown nodes) voltage batch, e.g. the
+    nominal solution, Monte Carlo chunks or corner solves, block by block
+    with shared, lazily computed quantity arrays. With `early_exit` a
+    rule stops after the first block that violates it. Reports number
+    samples from `first_sample`.
+    """
+
+    def __init__(self, rule_set, circuit):
+        c = circuit.compile()
+        self.compiled = c
+        solver = DCSolver(c)
+        self.node_list = list(solver.node_list)
+        n = len(self.node_list)
+        self._bind_resistors(c)
+        self.instances = None
+        if c.instance_count:
+            inst_rows, inst_cols, inst_vals = solver._instance_stamps()
+            self.instances = sp.csr_matrix((inst_vals, (inst_rows, inst_cols)), shape=(n, n))
+
+        # Grounded sources deliver the net current out of their pinned
+        # node; others get column -1 (NaN current, never a violation)
+        n1, n2 = c.vs_node1.astype(np.int64), c.vs_node2.astype(np.int64)
+        grounded = (n1 == 0) != (n2 == 0)
+        self.source_node = np.where(grounded, np.where(n1 == 0, n2, n1) - 1, -1)
+
+        self.names = {
+            'node': {name: k for k, name in enumerate(self.node_list)},
+            'resistor': {name: k for k, name in enumerate(c.res_names)},
+            'source': {name: k for k, name in enumerate(c.vs_names)},
+        }
+        self.names['node']['0'] = -1
+        labels = {'node': self.node_list, 'resistor': list(c.res_names), 'source': list(c.vs_names)}
+
+        self.rules = []
+        for rule in rule_set.rules:
+            compiled = _CompiledRule(rule)
+            if rule.expr is not None:
+                compiled.code = _compile_expression(rule)
+                compiled.labels = [rule.expr]
+                self._resolve_names(compiled)
+            else:
+                kind = QUANTITIES[rule.quantity]
+                names = labels[kind]
+                matched = set()
+                for pattern in rule.select:
+                    matched.update(fnmatch.filter(names, pattern))
+                compiled.columns = np.array(sorted(self.names[kind][name] for name in matched), dtype=np.int64)
+                compiled.labels = [names[k] for k in compiled.columns.tolist()]
+                if not len(compiled.columns):
+                    print(f"Warning: rule {rule.name} selects no {kind} (patterns {', '.join(rule.select)})")
+            self.rules.append(compiled)
+
+    def _bind_resistors(self, c):
+        """ Resistor terminals and node-current incidence of circuit c. """
+        self.res_a = c.res_node1.astype(np.int64) - 1
+        self.res_b = c.res_node2.astype(np.int64) - 1
+        n, m = len(self.node_list), c.resistor_count
+        # Net current out of each node: A^T i over the resistor currents
+        rows = np.concatenate([self.res_a, self.res_b])
+        cols = np.concatenate([np.arange(m), np.arange(m)])
+        vals = np.concatenate([np.ones(m), -np.ones(m)])
+        keep = rows >= 0
+        self.incidence_t = sp.csr_matrix((vals[keep], (rows[keep], cols[keep])), shape=(n, m))
+
+    def _resolve_names(self, rule):
+        """ A dry run of an expression rule on one zero sample resolves every name up front. """
+        try:
+            with np.errstate(all='ignore'):
+                _Batch(self, np.zeros((1, len(self.node_list))),
+                       np.ones((1, len(self.res_a)))).expression(rule)
+        except KeyError as exc:
+            raise ValueError(exc.args[0]) from None
+
+    def with_resistors(self, circuit, keep, added):
+        """
+        This engine bound to `circuit`, which has the nodes and sources of
+        the compiled one and its resistors where `keep` is True followed by
+        the resistors named in `added`: kept columns are renumbered and
+        only the added names are matched against the rule patterns.
+        """
+        engine = copy.copy(self)
+        c = circuit.compile()
+        engine.compiled = c
+        engine._bind_resistors(c)
+        first_new = int(keep.sum())
+        if keep.all():
+            names = dict(self.names['resistor'])
+            names.update((name, first_new + k) for k, name in enumerate(added))
+        else:
+            names = dict(zip(c.res_names, range(c.resistor_count)))
+        engine.names = dict(self.names, resistor=names)
+        remap = np.cumsum(keep) - 1
+
+        engine.rules = []
+        for rule in self.rules:
+            rule = copy.copy(rule)
+            if rule.code is not None:
+                engine._resolve_names(rule)
+            elif QUANTITIES[rule.quantity] == 'resistor':
+                matched = set()
+                for pattern in rule.select:
+                    matched.update(fnmatch.filter(added, pattern))
+                new = [k for k, name in enumerate(added) if name in matched]
+                kept = keep[rule.columns]
+                rule.columns = np.concatenate([remap[rule.columns[kept]], np.array(new, dtype=np.int64) + first_new])
+                rule.labels = list(itertools.compress(rule.labels, kept.tolist())) + [added[k] for k in new]
+            engine.rules.append(rule)
+        return engine
+
+    def report(self, early_exit=True):
+        """ An empty RuleReport that update() fills chunk by chunk. """
+        return RuleReport(self.rules, self, early_exit)
+
+    def evaluate(self, voltages, resistances=None, first_sample=0, report=None, early_exit=True, only=None):
+        """
+        Check every rule (or only the rules named in `only`) on the rows
+        of `voltages` ((samples, n_nodes) in node_list order, or one
+        solution as a 1-D array or run_dc_analysis() dict) with
+        per-sample `resistances` (default: nominal). Adds to `report` (a
+        new RuleReport by default) and returns it.
+        """
+        if isinstance(voltages, dict):
+            voltages = [voltages[node] for node in self.node_list]
+        voltages = np.atleast_2d(np.asarray(voltages, dtype=float))
+        if resistances is None:
+            conductances = np.broadcast_to(self.compiled.conductances, (len(voltages), self.compiled.resistor_count))
+        else:
+            conductances = 1.0 / np.atleast_2d(np.asarray(resistances, dtype=float))
+        report = report if report is not None else self.report(early_exit)
+
+        rules = self.rules if only is None else [rule for rule in self.rules if rule.name in only]
+        active = [rule for rule in rules if not (early_exit and not report.rules[rule.name]['passed'])]
+        if early_exit and len(voltages):
+            # Rules that already failed skip these samples entirely
+            for rule in rules:
+                if not report.rules[rule.name]['passed']:
+                    report.rules[rule.name]['complete'] = False
+        with circuit_profiler.span('rules', rules=len(active), samples=len(voltages)):
+            for start in range(0, len(voltages), BLOCK_ROWS):
+                if not active:
+                    break
+                stop = min(start + BLOCK_ROWS, len(voltages))
+                batch = _Batch(self, voltages[start:stop], conductances[start:stop])
+                still = []
+                for rule in active:
+                    entry = report.rules[rule.name]
+                    values = batch.expression(rule) if rule.code is not None else batch.values(rule)
+                    checked = values if not rule.abs else np.abs(values)
+                    bad = (checked < rule.min) | (checked > rule.max)
+                    entry['checked'] += stop - start
+                    if bad.any():
+                        entry['passed'] = False
+                        entry['violations'] += int(bad.sum())
+                        room = MAX_REPORTS - len(entry['first'])
+                        if room > 0:
+                            # Row-major nonzero: earliest samples first
+                            samples, columns = np.nonzero(bad)
+                            for s, k in zip(samples[:room].tolist(), columns[:room].tolist()):
+                                entry['first'].append({'sample': first_sample + start + s,
+                                                       'element': rule.labels[k],
+                                                       'value': float(values[s, k])})
+                        if early_exit:
+                            if stop < len(voltages):
+                                entry['complete'] = False
+                            continue
+                    still.append(rule)
+                active = still
+        return report
@@ -0,0 +1,249 @@
+import warnings
+import numpy as np
+from scipy.special import ndtr, ndtri
+from scipy.stats import norm, qmc, t as student_t
+from .circuit_simulation import DCSolver
+from . import circuit_profiler
+
+SAMPLERS = ('random', 'lhs', 'sobol', 'importance')
+DISTRIBUTIONS = ('uniform', 'normal', 'truncnormal')
+# 'tolerance' is this many standard deviations for the normal distributions
+SIGMAS = 3.0
+# Exploration spreads tried (in standard deviations) when looking for
+# failures to centre the importance-sampling density on
+EXPLORE_SCALES = (2.0, 3.0, 4.0, 6.0)
+# Points on the ray searched for the failure boundary (see _boundary)
+BOUNDARY_STEPS = 64
+
+
+def unit_samples(sampler, runs, dimensions, rng):
+    """
+    (runs, dimensions) points in the open unit cube: independent uniforms
+    ('random'), a Latin hypercube ('lhs', one point per 1/runs stratum
+    of every dimension) or a scrambled Sobol sequence ('sobol').
+    """
+    if sampler == 'random':
+        return rng.random((runs, dimensions))
+    if sampler == 'lhs':
+        return qmc.LatinHypercube(dimensions, seed=rng).random(runs)
+    if sampler == 'sobol':
+        with warnings.catch_warnings():
+            # Balance properties need a power of 2; other counts still work
+            warnings.simplefilter('ignore', UserWarning)
+            return qmc.Sobol(dimensions, scramble=True, seed=rng).random(runs)
+    raise ValueError(f"Unknown sampler '{sampler}' (choose from {', '.join(SAMPLERS)})")
+
+def factors_from_normal(z, distribution, tolerance):
+    """
+    Multiplicative tolerance factors 1 + delta from standard normal
+    coordinates z: 'normal' has sigma = tolerance / SIGMAS, 'truncnormal'
+    is that normal cut at +-tolerance, 'uniform' is U(-tolerance,
+    tolerance). Every distribution is a monotone map of z, which lets
+    importance sampling shift all of them in the same space.
+    """
+    return factors_from_unit(None, distribution, tolerance, z=z)
+
+def factors_from_unit(u, distribution, tolerance, z=None):
+    """ As factors_from_normal, from uniforms u in (0, 1) (or z = ndtri(u) when given). """
+    sigma = tolerance / SIGMAS
+    if distribution == 'uniform':
+        u = ndtr(z) if z is not None else u
+        return 1.0 + tolerance * (2.0 * u - 1.0)
+    if distribution == 'normal':
+        z = ndtri(u) if z is None else z
+        return 1.0 + sigma * z
+    if distribution == 'truncnormal':
+        u = ndtr(z) if z is not None else u
+        edge = ndtr(-SIGMAS)
+        return 1.0 + sigma * ndtri(edge + u * (1.0 - 2.0 * edge))
+    raise ValueError(f"Unknown distribution '{distribution}' (choose from {', '.join(DISTRIBUTIONS)})")
+
+def tolerance_factors(runs, dimensions, tolerance=0.05, sampler='random', distribution='uniform', seed=None):
+    """ (runs, dimensions) tolerance factors from one of the space-filling samplers. """
+    rng = np.random.default_rng(seed)
+    return factors_from_unit(unit_samples(sampler, runs, dimensions, rng), distribution, tolerance)
+
+def wilson_interval(failures, runs, confidence=0.95):
+    """ Wilson score interval of a binomial proportion; stays inside [0, 1] even at 0 failures. """
+    if runs == 0:
+        return 0.0, 1.0
+    zq = norm.ppf(0.5 + confidence / 2)
+    p = failures / runs
+    centre = (p + zq ** 2 / (2 * runs)) / (1 + zq ** 2 / runs)
+    half = zq * np.sqrt(p * (1 - p) / runs + zq ** 2 / (4 * runs ** 2)) / (1 + zq ** 2 / runs)
+    return float(max(0.0, centre - half)), float(min(1.0, centre + half))
+
+
+class YieldEstimator:
+    """
+    Failure probability (and yield) of spec limits on node voltages under
+    resistor tolerances, for a CircuitAnalysis.
+
+      limits       - {node: (low, high)}; either bound may be None
+      tolerance    - relative tolerance (the 3 sigma point for normals)
+      distribution - 'uniform', 'normal' or 'truncnormal'
+
+    estimate() supports four samplers. 'random' is plain Monte Carlo and
+    'lhs' a Latin hypercube; both use a Wilson interval, which is
+    conservative for LHS. 'sobol' is scrambled Sobol QMC; its interval
+    comes from independently scrambled replicates. 'importance' is
+    mean-shift importance sampling: a short exploration at inflated
+    spread finds failing points, the sampling density N(mu, I) in
+    standard normal space is centred where the ray to their
+    likelihood-weighted mean crosses the failure boundary, one
+    cross-entropy pilot step refines that centre, and each sample is weighted by phi(z) / phi(z - mu). Only
+    importance sampling reaches parts-per-million failure rates without
+    millions of solves. Circuits are solved in batches of `chunk_size`
+    with the stacked dense solver behind Monte Carlo.
+    """
+
+    def __init__(self, analysis, limits, tolerance=0.05, distribution='uniform', chunk_size=10000):
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown distribution '{distribution}' (choose from {', '.join(DISTRIBUTIONS)})")
+        self.analysis = analysis
+        self.tolerance = tolerance
+        self.distribution = distribution
+        self.chunk_size = chunk_size
+        self.solver = DCSolver(analysis.compiled)
+        self.node_list = list(self.solver.node_list)
+        self.nominal = np.asarray(analysis.compiled.resistances, dtype=float)
+        self._incidence = None
+
+        index = {node: k for k, node in enumerate(self.node_list)}
+        unknown = [node for node in limits if node not in index]
+        if unknown:
+            raise ValueError(f"Spec limits for unknown node(s): {', '.join(unknown)}")
+        if not limits:
+            raise ValueError("Yield estimation needs at least one spec limit")
+        self.columns = np.array([index[node] for node in limits], dtype=np.int64)
+        self.low = np.array([-np.inf if low is None else low for low, _ in limits.values()])
+        self.high = np.array([np.inf if high is None else high for _, high in limits.values()])
+        self.solves = 0
+
+    def fails(self, factors):
+        """ Boolean per row of `factors`: does that sample violate any spec limit? """
+        if self._incidence is None:
+            self._incidence = self.solver.incidence_matrix()
+        result = np.empty(len(factors), dtype=bool)
+        for start in range(0, len(factors), self.chunk_size):
+            chunk = factors[start:start + self.chunk_size]
+            voltages = self.solver.solve_batch(self._incidence, 1.0 / (self.nominal * chunk))
+            watched = voltages[:, self.columns]
+            result[start:start + len(chunk)] = ((watched < self.low) | (watched > self.high)).any(axis=1)
+        self.solves += len(factors)
+        return result
+
+    def estimate(self, runs=1000, sampler='lhs', seed=None, confidence=0.95, replicates=None,
+                 explore_runs=None):
+        """
+        Estimate with about `runs` circuit solves. Returns a dict with
+        'failure_probability', 'yield', their confidence intervals
+        'failure_ci' and 'yield_ci', 'std_error', 'solves' (including any
+        exploration), 'sampler' and 'distribution'; importance sampling
+        adds 'shift' (|mu|) and 'effective_sample_size'. `replicates`
+        (default 8 for 'sobol', else 1) splits the runs into independently
+        randomized batches whose spread gives the interval.
+        """
+        if sampler not in SAMPLERS:
+            raise ValueError(f"Unknown sampler '{sampler}' (choose from {', '.join(SAMPLERS)})")
+        rng = np.random.default_rng(seed)
+        self.solves = 0
+        with circuit_profiler.span('yield', sampler=sampler, runs=runs):
+            if sampler == 'importance':
+                result = self._importance(runs, rng, confidence, explore_runs)
+            else:
+                result = self._stratified(runs, sampler, rng, confidence,
+                                          replicates or (8 if sampler == 'sobol' else 1))
+        result.update(sampler=sampler, distribution=self.distribution, solves=self.solves,
+                      **{'yield': 1.0 - result['failure_probability'],
+                         'yield_ci': (1.0 - result['failure_ci'][1], 1.0 - result['failure_ci'][0])})
+        return result
+
+    def _stratified(self, runs, sampler, rng, confidence, replicates):
+        d = len(self.nominal)
+        size = max(1, runs // replicates)
+        estimates, failures = [], 0
+        for _ in range(replicates):
+            failed = self.fails(factors_from_unit(unit_samples(sampler, size, d, rng), self.distribution,
+                                                  self.tolerance))
+            failures += int(failed.sum())
+            estimates.append(failed.mean())
+        p = float(np.mean(estimates))
+        if replicates == 1 or failures == 0:
+            # The replicate spread is zero without failures: use the
+            # binomial interval over all samples, which keeps an upper bound
+            ci = wilson_interval(failures, size * replicates, confidence)
+            std_error = float(np.sqrt(p * (1 - p) / (size * replicates)))
+        else:
+            std_error = float(np.std(estimates, ddof=1) / np.sqrt(replicates))
+            half = student_t.ppf(0.5 + confidence / 2, replicates - 1) * std_error
+            ci = (float(max(0.0, p - half)), float(min(1.0, p + half)))
+        return {'failure_probability': p, 'failure_ci': ci, 'std_error': std_error, 'failures': failures}
+
+    def _boundary(self, point, steps=BOUNDARY_STEPS):
+        """
+        Pull a failing point back along the ray from the origin to the
+        first failing point on a grid of `steps`: the exploration centroid
+        overshoots the most probable failure point, and a shift past it
+        makes the weights degenerate.
+        """
+        scales = np.arange(1, steps + 1) / steps
+        failed = self.fails(factors_from_normal(scales[:, None] * point, self.distribution, self.tolerance))
+        if not failed.any():
+            return point
+        return scales[np.argmax(failed)] * point
+
+    def _importance(self, runs, rng, confidence, explore_runs):
+        d = len(self.nominal)
+        explore_runs = explore_runs if explore_runs is not None else max(128, runs // 5)
+        per_scale = max(1, explore_runs // (2 * len(EXPLORE_SCALES)))
+
+        # Exploration: inflated normal spread until some samples fail
+        shift = None
+        for scale in EXPLORE_SCALES:
+            z = scale * rng.standard_normal((per_scale, d))
+            failed = self.fails(factors_from_normal(z, self.distribution, self.tolerance))
+            if failed.any():
+                # Weight failing points by their nominal likelihood: the
+                # centroid leans towards the most probable failures
+                zf = z[failed]
+                log_w = -0.5 * (zf ** 2).sum(axis=1)
+                w = np.exp(log_w - log_w.max())
+                shift = self._boundary((w[:, None] * zf).sum(axis=0) / w.sum())
+                break
+
+        if shift is None:
+            print(f"Warning: no failures found while exploring up to {EXPLORE_SCALES[-1]:g} sigma; "
+                  f"importance sampling falls back to plain Monte Carlo")
+            shift = np.zeros(d)
+        else:
+            # One cross-entropy step: a pilot around the boundary point
+            # moves the shift to the importance-weighted mean of failures,
+            # which corrects the direction of the sparse exploration
+            z = shift + rng.standard_normal((max(1, explore_runs // 2), d))
+            failed = self.fails(factors_from_normal(z, self.distribution, self.tolerance))
+            if failed.any():
+                zf = z[failed]
+                log_w = -zf @ shift
+                w = np.exp(log_w - log_w.max())
+                shift = (w[:, None] * zf).sum(axis=0) / w.sum()
+
+        n = max(1, runs - self.solves)
+        z = shift + rng.standard_normal((n, d))
+        failed = self.fails(factors_from_normal(z, self.distribution, self.tolerance))
+        weights = np.exp(-z @ shift + 0.5 * shift @ shift)
+        values = np.where(failed, weights, 0.0)
+        p = float(values.mean())
+        std_error = float(values.std(ddof=1) / np.sqrt(n)) if n > 1 else float('inf')
+        half = norm.ppf(0.5 + confidence / 2) * std_error
+        hits = weights[failed]
+        ess = float(hits.sum() ** 2 / (hits ** 2).sum()) if len(hits) else 0.0
+        if len(hits):
+            ci = (float(max(0.0, p - half)), float(min(1.0, p + half)))
+        else:
+            # No failures leaves a zero sample variance: bound the rate
+            # with the binomial interval of the final samples instead
+            ci = wilson_interval(0, n, confidence)
+        return {'failure_probability': p, 'failure_ci': ci,
+                'std_error': std_error, 'failures': int(failed.sum()),
+                'shift': float(np.linalg.norm(shift)), 'effective_sample_size': ess}
@@ -0,0 +1,370 @@
+import asyncio
+import json
+import os
+import socket
+import stat
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from .circuit_parser import CircuitParser
+from .circuit_simulation import DCSolver
+from .circuit_analysis import CircuitAnalysis
+from .circuit_verifier import CircuitVerifier
+from .circuit_batch import _json_default
+
+# Largest request or response line, in bytes
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024
+
+
+class CircuitSession:
+    """
+    One parsed version of a netlist and everything computed from it:
+    solvers (keeping their factorizations) by method, and the encoded
+    result of every request answered so far, keyed by (op, params).
+    """
+
+    def __init__(self, path, fingerprint, compiled, parse_stats):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.compiled = compiled
+        self.parse_stats = parse_stats
+        self.results = {}
+        self._solvers = {}
+        self._lock = threading.Lock()
+
+    def solver(self, method='auto'):
+        """ Shared DCSolver for `method`, factorized on first use. """
+        with self._lock:
+            solver = self._solvers.get(method)
+            if solver is None:
+                solver = DCSolver(self.compiled, method=method)
+                if method != 'cg' and len(solver.node_list):
+                    solver.factorize()
+                self._solvers[method] = solver
+            return solver
+
+    @property
+    def nbytes(self):
+        """ Approximate memory held: compiled arrays, LU factors and cached results. """
+        total = sum(getattr(self.compiled, name).nbytes for name in self.compiled.ARRAY_FIELDS)
+        for solver in list(self._solvers.values()):
+            if solver.factorization is not None:
+                total += 12 * solver.factorization.nnz
+        return total + sum(len(text) for text in list(self.results.values()))
+
+
+class CircuitCache:
+    """
+    LRU of CircuitSessions by netlist path, bounded by entry count and by
+    approximate bytes. An entry is only returned while the file's size
+    and mtime still match the ones it was parsed from.
+    """
+
+    def __init__(self, max_entries=32, max_bytes=1 << 30):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sessions = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, path, fingerprint):
+        session = self._sessions.get(path)
+        if session is None or session.fingerprint != fingerprint:
+            self.misses += 1
+            return None
+        self._sessions.move_to_end(path)
+        self.hits += 1
+        return session
+
+    def put(self, session):
+        self._sessions[session.path] = session
+        self._sessions.move_to_end(session.path)
+        self.trim()
+
+    def trim(self):
+        """ Drop least recently used sessions until both bounds hold (the newest always stays). """
+        while len(self._sessions) > 1 and (len(self._sessions) > self.max_entries
+                                           or self.nbytes > self.max_bytes):
+            self._sessions.popitem(last=False)
+
+    def evict(self, path=None):
+        """ Drop one path (or everything); returns the number of sessions dropped. """
+        if path is None:
+            count = len(self._sessions)
+            self._sessions.clear()
+            return count
+        return 1 if self._sessions.pop(path, None) is not None else 0
+
+    @property
+    def nbytes(self):
+        return sum(session.nbytes for session in self._sessions.values())
+
+    def stats(self):
+        return {'entries': len(self._sessions), 'bytes': self.nbytes, 'hits': self.hits,
+                'misses': self.misses, 'paths': list(self._sessions)}
+
+
+def netlist_fingerprint(path):
+    """ (size, mtime_ns) of a netlist; a change in either means re-parse. """
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+def _voltages(session, params):
+    """ Operating point as {node: volts}, optionally for a subset of nodes. """
+    solver = session.solver(params.get('method', 'auto'))
+    node_voltages = solver.run_dc_analysis()
+    nodes = params.get('nodes')
+    if nodes is not None:
+        missing = [node for node in nodes if node not in node_voltages]
+        if missing:
+            raise KeyError(f"Unknown nodes: {', '.join(missing)}")
+        node_voltages = {node: node_voltages[node] for node in nodes}
+    return {node: float(v) for node, v in node_voltages.items()}
+
+def _parse_result(session, params):
+    compiled = session.compiled
+    return {'nodes': compiled.node_count, 'resistors': compiled.resistor_count,
+            'voltage_sources': compiled.voltage_source_count,
+            'subcircuit_instances': compiled.instance_count, 'parse': session.parse_stats}
+
+def _solve_result(session, params):
+    return {'node_voltages': _voltages(session, params)}
+
+def _analyze_result(session, params):
+    return CircuitAnalysis(session.compiled).run_analysis()
+
+def _verify_result(session, params):
+    analysis_results = CircuitAnalysis(session.compiled).run_analysis()
+    try:
+        node_voltages = _voltages(session, {})
+    except np.linalg.LinAlgError:
+        node_voltages = {}
+    verifier = CircuitVerifier(session.compiled, node_voltages, analysis_results)
+    checks = verifier.verify()
+    return {'passed': all(checks.values()), 'checks': checks,
+            'floating_nodes': verifier.floating_nodes()}
+
+def _monte_carlo_result(session, params):
+    """ Per-node mean, std, min and max over the runs (full runs would not fit a reply). """
+    batch = CircuitAnalysis(session.compiled).run_monte_carlo_batch(
+        runs=params.get('runs', 1000), tolerance=params.get('tolerance', 0.05), seed=params.get('seed'))
+    voltages = batch['voltages']
+    columns = range(len(batch['nodes']))
+    if params.get('nodes') is not None:
+        index = {node: k for k, node in enumerate(batch['nodes'])}
+        columns = [index[node] for node in params['nodes']]
+    return {'runs': len(voltages), 'nodes': {
+        batch['nodes'][k]: {'mean': float(voltages[:, k].mean()), 'std': float(voltages[:, k].std()),
+                            'min': float(voltages[:, k].min()), 'max': float(voltages[:, k].max())}
+        for k in columns}}
+
+
+class VerificationServer:
+    """
+    Long-running verification daemon on a Unix socket.
+
+    Clients send one JSON object per line, e.g.
+        {"id": 1, "op": "solve", "netlist": "amp.net", "nodes": ["out"]}
+    and get one line back per request (in completion order, matched by
+    "id"): {"id", "ok", "cached", "seconds", "result"} or {"id", "ok":
+    false, "error"}.
+
+    Netlist ops (OPS: parse, solve, analyze, verify, monte_carlo) work on
+    a CircuitSession from a CircuitCache, so a netlist is parsed and G
+    factorized once per file version, and every answer is kept encoded in
+    the session: a repeated request costs a stat() and a dict lookup on
+    the event loop. Parsing, factorization and analyses run on a thread
+    pool, so one client's slow request does not stall the others;
+    concurrent identical requests share one computation. Monte Carlo
+    answers are only cached when a seed is given. Server ops: ping,
+    stats, evict (one "netlist" or all), shutdown.
+    """
+
+    OPS = {
+        'parse': _parse_result,
+        'solve': _solve_result,
+        'analyze': _analyze_result,
+        'verify': _verify_result,
+        'monte_carlo': _monte_carlo_result,
+    }
+
+    def __init__(self, socket_path, cache=None, workers=None, use_cache=True):
+        self.socket_path = socket_path
+        self.cache = cache or CircuitCache()
+        self.use_cache = use_cache
+        self.executor = ThreadPoolExecutor(max_workers=workers or os.cpu_count())
+        self.requests = 0
+        self._inflight = {}
+        self._clients = {}  # handler task -> its stream writer
+        self._server = None
+        self._closed = None
+
+    async def start(self):
+        if os.path.exists(self.socket_path) and stat.S_ISSOCK(os.stat(self.socket_path).st_mode):
+            os.unlink(self.socket_path)  # left over from a previous run
+        self._closed = asyncio.Event()
+        self._server = await asyncio.start_unix_server(self._handle_client, path=self.socket_path,
+                                                       limit=MAX_MESSAGE_SIZE)
+
+    async def serve_forever(self):
+        """ Serve until a 'shutdown' request (or cancellation), then clean up. """
+        if self._server is None:
+            await self.start()
+        try:
+            await self._closed.wait()
+        finally:
+            self._server.close()
+            # Closing a connection ends its handler's readline with EOF
+            for writer in self._clients.values():
+                writer.close()
+            await asyncio.gather(*self._clients, return_exceptions=True)
+            await self._server.wait_closed()
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    async def _handle_client(self, reader, writer):
+        lock = asyncio.Lock()
+        tasks = set()
+        self._clients[asyncio.current_task()] = writer
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.ensure_future(self._answer(line, writer, lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            self._clients.pop(asyncio.current_task(), None)
+            writer.close()
+
+    async def _answer(self, line, writer, lock):
+        start = time.perf_counter()
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get('id')
+            cached, result = await self.handle(request)
+            reply = (f'{{"id": {json.dumps(request_id)}, "ok": true, "cached": {json.dumps(cached)}, '
+                     f'"seconds": {time.perf_counter() - start!r}, "result": {result}}}\n')
+        except Exception as exc:
+            reply = json.dumps({'id': request_id, 'ok': False, 'error': f"{type(exc).__name__}: {exc}"}) + '\n'
+        async with lock:
+            writer.write(reply.encode())
+            await writer.drain()
+
+    async def handle(self, request):
+        """ (cached, encoded JSON result) for one request dict. """
+        self.requests += 1
+        op = request.get('op')
+        if op == 'ping':
+            return False, '"pong"'
+        if op == 'stats':
+            stats = {'requests': self.requests, **self.cache.stats()}
+            return False, json.dumps(stats)
+        if op == 'evict':
+            path = request.get('netlist')
+            return False, json.dumps(self.cache.evict(None if path is None else os.path.realpath(path)))
+        if op == 'shutdown':
+            self._closed.set()
+            return False, 'true'
+        if op not in self.OPS:
+            raise ValueError(f"Unknown op '{op}'")
+        if 'netlist' not in request:
+            raise ValueError(f"'{op}' needs a 'netlist' path")
+
+        session = await self.session(request['netlist'])
+        params = {k: v for k, v in request.items() if k not in ('id', 'op', 'netlist')}
+        key = (op, json.dumps(params, sort_keys=True))
+        result = session.results.get(key)
+        if result is not None:
+            return True, result
+        result = await self._shared(('result', session, key), self._compute, session, op, params)
+        if op != 'monte_carlo' or params.get('seed') is not None:
+            session.results[key] = result
+            self.cache.trim()
+        return False, result
+
+    async def session(self, netlist):
+        """ Cached session for the current version of `netlist`, parsing it if needed. """
+        path = os.path.realpath(netlist)
+        fingerprint = netlist_fingerprint(path)
+        session = self.cache.get(path, fingerprint)
+        if session is None:
+            session = await self._shared(('parse', path, fingerprint), self._load, path, fingerprint)
+            self.cache.put(session)
+        return session
+
+    async def _shared(self, key, func, *args):
+        """ Run func(*args) on the thread pool, once per key among concurrent callers. """
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+    def _load(self, path, fingerprint):
+        parser = CircuitParser(path, use_cache=self.use_cache)
+        compiled = parser.parse_compiled()
+        return CircuitSession(path, fingerprint, compiled, parser.stats)
+
+    def _compute(self, session, op, params):
+        return json.dumps(self.OPS[op](session, params), default=_json_default)
+
+
+def serve(socket_path, cache_entries=32, cache_bytes=1 << 30, workers=None, use_cache=True):
+    """ Run a VerificationServer until it receives a 'shutdown' request. """
+    server = VerificationServer(socket_path, CircuitCache(cache_entries, cache_bytes),
+                                workers=workers, use_cache=use_cache)
+    asyncio.run(server.serve_forever())
+
+
+class VerificationClient:
+    """
+    Blocking client for a VerificationServer: request(op, netlist, **params)
+    returns the reply's 'result', raising RuntimeError for an error reply.
+    Requests on one client are sent one at a time.
+    """
+
+    def __init__(self, socket_path, timeout=None):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(socket_path)
+        self.file = self.sock.makefile('rb')
+        self._next_id = 0
+        self.last_reply = None
+
+    def request(self, op, netlist=None, **params):
+        self._next_id += 1
+        message = {'id': self._next_id, 'op': op, **params}
+        if netlist is not None:
+            message['netlist'] = netlist
+        self.sock.sendall(json.dumps(message).encode() + b'\n')
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("server closed the connection")
+        self.last_reply = json.loads(line)
+        if not self.last_reply['ok']:
+            raise RuntimeError(self.last_reply['error'])
+        return self.last_reply['result']
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
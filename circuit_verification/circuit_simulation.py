@@ -128,100 +128,777 @@
 #             # We keep it simple and raise a warning / partial implementation.
 #             print(f"Warning: Voltage source '{vsource.name}' is between two non-ground nodes. "
 #                   f"This simple solver only supports one side to ground. Treating it as a no-op.")
+import time
+import warnings
 import numpy as np
-from .circuit_elements import Resistor, VoltageSource
+import scipy.sparse as sp
+from scipy.linalg import LinAlgWarning, lu_factor, lu_solve
+from scipy.sparse.csgraph import reverse_cuthill_mckee
+from scipy.sparse.linalg import LinearOperator, onenormest, splu, spsolve_triangular
+from .circuit_hierarchy import instance_triplets
+from . import circuit_profiler
+
+# splu column-ordering names for each supported fill-reducing ordering;
+# 'rcm' permutes G symmetrically first and then factors in natural order.
+_SPARSE_ORDERINGS = {
+    'amd': 'MMD_AT_PLUS_A',
+    'colamd': 'COLAMD',
+    'rcm': 'NATURAL',
+    'natural': 'NATURAL',
+}
+
+def sweep_points(start, stop, step):
+    """ Values of a SPICE .DC sweep: start to stop inclusive in steps of `step`. """
+    if step == 0 or (stop - start) * step < 0:
+        raise ValueError(f"Invalid sweep {start} to {stop} step {step}")
+    count = int(np.floor((stop - start) / step + 1e-9)) + 1
+    return start + step * np.arange(count)
+
+
+class LUFactorization:
+    """
+    LU factors of G behind a single solve() for dense and sparse storage.
+    Dense G uses LAPACK getrf (scipy.linalg.lu_factor); sparse G uses
+    SuperLU with the requested fill-reducing ordering, where 'rcm' first
+    permutes G symmetrically by reverse Cuthill-McKee. A singular G
+    raises np.linalg.LinAlgError in both cases.
+    """
+
+    def __init__(self, G, ordering='amd'):
+        self.sparse = sp.issparse(G)
+        self.shape = G.shape
+        self.perm = None
+        if not self.sparse:
+            with warnings.catch_warnings():
+                # Exact singularity is reported below as LinAlgError instead
+                warnings.simplefilter('ignore', LinAlgWarning)
+                self._lu = lu_factor(G, check_finite=False)
+            if not np.all(np.diag(self._lu[0])):
+                raise np.linalg.LinAlgError("Singular matrix")
+            return
+
+        G = G.tocsr()
+        if ordering == 'rcm':
+            self.perm = reverse_cuthill_mckee(G, symmetric_mode=False)
+            G = G[self.perm][:, self.perm]
+        try:
+            self._lu = splu(G.tocsc(), permc_spec=_SPARSE_ORDERINGS[ordering])
+        except RuntimeError as exc:
+            # Match the dense path, which raises LinAlgError on singular G
+            raise np.linalg.LinAlgError(str(exc)) from exc
+
+    @property
+    def column_order(self):
+        """ Columns of a sparse G in the order they are eliminated (the fill-reducing ordering). """
+        order = np.argsort(self._lu.perm_c)
+        return order if self.perm is None else self.perm[order]
+
+    @property
+    def nnz(self):
+        """ Stored entries of the factors (L + U), a measure of fill-in. """
+        if self.sparse:
+            return self._lu.L.nnz + self._lu.U.nnz
+        return self.shape[0] * self.shape[1]
+
+    def solve(self, b, transpose=False):
+        """ Solve G x = b (or G^T x = b); b may have several columns. """
+        if not self.sparse:
+            return lu_solve(self._lu, b, trans=1 if transpose else 0, check_finite=False)
+        if self.perm is None:
+            return self._lu.solve(np.asarray(b, dtype=float), trans='T' if transpose else 'N')
+        x = np.empty_like(b, dtype=float)
+        x[self.perm] = self._lu.solve(np.asarray(b, dtype=float)[self.perm], trans='T' if transpose else 'N')
+        return x
+
+    def condition_estimate(self, G):
+        """
+        1-norm condition number estimate ||G||_1 ||G^-1||_1 of the
+        factorized matrix G, with ||G^-1||_1 from a few solves (Hager /
+        Higham block estimator) instead of inverting G.
+        """
+        inverse = LinearOperator(self.shape, matvec=self.solve, rmatvec=lambda b: self.solve(b, transpose=True),
+                                 dtype=float)
+        return float(abs(G).sum(axis=0).max() * onenormest(inverse))
+
+
+def conjugate_gradient(matvec, b, precondition=None, x0=None, tol=1e-10, maxiter=None):
+    """
+    Preconditioned conjugate gradient for a symmetric positive definite
+    system given only through matvec(x). Stops once the relative residual
+    ||b - A x|| / ||b|| is at most tol, or after maxiter iterations
+    (default 10 * len(b)). Returns (x, info) where info holds
+    'iterations', 'residual' (final relative residual), 'residuals' (one
+    per iteration, starting with the initial guess) and 'converged'.
+    """
+    x = np.zeros_like(b) if x0 is None else np.array(x0, dtype=float)
+    r = b - matvec(x) if x0 is not None else b.copy()
+    b_norm = np.linalg.norm(b) or 1.0
+    residuals = [np.linalg.norm(r) / b_norm]
+    maxiter = 10 * len(b) if maxiter is None else maxiter
+
+    if residuals[-1] > tol:
+        z = r if precondition is None else precondition(r)
+        p = z.copy()
+        rz = r @ z
+        for _ in range(maxiter):
+            Ap = matvec(p)
+            pAp = p @ Ap
+            if pAp <= 0:
+                break  # not positive definite along p (singular G)
+            alpha = rz / pAp
+            x += alpha * p
+            r -= alpha * Ap
+            residuals.append(np.linalg.norm(r) / b_norm)
+            if residuals[-1] <= tol:
+                break
+            z = r if precondition is None else precondition(r)
+            rz, rz_old = r @ z, rz
+            p = z + (rz / rz_old) * p
+
+    return x, {
+        'iterations': len(residuals) - 1,
+        'residual': float(residuals[-1]),
+        'residuals': [float(v) for v in residuals],
+        'converged': bool(residuals[-1] <= tol),
+    }
+
+
+# Upper bound on the stacked arrays built per solve_batch_systems chunk, in
+# bytes: the (runs, n, n) G and its (runs, n, m) A^T diag(g) factor
+BATCH_BYTES = 64 * 1024 * 1024
+
+def solve_batch_systems(A, conductances, fixed, I, G_const=None):
+    """
+    Stacked DC solve shared by DCSolver.solve_batch and the Monte Carlo
+    workers: G_k = A^T diag(g_k) A (+ G_const, the dense stamps of the
+    elements that are not sampled) for every row g_k of `conductances`,
+    rows listed in `fixed` replaced by identity rows, all solved against
+    the same RHS I (or row k of a (runs, n_nodes) I) with stacked
+    np.linalg.solve calls. Chunks stay within BATCH_BYTES counting the
+    runs x n x m product A^T diag(g_k) as well as G, since it dominates
+    on resistor-heavy netlists (m >> n).
+    Returns (runs, n_nodes).
+    """
+    m, n = A.shape
+    runs = conductances.shape[0]
+    V = np.empty((runs, n), dtype=float)
+    if n == 0:
+        return V
+
+    batch_size = max(1, BATCH_BYTES // (8 * n * (n + m)))
+    for start in range(0, runs, batch_size):
+        stop = min(start + batch_size, runs)
+        G = (A.T[None, :, :] * conductances[start:stop, None, :]) @ A
+        if G_const is not None:
+            G += G_const
+        G[:, fixed, :] = 0.0
+        G[:, fixed, fixed] = 1.0
+
+        rhs = (I[start:stop] if I.ndim == 2 else np.broadcast_to(I, (stop - start, n)))[..., None]
+        V[start:stop] = np.linalg.solve(G, rhs)[..., 0]
+    return V
+
 
 class DCSolver:
     """
     Very simple DC operating point solver using Node Voltage Method:
       - Resistors only (no inductors/capacitors).
       - Voltage sources must have at least one side to ground.
-    """
 
-    def __init__(self, circuit):
-        self.circuit = circuit
-        self.node_list = []
-        self.node_index = {}
-
-    def run_dc_analysis(self):
-        """ Returns a dict of node_name -> voltage """
-        all_nodes = sorted(list(self.circuit.get_all_nodes()))
-        # Remove ground node '0' from unknown nodes
-        if '0' in all_nodes:
-            all_nodes.remove('0')
+    Works off the arrays of a CompiledCircuit: unknown k is node id k + 1
+    (id 0 is ground). Small circuits are stamped into a dense G matrix;
+    above SPARSE_THRESHOLD unknown nodes the solver switches to sparse
+    (CSR) assembly and a sparse LU with a fill-reducing ordering.
 
-        self.node_list = all_nodes
-        self.node_index = {node: i for i, node in enumerate(self.node_list)}
+    method='cg' never factorizes G: run_dc_analysis() uses preconditioned
+    conjugate gradient (see solve_iterative) down to a relative residual
+    of `tol`, with a 'jacobi' (diagonal), 'sgs' (symmetric Gauss-Seidel)
+    or no preconditioner.
+    """
 
+    SPARSE_THRESHOLD = 1000
+    PRECONDITIONERS = ('jacobi', 'sgs', None)
+
+    def __init__(self, circuit, method='auto', ordering='amd', tol=1e-10, preconditioner='jacobi',
+                 maxiter=None):
+        if method not in ('auto', 'dense', 'sparse', 'cg'):
+            raise ValueError(f"Unknown solver method '{method}'")
+        if ordering not in _SPARSE_ORDERINGS:
+            raise ValueError(f"Unknown sparse ordering '{ordering}'")
+        if preconditioner not in self.PRECONDITIONERS:
+            raise ValueError(f"Unknown preconditioner '{preconditioner}'")
+        self.circuit = circuit
+        self.compiled = circuit.compile()
+        self.method = method
+        self.ordering = ordering
+        self.tol = tol
+        self.preconditioner = preconditioner
+        self.maxiter = maxiter
+        self.node_list = self.compiled.node_names[1:]
+        self._node_index = None
+        self._operator = None
+        self.factorization = None
+        self.rhs = None
+        # Iterations, residuals and timing of the last 'cg' solve
+        self.last_solve_info = None
+
+    @property
+    def node_index(self):
+        """ unknown node name -> row/column of G """
+        if self._node_index is None:
+            self._node_index = {name: i for i, name in enumerate(self.node_list)}
+        return self._node_index
+
+    def run_dc_analysis(self, x0=None):
+        """
+        Returns a dict of node_name -> voltage. For method='cg', x0 (a
+        previous result dict, or an array ordered as node_list) is used as
+        the starting guess; direct methods ignore it.
+        """
         if not self.node_list:
             # trivial circuit with only ground
             return {'0': 0.0}
 
-        n = len(self.node_list)
-        G = np.zeros((n, n), dtype=float)
-        I = np.zeros(n, dtype=float)
-
-        # Stamp each element
-        for elem in self.circuit.elements:
-            if isinstance(elem, Resistor):
-                self._stamp_resistor(G, elem)
-            elif isinstance(elem, VoltageSource):
-                self._stamp_voltage_source(G, I, elem)
-
         # Solve G * V = I
-        V_solution = np.linalg.solve(G, I)
+        if self.method == 'cg':
+            V_solution = self.solve_iterative(x0)
+        else:
+            factorization = self.factorize()
+            with circuit_profiler.span('solve', unknowns=len(self.node_list)):
+                V_solution = factorization.solve(self.rhs)
 
         # Build final dictionary
-        node_voltages = {}
-        for node_name, idx in self.node_index.items():
-            node_voltages[node_name] = V_solution[idx]
+        node_voltages = dict(zip(self.node_list, V_solution))
         node_voltages['0'] = 0.0
 
         return node_voltages
 
-    def _stamp_resistor(self, G, resistor):
-        """ Stamp resistor into conductance matrix. """
-        n1, n2 = resistor.node1, resistor.node2
-        R = resistor.resistance
-        g = 1.0 / R
-
-        if n1 != '0' and n2 != '0':
-            i1 = self.node_index[n1]
-            i2 = self.node_index[n2]
-            G[i1, i1] += g
-            G[i2, i2] += g
-            G[i1, i2] -= g
-            G[i2, i1] -= g
-        elif n1 == '0' and n2 != '0':
-            i2 = self.node_index[n2]
-            G[i2, i2] += g
-        elif n2 == '0' and n1 != '0':
-            i1 = self.node_index[n1]
-            G[i1, i1] += g
-        # if both are ground, do nothing
-
-    def _stamp_voltage_source(self, G, I, vsource):
-        """ 
-        Stamp an ideal DC voltage source. 
-        For simplicity, if one side is ground, we fix that node's voltage.
-        If neither side is ground, we warn (would need supernode logic).
-        """
-        n1, n2 = vsource.node1, vsource.node2
-        Vval = vsource.voltage
-
-        if n1 == '0' and n2 != '0':
-            i2 = self.node_index[n2]
-            # zero out row
-            G[i2, :] = 0.0
-            G[i2, i2] = 1.0
-            I[i2] = Vval
-        elif n2 == '0' and n1 != '0':
-            i1 = self.node_index[n1]
-            # zero out row
-            G[i1, :] = 0.0
-            G[i1, i1] = 1.0
-            I[i1] = Vval
+    def factorize(self):
+        """
+        Assemble G and the RHS vector (kept in self.rhs) and LU-factorize
+        G once; later calls reuse the factorization.
+        """
+        if self.factorization is None:
+            with circuit_profiler.span('stamp', unknowns=len(self.node_list)):
+                G, self.rhs = self.assemble()
+            with circuit_profiler.span('factorize', sparse=sp.issparse(G), ordering=self.ordering):
+                self.factorization = LUFactorization(G, self.ordering)
+            if circuit_profiler.enabled():
+                self._count_factorization(G)
+        return self.factorization
+
+    def _count_factorization(self, G):
+        """ Profiler counters for a new factorization: nnz of G and L + U, fill-in, condition. """
+        g_nnz = G.nnz if sp.issparse(G) else int(np.count_nonzero(G))
+        circuit_profiler.count('G_nnz', g_nnz)
+        circuit_profiler.count('LU_nnz', self.factorization.nnz)
+        circuit_profiler.count('fill_in', self.factorization.nnz / max(g_nnz, 1))
+        with circuit_profiler.span('factorize.condition_estimate'):
+            circuit_profiler.count('condition_estimate', self.factorization.condition_estimate(G))
+
+    def run_dc_sweep(self, source, values, source2=None, values2=None):
+        """
+        DC sweep of one grounded voltage source, optionally nested inside
+        a sweep of a second one (SPICE .DC order: `source` is the inner
+        loop). Only the RHS entries of the pinned nodes depend on the
+        swept values, so G is factorized once and, by superposition,
+            V(v1, v2) = V0 + (v1 - v1_0) * z1 + (v2 - v2_0) * z2
+        with V0, z1 = G^-1 e_p1 and z2 = G^-1 e_p2 coming from a single
+        multi-column solve; every sweep point is then a vector update.
+        With method='cg' the basis columns are CG solves instead of an LU.
+        Returns a dict with 'nodes', 'values', 'values2' (or None) and
+        'voltages' of shape (len(values), n_nodes), or
+        (len(values2), len(values), n_nodes) for a nested sweep.
+        """
+        values = np.asarray(values, dtype=float)
+        swept = [(source, values)]
+        if source2 is not None:
+            swept.append((source2, np.asarray(values2, dtype=float)))
+
+        rows = [self._pinned_row(name) for name, _ in swept]
+        if len(set(rows)) != len(rows):
+            raise ValueError("Swept sources pin the same node")
+
+        rhs = self._fixed_nodes()[1] if self.method == 'cg' else None
+        basis = np.zeros((len(self.node_list), 1 + len(rows)))
+        basis[rows, np.arange(1, 1 + len(rows))] = 1.0
+        if self.method == 'cg':
+            # A unit pinned voltage per column: the same z = G^-1 e_p
+            basis[:, 0] = rhs
+            solved = self.solve_iterative(pinned=basis)
+        else:
+            lu = self.factorize()
+            rhs = self.rhs
+            basis[:, 0] = rhs
+            solved = lu.solve(basis)
+        V0, z = solved[:, 0], solved[:, 1:]
+
+        voltages = V0 + (values - rhs[rows[0]])[:, None] * z[:, 0]
+        if source2 is not None:
+            outer = (swept[1][1] - rhs[rows[1]])[:, None, None] * z[:, 1]
+            voltages = voltages[None, :, :] + outer
+
+        return {
+            'nodes': list(self.node_list),
+            'values': values,
+            'values2': swept[1][1] if source2 is not None else None,
+            'voltages': voltages,
+        }
+
+    def _pinned_row(self, source):
+        """ Row of G fixed by the grounded voltage source named `source`. """
+        kind, k = self.compiled.element_index.get(source, (None, None))
+        if kind != 'V':
+            raise ValueError(f"'{source}' is not a voltage source")
+        n1, n2 = self.compiled.vs_node1[k], self.compiled.vs_node2[k]
+        if (n1 == 0) == (n2 == 0):
+            raise ValueError(f"Voltage source {source} must have exactly one side to ground")
+        return int(n2 if n1 == 0 else n1) - 1
+
+    def incidence_matrix(self):
+        """
+        Signed (n_resistors x n_nodes) incidence matrix A over the unknown
+        nodes, so that G = A^T * diag(g) * A is the resistor part of G.
+        Ground terminals get no column.
+        """
+        c = self.compiled
+        A = np.zeros((c.resistor_count, len(self.node_list)), dtype=float)
+        rows = np.arange(c.resistor_count)
+        a, b = c.res_node1.astype(np.int64) - 1, c.res_node2.astype(np.int64) - 1
+        np.add.at(A, (rows[a >= 0], a[a >= 0]), 1.0)
+        np.add.at(A, (rows[b >= 0], b[b >= 0]), -1.0)
+        return A
+
+    def solve_batch(self, A, conductances):
+        """
+        Solve one DC operating point per row of `conductances`
+        (shape (runs, n_resistors), columns matching the rows of A).
+        Every G_k = A^T diag(g_k) A is built with one stacked product and
+        the systems go through stacked np.linalg.solve calls.
+        Returns an array of shape (runs, n_nodes) ordered as self.node_list.
+        """
+        fixed, I = self._fixed_nodes()
+        return solve_batch_systems(A, conductances, fixed, I, self.instance_matrix())
+
+    def instance_matrix(self):
+        """
+        Dense (n_nodes x n_nodes) sum of the subcircuit instance blocks
+        over the unknown nodes, or None for a flat circuit.
+        """
+        if not self.compiled.instance_count:
+            return None
+        n = len(self.node_list)
+        rows, cols, vals = self._instance_stamps()
+        return np.bincount(rows * n + cols, weights=vals, minlength=n * n).reshape(n, n)
+
+    def _instance_stamps(self):
+        """ COO stamps of the subcircuit instance blocks, with ground entries dropped. """
+        c = self.compiled
+        if not c.instance_count:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty, np.zeros(0)
+        rows, cols, vals = instance_triplets([m.matrix for m in c.port_models],
+                                             c.inst_ptr, c.inst_nodes, c.inst_models)
+        rows, cols = rows - 1, cols - 1
+        keep = (rows >= 0) & (cols >= 0)
+        return rows[keep], cols[keep], vals[keep]
+
+    def _use_sparse(self):
+        if self.method == 'auto':
+            return len(self.node_list) > self.SPARSE_THRESHOLD
+        return self.method in ('sparse', 'cg')
+
+    def solve_iterative(self, x0=None, pinned=None, currents=None):
+        """
+        Node voltages (ordered as node_list) by preconditioned conjugate
+        gradient. Pinned nodes are moved to the right-hand side, leaving
+            G_ff V_f = J_f - G_fp V_p
+        over the free nodes, which is symmetric positive definite when
+        every node has a resistive path to ground or a source. G is never
+        assembled: products are computed from the element arrays, with
+        node ids mapped to free-node positions once up front.
+        `pinned` overrides the source voltages V_p and `currents` injects
+        J (both over all unknowns, default 0); given as (n, k) arrays they
+        are solved column by column, e.g. for sweep bases and adjoints.
+        Fills self.last_solve_info (summed iterations, worst residual).
+        """
+        start = time.perf_counter()
+        fixed, V = self._fixed_nodes()
+        if pinned is not None:
+            V = np.array(pinned, dtype=float)
+        n = len(self.node_list)
+        columns = V.reshape(n, -1)
+        injected = None if currents is None else np.broadcast_to(
+            np.asarray(currents, dtype=float).reshape(n, -1), columns.shape)
+        free = np.ones(n, dtype=bool)
+        free[fixed] = False
+        nf = int(free.sum())
+
+        # Ground (index -1) and pinned nodes map to slot nf, which reads 0 V
+        position = np.full(n + 1, nf, dtype=np.int64)
+        position[np.flatnonzero(free)] = np.arange(nf)
+        a, b, g, rows, cols, vals = self._conductance_operator()
+        a, b = position[a], position[b]
+        touches_free = (a < nf) | (b < nf)
+        a, b, g = a[touches_free], b[touches_free], g[touches_free]
+        rows, cols = position[rows], position[cols]
+        in_free = (rows < nf) & (cols < nf)
+        rows, cols, vals = rows[in_free], cols[in_free], vals[in_free]
+
+        def matvec(x):
+            x0 = np.append(x, 0.0)
+            current = g * (x0[a] - x0[b])
+            y = np.bincount(a, current, minlength=nf + 1) - np.bincount(b, current, minlength=nf + 1)
+            if len(rows):
+                y += np.bincount(rows, vals * x0[cols], minlength=nf + 1)
+            return y[:nf]
+
+        guess = None
+        if x0 is not None and columns.shape[1] == 1:
+            if isinstance(x0, dict):
+                x0 = np.array([x0.get(node, 0.0) for node in self.node_list], dtype=float)
+            guess = np.asarray(x0, dtype=float)[free]
+
+        diagonal = (np.bincount(a, g, minlength=nf + 1) + np.bincount(b, g, minlength=nf + 1))[:nf]
+        on_diagonal = rows == cols
+        diagonal += np.bincount(rows[on_diagonal], vals[on_diagonal], minlength=nf + 1)[:nf]
+        if not np.all(diagonal > 0):
+            raise np.linalg.LinAlgError("G has a node without conductance")
+        precondition = self._preconditioner(nf, diagonal, a, b, g, rows, cols, vals)
+
+        infos = []
+        for k in range(columns.shape[1]):
+            rhs = -self.apply_conductance(columns[:, k])[free]
+            if injected is not None:
+                rhs += injected[free, k]
+            with circuit_profiler.span('solve.cg', unknowns=nf, preconditioner=str(self.preconditioner)) as span:
+                x, info = conjugate_gradient(matvec, rhs, precondition, guess, tol=self.tol, maxiter=self.maxiter)
+                span.set(iterations=info['iterations'])
+            circuit_profiler.count('cg_iterations', info['iterations'])
+            circuit_profiler.count('cg_residual', info['residual'])
+            columns[free, k] = x
+            infos.append(info)
+            if not info['converged']:
+                print(f"Warning: CG stopped after {info['iterations']} iterations at relative "
+                      f"residual {info['residual']:.3e} (tol {self.tol:g})")
+
+        info = dict(max(infos, key=lambda i: i['residual']))
+        info.update(iterations=sum(i['iterations'] for i in infos), converged=all(i['converged'] for i in infos),
+                    method='cg', preconditioner=self.preconditioner, tol=self.tol,
+                    unknowns=nf, seconds=time.perf_counter() - start)
+        self.last_solve_info = info
+        return V
+
+    def apply_conductance(self, v):
+        """
+        G v for the unfixed G (resistors and subcircuit blocks, no
+        source rows), straight from the element arrays.
+        """
+        a, b, g, rows, cols, vals = self._conductance_operator()
+        n = len(self.node_list)
+        v0 = np.append(v, 0.0)  # index -1 (ground) reads 0 V
+        current = g * (v0[a] - v0[b])
+        # Shift by one so ground terminals land in a discarded bin
+        y = (np.bincount(a + 1, current, minlength=n + 1)
+             - np.bincount(b + 1, current, minlength=n + 1))[1:]
+        if len(rows):
+            y += np.bincount(rows, vals * v[cols], minlength=n)
+        return y
+
+    def _conductance_operator(self):
+        """ Element arrays behind apply_conductance, converted once. """
+        if self._operator is None:
+            c = self.compiled
+            a = c.res_node1.astype(np.int64) - 1
+            b = c.res_node2.astype(np.int64) - 1
+            rows, cols, vals = self._instance_stamps()
+            self._operator = (a, b, np.asarray(c.conductances, dtype=float), rows, cols, vals)
+        return self._operator
+
+    def _preconditioner(self, nf, diagonal, a, b, g, rows, cols, vals):
+        """
+        M^-1 r for the reduced system: None, Jacobi (1 / diag G_ff) or
+        symmetric Gauss-Seidel, M = (D + L) D^-1 (D + U), which needs the
+        two triangles of G_ff but, unlike threshold ILU, stays symmetric
+        positive definite as CG requires. The triangles are stamped from
+        the free-position element arrays of solve_iterative (slot nf is
+        ground or pinned), never from an assembled G.
+        """
+        if self.preconditioner is None:
+            return None
+        if self.preconditioner == 'jacobi':
+            inverse = 1.0 / diagonal
+            return lambda r: inverse * r
+
+        # Off-diagonal stamps: -g both ways between two free resistor
+        # terminals, plus the instance block entries
+        both = (a < nf) & (b < nf)
+        off = rows != cols
+        stamps = sp.csr_matrix((np.concatenate([-g[both], -g[both], vals[off]]),
+                                (np.concatenate([a[both], b[both], rows[off]]),
+                                 np.concatenate([b[both], a[both], cols[off]]))), shape=(nf, nf))
+        D = sp.diags(diagonal, format='csr')
+        lower, upper = (D + sp.tril(stamps, k=-1)).tocsr(), (D + sp.triu(stamps, k=1)).tocsr()
+        return lambda r: spsolve_triangular(upper, diagonal * spsolve_triangular(lower, r, lower=True),
+                                            lower=False)
+
+    def assemble(self, conductances=None):
+        """
+        Build G from the COO stamps of _stamp(): a dense ndarray, or a CSR
+        matrix when the sparse path is selected. Returns (G, I).
+        `conductances` overrides the circuit's resistor conductances.
+        """
+        n = len(self.node_list)
+        rows, cols, vals, I = self._stamp(conductances)
+        if self._use_sparse():
+            # Duplicate (row, col) entries are summed during the CSR conversion
+            G = sp.coo_matrix((vals, (rows, cols)), shape=(n, n)).tocsr()
         else:
-            # No ground reference in a simple solver => need advanced approach
-            print(f"Warning: Voltage source {vsource.name} is between two non-ground nodes. "
+            # Dense scatter-add of all stamps in one pass
+            G = np.bincount(rows * n + cols, weights=vals, minlength=n * n).reshape(n, n)
+        return G, I
+
+    def _stamp(self, conductances=None):
+        """
+        Vectorized MNA stamps as COO triplets (rows, cols, vals) plus the
+        RHS vector I. Each resistor contributes g to both diagonals and -g
+        to both off-diagonals, each subcircuit instance its dense port
+        model block; entries touching ground are dropped. Rows
+        pinned by a grounded voltage source lose their resistor entries
+        and become identity rows with the source voltage on the RHS.
+        """
+        c = self.compiled
+        n = len(self.node_list)
+        fixed, I = self._fixed_nodes()
+
+        a = c.res_node1.astype(np.int64) - 1
+        b = c.res_node2.astype(np.int64) - 1
+        g = c.conductances if conductances is None else conductances
+        rows = np.concatenate([a, b, a, b])
+        cols = np.concatenate([a, b, b, a])
+        vals = np.concatenate([g, g, -g, -g])
+
+        keep = (rows >= 0) & (cols >= 0)
+        rows, cols, vals = rows[keep], cols[keep], vals[keep]
+        if c.instance_count:
+            block_rows, block_cols, block_vals = self._instance_stamps()
+            rows = np.concatenate([rows, block_rows])
+            cols = np.concatenate([cols, block_cols])
+            vals = np.concatenate([vals, block_vals])
+
+        is_fixed = np.zeros(n, dtype=bool)
+        is_fixed[fixed] = True
+        keep = ~is_fixed[rows]
+        rows = np.concatenate([rows[keep], fixed])
+        cols = np.concatenate([cols[keep], fixed])
+        vals = np.concatenate([vals[keep], np.ones(len(fixed))])
+        return rows, cols, vals, I
+
+    def _fixed_nodes(self):
+        """
+        Unknown indices pinned by grounded voltage sources (unique, sorted)
+        and the RHS vector I holding their voltages. Sources between two
+        non-ground nodes are skipped with a warning.
+        """
+        c = self.compiled
+        n1, n2 = c.vs_node1, c.vs_node2
+        grounded = (n1 == 0) != (n2 == 0)
+        for k in np.flatnonzero(~grounded):
+            print(f"Warning: Voltage source {c.vs_names[k]} is between two non-ground nodes. "
                   f"Simple solver does not handle this fully.")
+
+        pinned = np.where(n1 == 0, n2, n1)[grounded].astype(np.int64) - 1
+        I = np.zeros(len(self.node_list), dtype=float)
+        # For a node pinned twice the later source wins, as before
+        I[pinned] = c.voltages[grounded]
+        return np.unique(pinned), I
+
+
+class SolvedCircuit:
+    """
+    A solved DC operating point that answers "what if" value changes
+    without refactorizing G.
+
+    Changing resistor i by dg_i adds dg_i * p_i q_i^T to G, where
+    q_i = e_a - e_b over its unknown nodes and p_i is q_i with the rows
+    pinned by voltage sources zeroed. For k changed resistors the
+    Sherman-Morrison-Woodbury identity gives
+        V = x - Z (I + D Q^T Z)^-1 D Q^T x,   x = G0^-1 I,  Z = G0^-1 P
+    with D = diag(dg). Each column G0^-1 p_i is computed once and cached,
+    so a query costs O(k^2 + k * n), or O(k^2 + k * len(nodes)) when only
+    some nodes are requested. Source voltage changes only move RHS rows
+    and reuse cached columns G0^-1 e_r the same way.
+
+    update() commits changes. Once more than MAX_RANK resistors differ
+    from the factorized values, or the k x k capacitance matrix
+    I + D Q^T Z is worse conditioned than MAX_CONDITION, G is
+    refactorized at the committed values.
+    """
+
+    MAX_RANK = 32
+    MAX_CONDITION = 1e8
+
+    def __init__(self, circuit, method='auto', ordering='amd'):
+        self.solver = DCSolver(circuit, method=method, ordering=ordering)
+        c = self.solver.compiled
+        self.node_list = self.solver.node_list
+        self.conductances = np.array(c.conductances, dtype=float)
+        self.source_voltages = np.array(c.voltages, dtype=float)
+        self.refactorizations = 0
+
+        fixed, _ = self.solver._fixed_nodes()
+        self._fixed = np.zeros(len(self.node_list), dtype=bool)
+        self._fixed[fixed] = True
+        self._a = c.res_node1.astype(np.int64) - 1
+        self._b = c.res_node2.astype(np.int64) - 1
+        grounded = (c.vs_node1 == 0) != (c.vs_node2 == 0)
+        self._pinned = np.where(grounded, np.where(c.vs_node1 == 0, c.vs_node2, c.vs_node1), 0).astype(np.int64) - 1
+        self._refactorize()
+
+    def what_if(self, changes, nodes=None):
+        """
+        Node voltages if the elements in `changes` ({name: resistance or
+        source voltage}) took the given values, on top of committed
+        updates. Nothing is committed. With `nodes`, only those node
+        voltages are computed and returned.
+        """
+        conductances, source_voltages = self._apply(changes)
+        rows = None
+        if nodes is not None:
+            rows = np.array([self.solver.node_index[n] for n in nodes if n != '0'], dtype=np.int64)
+        V = self._solve(conductances, source_voltages, rows)
+        if V is None:
+            # Too far from the factorized state for a safe update: solve directly
+            G, _ = self.solver.assemble(conductances)
+            V = LUFactorization(G, self.solver.ordering).solve(self._rhs(source_voltages))
+            if rows is not None:
+                V = V[rows]
+        return self._as_dict(V, nodes)
+
+    def update(self, changes):
+        """ Commit value changes and return the new node voltages. """
+        self.conductances, self.source_voltages = self._apply(changes)
+        if self._solve(self.conductances, self.source_voltages, np.zeros(0, dtype=np.int64)) is None:
+            self._refactorize()
+        return self.node_voltages()
+
+    def node_voltages(self):
+        """ Node voltages at the committed values. """
+        return self._as_dict(self._solve(self.conductances, self.source_voltages), None)
+
+    def _refactorize(self):
+        """ Factorize G at the committed values and drop all cached columns. """
+        G, _ = self.solver.assemble(self.conductances)
+        self._lu = LUFactorization(G, self.solver.ordering)
+        self._base_g = self.conductances.copy()
+        self._base_sources = self.source_voltages.copy()
+        self._base_rhs = self._rhs(self.source_voltages)
+        self._x = self._lu.solve(self._base_rhs)
+        self._edge_columns = {}
+        self._rhs_columns = {}
+        self.refactorizations += 1
+
+    def _rhs(self, source_voltages):
+        I = np.zeros(len(self.node_list))
+        grounded = self._pinned >= 0
+        I[self._pinned[grounded]] = source_voltages[grounded]
+        return I
+
+    def _edge_column(self, a, b):
+        """ Cached G0^-1 p for a conductance between unknown nodes a and b (-1 is ground). """
+        key = (a, b) if a <= b else (b, a)
+        if key not in self._edge_columns:
+            p = np.zeros(len(self.node_list))
+            for node, sign in ((key[0], 1.0), (key[1], -1.0)):
+                if node >= 0 and not self._fixed[node]:
+                    p[node] += sign
+            self._edge_columns[key] = self._lu.solve(p)
+        column = self._edge_columns[key]
+        return column if a <= b else -column
+
+    def _rhs_column(self, r):
+        """ Cached G0^-1 e_r for RHS row r. """
+        if r not in self._rhs_columns:
+            e = np.zeros(len(self.node_list))
+            e[r] = 1.0
+            self._rhs_columns[r] = self._lu.solve(e)
+        return self._rhs_columns[r]
+
+    def _apply(self, changes):
+        """ Copies of the committed value arrays with {element name: value} applied. """
+        conductances = self.conductances.copy()
+        source_voltages = self.source_voltages.copy()
+        index = self.solver.compiled.element_index
+        for name, value in changes.items():
+            kind, k = index.get(name, (None, None))
+            if kind == 'R':
+                conductances[k] = 1.0 / value
+            elif kind == 'V':
+                if self._pinned[k] < 0:
+                    raise ValueError(f"Voltage source {name} is not grounded; the solver ignores it")
+                source_voltages[k] = value
+            else:
+                raise KeyError(f"Unknown element '{name}'")
+        return conductances, source_voltages
+
+    def _solve(self, conductances, source_voltages, rows=None):
+        """
+        Voltages of the unknown nodes (only `rows` if given) for the given
+        values, or None when a low-rank update would be unsafe.
+        """
+        changed = np.flatnonzero(conductances != self._base_g)
+        return self._solve_edges(self._a[changed], self._b[changed],
+                                 conductances[changed] - self._base_g[changed], source_voltages, rows)
+
+    def _solve_edges(self, a, b, dg, source_voltages, rows=None):
+        """
+        _solve for conductance changes dg between unknown-node pairs
+        (a, b) (-1 is ground), which need not be resistors of the
+        factorized circuit: an added resistor is a change from 0, a
+        removed one a change to 0.
+        """
+        rhs_delta = {}
+        if (source_voltages != self._base_sources).any():
+            delta = self._rhs(source_voltages) - self._base_rhs
+            rhs_delta = {r: delta[r] for r in np.flatnonzero(delta)}
+
+        def x_at(idx):
+            # x = G0^-1 I for the new RHS, evaluated at idx only
+            x = self._x[idx]
+            for r, d in rhs_delta.items():
+                x = x + d * self._rhs_column(r)[idx]
+            return x
+
+        sel = slice(None) if rows is None else rows
+        x = x_at(sel)
+        a, b, dg = np.asarray(a, dtype=np.int64), np.asarray(b, dtype=np.int64), np.asarray(dg, dtype=float)
+        # Conductances between pinned (or ground) nodes cannot change G
+        live = (dg != 0) & (((a >= 0) & ~self._fixed[a]) | ((b >= 0) & ~self._fixed[b]))
+        a, b, dg = a[live], b[live], dg[live]
+        if not len(a):
+            return x
+        if len(a) > self.MAX_RANK:
+            return None
+
+        columns = [self._edge_column(i, j) for i, j in zip(a.tolist(), b.tolist())]
+
+        def qt(values_at):
+            # Q^T v from v's values at the edge terminals (ground is 0)
+            return (np.where(a >= 0, values_at(a), 0.0)
+                    - np.where(b >= 0, values_at(b), 0.0))
+
+        QtZ = np.column_stack([qt(lambda idx: z[idx]) for z in columns])
+        K = np.eye(len(a)) + dg[:, None] * QtZ
+        if np.linalg.cond(K) > self.MAX_CONDITION:
+            return None
+        y = np.linalg.solve(K, dg * qt(x_at))
+        Z = np.column_stack([z[sel] for z in columns])
+        return x - Z @ y
+
+    def _as_dict(self, V, nodes):
+        if nodes is None:
+            result = dict(zip(self.node_list, V.tolist()))
+            result['0'] = 0.0
+            return result
+        values = iter(V.tolist())
+        return {node: 0.0 if node == '0' else next(values) for node in nodes}
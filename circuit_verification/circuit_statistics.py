@@ -0,0 +1,194 @@
+import json
+import os
+import numpy as np
+
+# Default bins per column of StreamingHistogram (quantile resolution is
+# about range / bins)
+HISTOGRAM_BINS = 256
+
+
+class StreamingHistogram:
+    """
+    Fixed-size histogram per column that follows the data: each column's
+    range starts at its first batch and, when a later value falls outside
+    it, doubles its width (merging neighbouring bins in pairs) until the
+    value fits. Memory stays (columns x bins) whatever the sample count,
+    and quantiles are interpolated within bins.
+    """
+
+    def __init__(self, columns, bins=HISTOGRAM_BINS):
+        if bins < 2 or bins % 2:
+            raise ValueError("bins must be an even number of at least 2")
+        self.bins = bins
+        self.counts = np.zeros((columns, bins), dtype=np.int64)
+        self.lo = np.zeros(columns)
+        self.width = np.zeros(columns)   # bin width; 0 until the first batch
+
+    def update(self, x):
+        """ Add a (samples, columns) batch. """
+        if not len(x):
+            return
+        low, high = x.min(axis=0), x.max(axis=0)
+        new = self.width == 0
+        if new.any():
+            span = high[new] - low[new]
+            floor = 1e-12 * np.maximum(1.0, np.abs(low[new]))
+            self.lo[new] = low[new]
+            self.width[new] = np.maximum(span, floor) * (1 + 1e-9) / self.bins
+        for c in np.flatnonzero((low < self.lo) | (high >= self.lo + self.width * self.bins)).tolist():
+            self._grow(c, low[c], high[c])
+
+        columns = x.shape[1]
+        index = np.minimum(((x - self.lo) / self.width).astype(np.int64), self.bins - 1)
+        flat = index + np.arange(columns) * self.bins
+        self.counts += np.bincount(flat.ravel(), minlength=columns * self.bins).reshape(columns, self.bins)
+
+    def _grow(self, c, low, high):
+        half = self.bins // 2
+        while low < self.lo[c] or high >= self.lo[c] + self.width[c] * self.bins:
+            merged = self.counts[c].reshape(half, 2).sum(axis=1)
+            self.counts[c] = 0
+            if low < self.lo[c]:
+                # Extend downwards: the old range becomes the upper half
+                self.lo[c] -= self.width[c] * self.bins
+                self.counts[c, half:] = merged
+            else:
+                self.counts[c, :half] = merged
+            self.width[c] *= 2
+
+    def quantiles(self, q):
+        """ (len(q), columns) array of estimated quantiles q in [0, 1]. """
+        q = np.atleast_1d(np.asarray(q, dtype=float))
+        cumulative = np.cumsum(self.counts, axis=1)
+        total = cumulative[:, -1]
+        result = np.full((len(q), len(total)), np.nan)
+        for c in np.flatnonzero(total).tolist():
+            target = q * total[c]
+            k = np.minimum(np.searchsorted(cumulative[c], target, side='left'), self.bins - 1)
+            before = np.where(k > 0, cumulative[c][k - 1], 0)
+            inside = np.divide(target - before, self.counts[c][k], out=np.zeros(len(q)),
+                               where=self.counts[c][k] > 0)
+            result[:, c] = self.lo[c] + (k + np.clip(inside, 0.0, 1.0)) * self.width[c]
+        return result
+
+
+class RunningStats:
+    """
+    Per-column statistics of a stream of (samples, columns) batches in
+    fixed memory: count, mean and variance (Welford's update, merged per
+    batch with Chan's formula), min, max, a StreamingHistogram for
+    quantiles, and per-column counts of values outside spec limits.
+
+      names  - column names
+      limits - optional {name: (low, high)}; either bound may be None
+      bins   - histogram bins per column
+    """
+
+    def __init__(self, names, limits=None, bins=HISTOGRAM_BINS):
+        self.names = list(names)
+        n = len(self.names)
+        self.count = 0
+        self.mean = np.zeros(n)
+        self.m2 = np.zeros(n)
+        self.min = np.full(n, np.inf)
+        self.max = np.full(n, -np.inf)
+        self.histogram = StreamingHistogram(n, bins)
+
+        index = {name: k for k, name in enumerate(self.names)}
+        unknown = [name for name in (limits or {}) if name not in index]
+        if unknown:
+            raise ValueError(f"Spec limits for unknown node(s): {', '.join(unknown)}")
+        self.low = np.full(n, -np.inf)
+        self.high = np.full(n, np.inf)
+        for name, (low, high) in (limits or {}).items():
+            if low is not None:
+                self.low[index[name]] = low
+            if high is not None:
+                self.high[index[name]] = high
+        self.failures = np.zeros(n, dtype=np.int64)
+        self.failed_samples = 0   # samples with at least one column out of spec
+
+    def update(self, x):
+        """ Add a (samples, columns) batch. """
+        x = np.asarray(x, dtype=float)
+        m = len(x)
+        if not m:
+            return
+        batch_mean = x.mean(axis=0)
+        batch_m2 = ((x - batch_mean) ** 2).sum(axis=0)
+        total = self.count + m
+        delta = batch_mean - self.mean
+        self.mean += delta * (m / total)
+        self.m2 += batch_m2 + delta ** 2 * (self.count * m / total)
+        self.count = total
+        np.minimum(self.min, x.min(axis=0), out=self.min)
+        np.maximum(self.max, x.max(axis=0), out=self.max)
+        self.histogram.update(x)
+
+        out = (x < self.low) | (x > self.high)
+        self.failures += out.sum(axis=0)
+        self.failed_samples += int(out.any(axis=1).sum())
+
+    @property
+    def variance(self):
+        """ Sample variance (n - 1 denominator). """
+        return self.m2 / (self.count - 1) if self.count > 1 else np.zeros(len(self.names))
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+    def quantiles(self, q=(0.01, 0.5, 0.99)):
+        return self.histogram.quantiles(q)
+
+    def summary(self, q=(0.01, 0.5, 0.99)):
+        """
+        {'runs', 'failed_runs', 'yield', 'nodes'}: per column 'mean',
+        'std', 'min', 'max', 'quantiles' ({q: value}) and, for columns with
+        spec limits, 'failures'. 'yield' is the fraction of runs with every
+        column in spec.
+        """
+        quantiles = self.quantiles(q)
+        limited = np.isfinite(self.low) | np.isfinite(self.high)
+        nodes = {}
+        for k, name in enumerate(self.names):
+            entry = {'mean': float(self.mean[k]), 'std': float(self.std[k]),
+                     'min': float(self.min[k]), 'max': float(self.max[k]),
+                     'quantiles': {float(p): float(quantiles[i, k]) for i, p in enumerate(q)}}
+            if limited[k]:
+                entry['failures'] = int(self.failures[k])
+            nodes[name] = entry
+        return {
+            'runs': self.count,
+            'failed_runs': self.failed_samples,
+            'yield': 1.0 - self.failed_samples / self.count if self.count else float('nan'),
+            'nodes': nodes,
+        }
+
+
+class SampleWriter:
+    """
+    Writes Monte Carlo samples chunk by chunk into `directory`:
+    voltages.npy (runs x nodes) and resistances.npy (runs x resistors) as
+    memory-mapped .npy files, so no more than one chunk is ever held in
+    memory, plus names.json with the column names.
+    """
+
+    def __init__(self, directory, runs, nodes, resistors):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        with open(os.path.join(directory, 'names.json'), 'w') as f:
+            json.dump({'nodes': list(nodes), 'resistors': list(resistors)}, f)
+        self.voltages = np.lib.format.open_memmap(os.path.join(directory, 'voltages.npy'), mode='w+',
+                                                  dtype=float, shape=(runs, len(nodes)))
+        self.resistances = np.lib.format.open_memmap(os.path.join(directory, 'resistances.npy'), mode='w+',
+                                                     dtype=float, shape=(runs, len(resistors)))
+
+    def write(self, start, voltages, resistances):
+        self.voltages[start:start + len(voltages)] = voltages
+        self.resistances[start:start + len(resistances)] = resistances
+
+    def close(self):
+        for array in (self.voltages, self.resistances):
+            array.flush()
+        self.voltages = self.resistances = None
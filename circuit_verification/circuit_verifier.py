@@ -1,28 +1,60 @@
+from . import circuit_profiler
+from .circuit_rules import RuleSet
+
 class CircuitVerifier:
     """
     Performs circuit verification checks:
       - Presence of at least one voltage source
-      - No floating nodes (if reference node is 0, ensure that the circuit is connected)
+      - No floating nodes (every node has a path to reference node 0)
+      - Optional electrical rules (a RuleSet or the path of a rules
+        file, see circuit_rules) on the DC solution; rule_engine()
+        checks them on Monte Carlo or corner samples too
     """
 
-    def __init__(self, circuit, dc_solution, analysis_results):
+    def __init__(self, circuit, dc_solution, analysis_results, rules=None):
         self.circuit = circuit
+        self.compiled = circuit.compile()
         self.dc_solution = dc_solution
         self.analysis_results = analysis_results
+        self.rules = RuleSet.load(rules) if isinstance(rules, str) else rules
+        self.rule_report = None
+        self._engine = None
 
     def verify(self):
-        checks = {}
-        checks['has_voltage_source'] = self.has_voltage_source()
-        checks['is_fully_connected'] = self.analysis_results.get('is_connected', False)
-        checks['no_floating_nodes'] = self.no_floating_nodes()
+        with circuit_profiler.span('verify'):
+            checks = {}
+            checks['has_voltage_source'] = self.has_voltage_source()
+            checks['is_fully_connected'] = self.analysis_results.get('is_connected', False)
+            checks['no_floating_nodes'] = self.no_floating_nodes()
+            if self.rules is not None:
+                checks['rules_passed'] = self.check_rules()
         return checks
 
+    def rule_engine(self):
+        """ The rules compiled for this circuit (None without rules). """
+        if self._engine is None and self.rules is not None:
+            self._engine = self.rules.compile(self.compiled)
+        return self._engine
+
+    def check_rules(self):
+        """
+        Evaluate the rules on the DC solution into rule_report. False
+        when a rule fails or there is no solution to check.
+        """
+        if not self.dc_solution:
+            return False
+        self.rule_report = self.rule_engine().evaluate(self.dc_solution)
+        return self.rule_report.passed
+
     def has_voltage_source(self):
-        return len(self.circuit.get_voltage_sources()) > 0
+        return self.compiled.voltage_source_count > 0
 
     def no_floating_nodes(self):
         """
-        If the circuit is connected and node 0 is present, 
-        we consider there to be no floating nodes.
+        True when node 0 is present and every node has a path to it.
         """
-        return self.analysis_results.get('is_connected', False) and ('0' in self.circuit.get_all_nodes())
+        return self.compiled.has_ground and not len(self.compiled.connectivity.floating_node_ids())
+
+    def floating_nodes(self):
+        """ Names of the nodes without a path to ground. """
+        return self.compiled.connectivity.floating_nodes()
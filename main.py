@@ -25,31 +25,277 @@
 
 #     netlist_file = sys.argv[1]
 #     main(netlist_file)
+import argparse
+import contextlib
 import sys
+import numpy as np
 from circuit_verification.circuit_parser import CircuitParser
-from circuit_verification.circuit_simulation import DCSolver
+from circuit_verification.circuit_simulation import DCSolver, sweep_points
 from circuit_verification.circuit_analysis import CircuitAnalysis
+from circuit_verification.circuit_corners import DESIGNS
+from circuit_verification.circuit_eco import IncrementalVerifier
 from circuit_verification.circuit_verifier import CircuitVerifier
+from circuit_verification.circuit_batch import BatchVerifier, collect_netlists
+from circuit_verification.circuit_server import serve
+from circuit_verification.circuit_partition import PartitionedSolver
+from circuit_verification.circuit_profiler import Profiler
+from circuit_verification.circuit_reduction import CircuitReduction
+from circuit_verification.circuit_results import ResultStore
+from circuit_verification.circuit_rules import RuleSet
+from circuit_verification.circuit_sampling import DISTRIBUTIONS, SAMPLERS
 
-def main(netlist_path: str):
-    # Step 1: Parse the circuit
-    parser = CircuitParser(netlist_path)
-    circuit = parser.parse()
+# Sweep points printed per .DC directive before the table is elided
+MAX_SWEEP_ROWS = 20
+# Floating node names listed before the list is elided
+MAX_FLOATING_NODES = 20
+# Monte Carlo summary rows (widest spread first) before the table is elided
+MAX_MC_ROWS = 20
+# Corner analysis rows (widest worst-case spread first) before the table is elided
+MAX_CORNER_ROWS = 20
+# Violations listed per failing rule
+MAX_RULE_VIOLATIONS = 5
+
+def print_dc_sweep(sweep, result):
+    title = f"{sweep['source']} {sweep['start']:g} to {sweep['stop']:g} step {sweep['step']:g}"
+    if 'source2' in sweep:
+        title += f", {sweep['source2']} {sweep['start2']:g} to {sweep['stop2']:g} step {sweep['step2']:g}"
+    print(f"\n--- DC Sweep: {title} ---")
+
+    voltages = result['voltages']
+    if result['values2'] is None:
+        points = [({sweep['source']: v}, voltages[i]) for i, v in enumerate(result['values'])]
+    else:
+        points = [({sweep['source2']: v2, sweep['source']: v}, voltages[j, i])
+                  for j, v2 in enumerate(result['values2'])
+                  for i, v in enumerate(result['values'])]
+    for settings, row in points[:MAX_SWEEP_ROWS]:
+        setting = ", ".join(f"{name}={value:g}" for name, value in settings.items())
+        nodes = ", ".join(f"{node}={v:.4f}" for node, v in zip(result['nodes'], row))
+        print(f"{setting}: {nodes}")
+    if len(points) > MAX_SWEEP_ROWS:
+        print(f"... ({len(points)} points in total)")
+
+def print_sensitivities(ranked):
+    print("\n--- Sensitivity (most sensitive first) ---")
+    print(f"{'Node':<12} {'Resistor':<12} {'dV/dR (V/ohm)':>14} {'(R/V) dV/dR':>12}")
+    for node, resistor, dv_dr, normalized in ranked:
+        print(f"{node:<12} {resistor:<12} {dv_dr:>14.4e} {normalized:>12.4f}")
+
+def print_profile(profiler, path):
+    print("\n--- Profile ---")
+    for name, entry in profiler.summary().items():
+        print(f"{name:<32} {entry['calls']:>6} call(s) {entry['seconds']:>10.4f} s "
+              f"{entry['max_rss_mb']:>9.1f} MB max RSS")
+    for name, value in profiler.counters.items():
+        print(f"{name}: {value:.6g}" if isinstance(value, float) else f"{name}: {value}")
+    print(f"Profile written to {path}")
+
+def print_monte_carlo(stats, tolerance):
+    summary = stats.summary()
+    print(f"\n--- Monte Carlo ({summary['runs']} runs, ±{tolerance:.0%} resistor tolerance) ---")
+    print(f"{'Node':<12} {'mean':>10} {'std':>10} {'min':>10} {'p1':>10} {'p50':>10} {'p99':>10} "
+          f"{'max':>10} {'fails':>8}")
+    rows = sorted(summary['nodes'].items(), key=lambda item: -item[1]['std'])
+    for node, entry in rows[:MAX_MC_ROWS]:
+        p1, p50, p99 = entry['quantiles'].values()
+        fails = entry.get('failures', '-')
+        print(f"{node:<12} {entry['mean']:>10.4f} {entry['std']:>10.4g} {entry['min']:>10.4f} {p1:>10.4f} "
+              f"{p50:>10.4f} {p99:>10.4f} {entry['max']:>10.4f} {fails:>8}")
+    if len(rows) > MAX_MC_ROWS:
+        print(f"... ({len(rows)} nodes in total)")
+    if np.isfinite(stats.low).any() or np.isfinite(stats.high).any():
+        print(f"Yield: {summary['yield']:.4%} ({summary['failed_runs']} of {summary['runs']} runs out of spec)")
+
+def print_yield(result, tolerance):
+    low, high = result['yield_ci']
+    print(f"\n--- Yield ({result['sampler']} sampling, {result['distribution']} ±{tolerance:.0%} "
+          f"resistor tolerance, {result['solves']} solves) ---")
+    print(f"Yield: {result['yield']:.6%} (95% CI {low:.6%} .. {high:.6%})")
+    print(f"Failure probability: {result['failure_probability']:.4g} ± {result['std_error']:.2g}")
+    if 'effective_sample_size' in result:
+        print(f"Importance shift: {result['shift']:.2f} sigma, "
+              f"effective sample size {result['effective_sample_size']:.0f}")
+
+def print_corners(result, tolerance, source_tolerance):
+    print(f"\n--- Corners ({result['design']} design, {result['corners']} corners over "
+          f"{len(result['factors'])} factors, ±{tolerance:.0%} resistors, ±{source_tolerance:.0%} sources) ---")
+    print(f"{'Node':<12} {'min':>10} {'nominal':>10} {'max':>10}")
+    order = np.argsort(-(result['max'] - result['min']), kind='stable')
+    for k in order[:MAX_CORNER_ROWS].tolist():
+        print(f"{result['nodes'][k]:<12} {result['min'][k]:>10.4f} {result['nominal'][k]:>10.4f} "
+              f"{result['max'][k]:>10.4f}")
+    if len(order) > MAX_CORNER_ROWS:
+        print(f"... ({len(order)} nodes in total)")
+
+def print_worst_case(result, tolerance):
+    proven = int(result['proven'].sum())
+    print(f"\n--- Worst-case bounds (±{tolerance:.0%} resistor tolerance, {proven} of "
+          f"{len(result['nodes'])} nodes proven exact) ---")
+    print(f"{'Node':<12} {'lower':>10} {'nominal':>10} {'upper':>10} {'proven':>7}")
+    order = np.argsort(-(result['upper'] - result['lower']), kind='stable')
+    for k in order[:MAX_CORNER_ROWS].tolist():
+        print(f"{result['nodes'][k]:<12} {result['lower'][k]:>10.4f} {result['nominal'][k]:>10.4f} "
+              f"{result['upper'][k]:>10.4f} {'yes' if result['proven'][k] else 'no':>7}")
+    if len(order) > MAX_CORNER_ROWS:
+        print(f"... ({len(order)} nodes in total)")
+
+def print_rules(report, title):
+    failed = report.failed()
+    print(f"\n--- Rules on {title}: {len(report.rules) - len(failed)} of {len(report.rules)} passed ---")
+    for name in failed:
+        entry = report.rules[name]
+        more = "" if entry['complete'] else "+ (stopped early)"
+        print(f"{name}: {entry['violations']}{more} violation(s) in {entry['checked']} sample(s)")
+        for violation in entry['first'][:MAX_RULE_VIOLATIONS]:
+            print(f"  sample {violation['sample']}: {violation['element']} = {violation['value']:.6g}")
+
+def parse_spec(text):
+    """ 'NODE=LOW:HIGH' (either bound may be empty) -> (node, (low, high)). """
+    node, sep, bounds = text.partition('=')
+    low, colon, high = bounds.partition(':')
+    if not sep or not colon or not node:
+        raise argparse.ArgumentTypeError(f"expected NODE=LOW:HIGH, got '{text}'")
+    return node, (float(low) if low else None, float(high) if high else None)
+
+def print_progress(done, total):
+    print(f"\rMonte Carlo: {done}/{total} runs", end="\n" if done == total else "", file=sys.stderr)
+
+def main(netlist_path: str, use_cache: bool = True, mc_runs: int = 10, mc_workers: int = 0,
+         mc_chunk_size: int = 10000, mc_seed=None, sensitivity_top: int = 0, sensitivity_nodes=None,
+         solver_method: str = 'auto', cg_tol: float = 1e-10, cg_preconditioner='jacobi',
+         mc_limits=None, mc_samples_dir=None, yield_runs: int = 0, sampler: str = 'lhs',
+         mc_distribution: str = 'uniform', reduce: bool = False, partitions=None, solver_workers=None,
+         store_path=None, corners=None, source_tolerance: float = 0.0,
+         worst_case: bool = False, rules_path=None):
+    # Step 1: Parse the circuit (or memory-map its binary cache)
+    parser = CircuitParser(netlist_path, use_cache=use_cache)
+    circuit = parser.parse_compiled()
+    stats = parser.stats
+    action = "Loaded cached" if stats['source'] == 'cache' else "Parsed"
+    print(f"{action} {netlist_path}: {stats['elements']} elements, "
+          f"{stats['bytes'] / 1e6:.2f} MB in {stats['seconds']:.3f} s ({stats['mb_per_s']:.1f} MB/s)")
+
+    # Optional topological reduction: the solver sees the reduced circuit and
+    # eliminated node voltages are recovered from its solution
+    reduction = None
+    if reduce:
+        reduction = CircuitReduction(circuit)
+        r = reduction.stats
+        print(f"Reduced to {r['reduced_nodes']} of {r['nodes']} nodes, {r['reduced_resistors']} of "
+              f"{r['resistors']} resistors ({r['series']} series, {r['dangling']} dangling, "
+              f"{r['merged_constants']} merged constants) in {r['seconds']:.3f} s")
 
     # Step 2: Basic DC simulation
-    solver = DCSolver(circuit)
+    target = circuit if reduction is None else reduction.compiled
+    if solver_method == 'partitioned':
+        solver = PartitionedSolver(target, parts=partitions, workers=solver_workers)
+    else:
+        solver = DCSolver(target, method=solver_method, tol=cg_tol, preconditioner=cg_preconditioner)
     node_voltages = solver.run_dc_analysis()
+    if solver_method == 'partitioned' and solver.partition_info is not None:
+        info = solver.partition_info
+        print(f"Partitioned solve: {info['parts']} parts of {min(info['part_sizes'])}-{max(info['part_sizes'])} "
+              f"nodes, {info['separator']}-node separator, {info['workers']} workers "
+              f"(partition {info['partition']:.3f} s, solve {info['solve']:.3f} s)")
+    if reduction is not None:
+        node_voltages = reduction.node_voltages(node_voltages)
+    if solver.last_solve_info is not None:
+        info = solver.last_solve_info
+        print(f"CG ({info['preconditioner']}): {info['iterations']} iterations, relative residual "
+              f"{info['residual']:.3e} over {info['unknowns']} unknowns in {info['seconds']:.3f} s")
+
+    # .DC directives reuse the operating point's factorization (CG solves a
+    # few basis columns instead)
+    sweep_results = []
+    for sweep in circuit.dc_sweeps:
+        values2 = None
+        if 'source2' in sweep:
+            values2 = sweep_points(sweep['start2'], sweep['stop2'], sweep['step2'])
+        result = solver.run_dc_sweep(sweep['source'], sweep_points(sweep['start'], sweep['stop'], sweep['step']),
+                                     sweep.get('source2'), values2)
+        if reduction is not None:
+            result.update(nodes=list(circuit.node_names[1:]), voltages=reduction.expand(result['voltages']))
+        sweep_results.append((sweep, result))
 
     # Step 3: Perform connectivity & Monte Carlo analyses
     analysis = CircuitAnalysis(circuit)
     analysis_results = analysis.run_analysis()
 
-    # For demonstration: a quick Monte Carlo on resistor tolerances
-    # (e.g., ±5% random variation, 10 runs).
-    mc_results = analysis.run_monte_carlo(runs=10, tolerance=0.05)
+    # Electrical rules are also checked on every Monte Carlo and corner sample
+    rule_set = mc_rules = corner_rules = None
+    if rules_path is not None:
+        rule_set = RuleSet.load(rules_path)
+        rule_engine = rule_set.compile(circuit)
+        mc_rules, corner_rules = rule_engine.report(), rule_engine.report()
+
+    # Adjoint sensitivities reuse the operating point's factorization (or,
+    # with --solver cg, run as CG solves on the full circuit)
+    ranked = []
+    if sensitivity_top > 0:
+        sensitivity_solver = solver if reduction is None else None
+        if reduction is not None and solver_method == 'cg':
+            sensitivity_solver = DCSolver(circuit, method='cg', tol=cg_tol, preconditioner=cg_preconditioner)
+        sensitivity = analysis.run_sensitivity(nodes=sensitivity_nodes, solver=sensitivity_solver)
+        ranked = analysis.rank_sensitivities(sensitivity, top=sensitivity_top)
+
+    # Everything computed so far also goes to the result store, if any
+    store = None
+    if store_path is not None:
+        store = ResultStore(store_path)
+        nodes = list(circuit.node_names[1:])
+        store.dataset('dc', {'voltages': nodes}).append(
+            voltages=np.array([[node_voltages[node] for node in nodes]]))
+        for k, (sweep, result) in enumerate(sweep_results):
+            values = result['values']
+            if result['values2'] is None:
+                sources, settings = [sweep['source']], values[:, None]
+            else:
+                # Rows run over the inner source fastest, as in result['voltages']
+                sources = [sweep['source'], sweep['source2']]
+                settings = np.column_stack([np.tile(values, len(result['values2'])),
+                                            np.repeat(result['values2'], len(values))])
+            store.dataset(f'dc_sweep{k}', {'voltages': result['nodes'], 'sources': sources}).append(
+                voltages=result['voltages'].reshape(-1, len(result['nodes'])), sources=settings)
+
+    # Monte Carlo on resistor tolerances (±5% random variation), streamed in
+    # chunks into fixed-size statistics; with mc_workers > 0 the chunks are
+    # spread over a process pool.
+    mc_stats = None
+    if mc_runs > 0:
+        mc_store = None
+        if store is not None:
+            mc_store = store.dataset('monte_carlo', {'voltages': list(circuit.node_names[1:]),
+                                                     'resistances': list(circuit.res_names)},
+                                     attrs={'tolerance': 0.05, 'netlist': netlist_path})
+        mc_stats = analysis.run_monte_carlo_stats(
+            runs=mc_runs, tolerance=0.05, seed=mc_seed, limits=mc_limits, workers=mc_workers,
+            chunk_size=mc_chunk_size, samples_dir=mc_samples_dir,
+            progress=print_progress if mc_workers > 0 else None, store=mc_store,
+            rules=mc_rules)
+
+    # Yield against the spec limits with a variance-reduced sampler
+    yield_result = None
+    if yield_runs > 0 and mc_limits:
+        yield_result = analysis.estimate_yield(mc_limits, runs=yield_runs, tolerance=0.05, sampler=sampler,
+                                               distribution=mc_distribution, seed=mc_seed,
+                                               chunk_size=mc_chunk_size)
+
+    # Worst-case node voltages over tolerance corners, solved in batches
+    corner_result = None
+    if corners is not None:
+        corner_result = analysis.run_corners(corners, tolerance=0.05, source_tolerance=source_tolerance,
+                                             rules=corner_rules)
+
+    # Guaranteed worst-case bounds over the resistor tolerance box
+    worst_case_result = None
+    if worst_case:
+        try:
+            worst_case_result = analysis.run_worst_case(tolerance=0.05)
+        except ValueError as exc:
+            print(f"Warning: skipping worst-case bounds: {exc}")
 
     # Step 4: Verification checks
-    verifier = CircuitVerifier(circuit, node_voltages, analysis_results)
+    verifier = CircuitVerifier(circuit, node_voltages, analysis_results, rules=rule_set)
     verification_results = verifier.verify()
 
     # Print results
@@ -57,22 +303,199 @@ def main(netlist_path: str):
     for node, voltage in node_voltages.items():
         print(f"Node {node}: {voltage:.4f} V")
 
+    for sweep, result in sweep_results:
+        print_dc_sweep(sweep, result)
+
     print("\n--- Analysis Results ---")
     for key, val in analysis_results.items():
         print(f"{key}: {val}")
 
+    if ranked:
+        print_sensitivities(ranked)
+
     print("\n--- Verification Results ---")
     for key, val in verification_results.items():
         print(f"{key}: {val}")
+    floating = verifier.floating_nodes()
+    if floating:
+        shown = ", ".join(floating[:MAX_FLOATING_NODES])
+        more = f" ... ({len(floating)} in total)" if len(floating) > MAX_FLOATING_NODES else ""
+        print(f"floating nodes: {shown}{more}")
+    if verifier.rule_report is not None:
+        print_rules(verifier.rule_report, "the DC solution")
+
+    if mc_stats is not None:
+        print_monte_carlo(mc_stats, 0.05)
+        if mc_rules is not None:
+            print_rules(mc_rules, "Monte Carlo samples")
+    if yield_result is not None:
+        print_yield(yield_result, 0.05)
+    if corner_result is not None:
+        print_corners(corner_result, 0.05, source_tolerance)
+        if corner_rules is not None:
+            print_rules(corner_rules, "corners")
+    if worst_case_result is not None:
+        print_worst_case(worst_case_result, 0.05)
+
+def print_eco(path, result, rule_report):
+    edits = ", ".join(f"{len(result[key])} {key}" for key in ('values', 'added', 'removed'))
+    how = result['mode'] if result['reason'] is None else f"{result['mode']} ({result['reason']})"
+    changed = '' if result['changed_nodes'] is None else f", {result['changed_nodes']} node(s) moved"
+    refactorized = "refactorized" if result['refactorized'] else f"rank-{result['rank']} update"
+    print(f"\n--- ECO {path}: {how} in {result['seconds'] * 1e3:.1f} ms ---")
+    print(f"{edits}; {refactorized}{changed}; {len(result['rules_checked'])} rule(s) re-checked")
+    for key, val in result['verification'].items():
+        print(f"{key}: {val}")
+    if rule_report is not None and not rule_report.passed:
+        print_rules(rule_report, path)
+
+def run_eco(netlist_path: str, edited_paths, rules_path=None, solver_method: str = 'auto'):
+    """ Verify a netlist, then each edited version in turn incrementally (ECO mode). """
+    eco = IncrementalVerifier(netlist_path, rules=rules_path, method=solver_method)
+    print(f"Verified {netlist_path}: {eco.verification}")
+    for path in edited_paths:
+        print_eco(path, eco.reverify(path), eco.rule_report)
+    return eco
 
-    print("\n--- Monte Carlo Results (Resistor Tolerances) ---")
-    for i, (run_voltages, run_values) in enumerate(mc_results):
-        print(f"Run #{i+1}: Resistor Values = {run_values}, Node Voltages = {run_voltages}")
+def run_batch(spec: str, output=None, workers=None, timeout: float = 60.0, use_cache: bool = True,
+              include_voltages: bool = False, solver_method: str = 'auto', cg_tol: float = 1e-10,
+              cg_preconditioner='jacobi', rules_path=None):
+    """ Verify every netlist named by `spec`, one JSON line each; returns the batch stats. """
+    paths = collect_netlists(spec)
+    options = {'use_cache': use_cache, 'solver': solver_method, 'tol': cg_tol,
+               'preconditioner': cg_preconditioner, 'include_voltages': include_voltages,
+               'rules': rules_path}
+    verifier = BatchVerifier(workers=workers, timeout=timeout, options=options)
+    if output in (None, '-'):
+        stats = verifier.run(paths, sys.stdout)
+    else:
+        with open(output, 'w') as out:
+            stats = verifier.run(paths, out)
+    print(f"Verified {stats['netlists']} netlists in {stats['seconds']:.2f} s "
+          f"({stats['netlists_per_s']:.1f} netlists/s): {stats['passed']} passed, {stats['ok']} ok, "
+          f"{stats['error']} error, {stats['timeout']} timeout", file=sys.stderr)
+    return stats
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python main.py <path_to_netlist>")
-        sys.exit(1)
+    arg_parser = argparse.ArgumentParser(description="Parse, simulate and verify a netlist.")
+    arg_parser.add_argument("netlist", nargs="?", help="path to the netlist file")
+    arg_parser.add_argument("--no-cache", action="store_true",
+                            help="always re-parse the netlist instead of using its binary cache")
+    arg_parser.add_argument("--mc-runs", type=int, default=10, help="number of Monte Carlo runs")
+    arg_parser.add_argument("--mc-workers", type=int, default=0,
+                            help="Monte Carlo worker processes (0 = run in this process)")
+    arg_parser.add_argument("--mc-chunk-size", type=int, default=10000,
+                            help="Monte Carlo runs per worker task")
+    arg_parser.add_argument("--mc-seed", type=int, default=None, help="Monte Carlo random seed")
+    arg_parser.add_argument("--mc-spec", type=parse_spec, action="append", default=None, metavar="NODE=LOW:HIGH",
+                            help="spec limits of a node voltage for Monte Carlo failure counts (repeatable)")
+    arg_parser.add_argument("--mc-samples", metavar="DIR",
+                            help="also write every Monte Carlo sample to DIR as .npy files")
+    arg_parser.add_argument("--store", metavar="DIR",
+                            help="append the DC solution, sweeps and Monte Carlo samples to a result store in DIR")
+    arg_parser.add_argument("--yield-runs", type=int, default=0, metavar="N",
+                            help="estimate the yield against --mc-spec limits with about N solves")
+    arg_parser.add_argument("--sampler", choices=SAMPLERS, default='lhs',
+                            help="--yield-runs sampler ('importance' for parts-per-million failure rates)")
+    arg_parser.add_argument("--mc-distribution", choices=DISTRIBUTIONS, default='uniform',
+                            help="resistor tolerance distribution for --yield-runs (normals: tolerance = 3 sigma)")
+    arg_parser.add_argument("--corners", choices=DESIGNS, default=None, metavar="DESIGN",
+                            help="worst-case node voltages over ±5%% resistor corners: 'sensitivity' "
+                                 "(pruned by sensitivity signs), 'full' or 'fractional' factorial")
+    arg_parser.add_argument("--source-tolerance", type=float, default=0.0, metavar="TOL",
+                            help="relative voltage source tolerance for --corners (default 0)")
+    arg_parser.add_argument("--rules", metavar="FILE",
+                            help="JSON rules file checked on the DC solution, Monte Carlo samples and corners")
+    arg_parser.add_argument("--eco", action="append", default=None, metavar="NETLIST",
+                            help="edited version of the netlist, re-verified incrementally after it (repeatable)")
+    arg_parser.add_argument("--worst-case", action="store_true",
+                            help="guaranteed node voltage bounds over all ±5%% resistor values")
+    arg_parser.add_argument("--sensitivity", type=int, default=0, metavar="N",
+                            help="print the N most sensitive (node, resistor) pairs")
+    arg_parser.add_argument("--sensitivity-node", action="append", default=None, metavar="NODE",
+                            help="restrict sensitivity analysis to this node (repeatable)")
+    arg_parser.add_argument("--reduce", action="store_true",
+                            help="merge series/parallel resistors and drop dangling nodes before solving")
+    arg_parser.add_argument("--solver", choices=['auto', 'dense', 'sparse', 'cg', 'partitioned'], default='auto',
+                            help="DC solver: direct LU (auto/dense/sparse), conjugate gradient, or "
+                                 "domain decomposition over worker processes")
+    arg_parser.add_argument("--partitions", type=int, default=None, metavar="K",
+                            help="--solver partitioned: number of parts (default: one per worker)")
+    arg_parser.add_argument("--solver-workers", type=int, default=None,
+                            help="--solver partitioned: worker processes (default: CPU count, 0 = this process)")
+    arg_parser.add_argument("--cg-tol", type=float, default=1e-10,
+                            help="relative residual at which CG stops")
+    arg_parser.add_argument("--cg-preconditioner", choices=['jacobi', 'sgs', 'none'], default='jacobi',
+                            help="CG preconditioner (sgs = symmetric Gauss-Seidel)")
+    arg_parser.add_argument("--batch", metavar="SPEC",
+                            help="verify a directory, glob or manifest of netlists instead (JSON lines)")
+    arg_parser.add_argument("--batch-output", default="-", metavar="PATH",
+                            help="JSON lines output for --batch (default: stdout)")
+    arg_parser.add_argument("--batch-workers", type=int, default=None,
+                            help="--batch worker processes (default: CPU count, 0 = this process)")
+    arg_parser.add_argument("--batch-voltages", action="store_true",
+                            help="include node voltages in --batch records")
+    arg_parser.add_argument("--timeout", type=float, default=60.0,
+                            help="seconds per netlist before a --batch worker is killed")
+    arg_parser.add_argument("--profile", metavar="PATH",
+                            help="record timing spans and counters and write them to PATH")
+    arg_parser.add_argument("--profile-format", choices=['chrome', 'json'], default='chrome',
+                            help="--profile output: Chrome trace events (chrome://tracing, Perfetto) or JSON summary")
+    arg_parser.add_argument("--serve", metavar="SOCKET",
+                            help="run the verification daemon on this Unix socket instead")
+    arg_parser.add_argument("--cache-entries", type=int, default=32,
+                            help="netlists kept parsed and solved by --serve")
+    arg_parser.add_argument("--cache-mb", type=float, default=1024,
+                            help="approximate memory bound of the --serve cache, in MB")
+    arg_parser.add_argument("--serve-threads", type=int, default=None,
+                            help="--serve threads for parsing and analyses (default: CPU count)")
+    args = arg_parser.parse_args()
+    cg_preconditioner = None if args.cg_preconditioner == 'none' else args.cg_preconditioner
+
+    if args.serve:
+        print(f"Serving on {args.serve}", file=sys.stderr)
+        serve(args.serve, cache_entries=args.cache_entries, cache_bytes=int(args.cache_mb * 1e6),
+              workers=args.serve_threads, use_cache=not args.no_cache)
+        sys.exit(0)
+    if args.batch and args.solver == 'partitioned':
+        arg_parser.error("--solver partitioned is not available with --batch (netlists already run in parallel)")
+    if args.batch:
+        stats = run_batch(args.batch, output=args.batch_output, workers=args.batch_workers,
+                          timeout=args.timeout, use_cache=not args.no_cache,
+                          include_voltages=args.batch_voltages, solver_method=args.solver,
+                          cg_tol=args.cg_tol, cg_preconditioner=cg_preconditioner, rules_path=args.rules)
+        sys.exit(0 if stats['passed'] == stats['netlists'] else 1)
+    if args.netlist is None:
+        arg_parser.error("a netlist path or --batch is required")
+    if args.yield_runs > 0 and not args.mc_spec:
+        arg_parser.error("--yield-runs needs at least one --mc-spec limit")
+    eco = None
+    if args.eco:
+        if args.solver not in ('auto', 'dense', 'sparse'):
+            arg_parser.error("--eco reuses a direct factorization (--solver auto, dense or sparse)")
+        # ECO mode re-verifies (and checks rules) only; other analyses would be dropped
+        eco_options = {'netlist', 'eco', 'rules', 'solver', 'no_cache', 'profile', 'profile_format'}
+        unsupported = [f"--{dest.replace('_', '-')}" for dest, value in vars(args).items()
+                       if dest not in eco_options and value != arg_parser.get_default(dest)]
+        if unsupported:
+            arg_parser.error(f"--eco does not support {', '.join(unsupported)}")
 
-    netlist_file = sys.argv[1]
-    main(netlist_file)
+    with Profiler() if args.profile else contextlib.nullcontext() as profiler:
+        if args.eco:
+            eco = run_eco(args.netlist, args.eco, rules_path=args.rules, solver_method=args.solver)
+        else:
+            main(args.netlist, use_cache=not args.no_cache, mc_runs=args.mc_runs, mc_workers=args.mc_workers,
+                 mc_chunk_size=args.mc_chunk_size, mc_seed=args.mc_seed,
+                 sensitivity_top=args.sensitivity, sensitivity_nodes=args.sensitivity_node,
+                 solver_method=args.solver, cg_tol=args.cg_tol,
+                 cg_preconditioner=cg_preconditioner,
+                 mc_limits=dict(args.mc_spec) if args.mc_spec else None, mc_samples_dir=args.mc_samples,
+                 yield_runs=args.yield_runs, sampler=args.sampler, mc_distribution=args.mc_distribution,
+                 reduce=args.reduce, partitions=args.partitions, solver_workers=args.solver_workers,
+                 store_path=args.store, corners=args.corners, source_tolerance=args.source_tolerance,
+                 worst_case=args.worst_case, rules_path=args.rules)
+    if profiler is not None:
+        profiler.save(args.profile, args.profile_format)
+        print_profile(profiler, args.profile)
+    if eco is not None:
+        sys.exit(0 if all(eco.verification.values()) else 1)
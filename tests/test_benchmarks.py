@@ -0,0 +1,52 @@
+import pytest
+from benchmarks.circuit_generators import GENERATORS, hierarchy, sized, write_netlist
+from benchmarks.run_benchmarks import compare, run_suite
+from circuit_verification.circuit_parser import CircuitParser
+from circuit_verification.circuit_simulation import DCSolver
+
+@pytest.mark.parametrize('name', list(GENERATORS))
+def test_generated_circuits_are_connected_and_solvable(tmp_path, name):
+    path = tmp_path / f"{name}.net"
+    write_netlist(str(path), sized(name, 2000))
+    compiled = CircuitParser(str(path)).parse_compiled()
+    assert compiled.connectivity.is_connected
+    assert not len(compiled.connectivity.floating_node_ids())
+    voltages = DCSolver(compiled).run_dc_analysis()
+    assert all(0.0 <= v <= 1.0 + 1e-9 for v in voltages.values())
+    if name != 'hierarchy':
+        assert 1000 <= compiled.resistor_count + compiled.voltage_source_count <= 3000
+
+def test_hierarchy_depth(tmp_path):
+    path = tmp_path / "deep.net"
+    write_netlist(str(path), hierarchy(depth=5, fanout=3, instances=2))
+    compiled = CircuitParser(str(path)).parse_compiled()
+    assert compiled.instance_count == 2
+    assert [m.name for m in compiled.port_models] == ['C4']
+
+def test_run_suite_records_every_stage(tmp_path):
+    results = run_suite(['ladder'], [200], repeat=1, mc_runs=5, workdir=str(tmp_path))
+    assert sorted(results) == ['ladder/200/connectivity', 'ladder/200/monte_carlo',
+                               'ladder/200/parse', 'ladder/200/solve']
+    for entry in results.values():
+        assert entry['seconds'] > 0 and entry['peak_mb'] > 0
+        assert entry['elements'] == 201
+    assert list(tmp_path.iterdir()) == []
+
+def test_stage_budget_skips_larger_sizes(tmp_path):
+    results = run_suite(['ladder'], [400, 200], stages=['parse', 'solve'], repeat=1, memory=False,
+                        workdir=str(tmp_path), stage_budget=1e-9)
+    assert sorted(results) == ['ladder/200/parse', 'ladder/200/solve']
+    assert results['ladder/200/solve']['peak_mb'] is None
+
+def test_compare_flags_slowdowns_and_memory_growth():
+    baseline = {'a/1/parse': {'seconds': 1.0, 'peak_mb': 10.0},
+                'a/1/solve': {'seconds': 0.001, 'peak_mb': 1.0},
+                'a/1/connectivity': {'seconds': 1.0, 'peak_mb': 1.0}}
+    results = {'a/1/parse': {'seconds': 1.2, 'peak_mb': 20.0},
+               'a/1/solve': {'seconds': 0.003, 'peak_mb': 1.0},   # too fast to gate
+               'a/1/connectivity': {'seconds': 2.0, 'peak_mb': 1.0},
+               'a/1/monte_carlo': {'seconds': 9.0, 'peak_mb': 1.0}}  # no baseline
+    regressions = compare(results, baseline, threshold=0.25, memory_threshold=0.5)
+    assert len(regressions) == 2
+    assert regressions[0].startswith('a/1/parse: peak 20.0 MB')
+    assert regressions[1].startswith('a/1/connectivity: 2.0000 s')
@@ -1,6 +1,8 @@
 import pytest
 from circuit_verification.circuit_parser import CircuitParser
 from circuit_verification.circuit_analysis import CircuitAnalysis
+from circuit_verification.circuit_simulation import DCSolver
+from circuit_verification.circuit_elements import Circuit, Resistor, VoltageSource
 
 def test_circuit_analysis():
     parser = CircuitParser('examples/example_circuit.net')
@@ -13,3 +15,64 @@ def test_circuit_analysis():
     assert results['node_count'] >= 2
     assert results['resistor_count'] == 2
     assert results['voltage_source_count'] == 1
+
+def test_monte_carlo_does_not_mutate_circuit():
+    circuit = CircuitParser('examples/example_circuit.net').parse()
+    nominal = {r.name: r.resistance for r in circuit.get_resistors()}
+
+    results = CircuitAnalysis(circuit).run_monte_carlo(runs=20, tolerance=0.05, seed=1)
+
+    assert len(results) == 20
+    assert {r.name: r.resistance for r in circuit.get_resistors()} == nominal
+    for node_voltages, values in results:
+        assert node_voltages['1'] == pytest.approx(5.0)
+        for name, value in values.items():
+            assert abs(value / nominal[name] - 1.0) <= 0.05
+        # Voltage divider: V2 = 5 * R2 / (R1 + R2)
+        expected = 5.0 * values['R2'] / (values['R1'] + values['R2'])
+        assert node_voltages['2'] == pytest.approx(expected)
+
+def test_monte_carlo_batch_is_seeded():
+    circuit = CircuitParser('examples/example_circuit.net').parse()
+    analysis = CircuitAnalysis(circuit)
+
+    first = analysis.run_monte_carlo_batch(runs=50, seed=7)
+    second = analysis.run_monte_carlo_batch(runs=50, seed=7)
+
+    assert first['voltages'].shape == (50, 2)
+    assert first['resistances'].shape == (50, 2)
+    assert (first['voltages'] == second['voltages']).all()
+
+def test_sensitivity_matches_divider_formula():
+    circuit = CircuitParser('examples/example_circuit.net').parse()
+    analysis = CircuitAnalysis(circuit)
+    result = analysis.run_sensitivity(nodes=['2'])
+
+    # V2 = 5 * R2 / (R1 + R2) with R1 = 1k, R2 = 2k
+    j1, j2 = result['resistors'].index('R1'), result['resistors'].index('R2')
+    assert result['dV_dR'][0, j1] == pytest.approx(-5.0 * 2000 / 3000 ** 2)
+    assert result['dV_dR'][0, j2] == pytest.approx(5.0 * 1000 / 3000 ** 2)
+    assert result['normalized'][0, j2] == pytest.approx(1000 / 3000)
+
+    ranked = analysis.rank_sensitivities(result, top=1)
+    assert ranked[0][:2] == ('2', 'R2')
+
+def test_sensitivity_matches_finite_differences():
+    circuit = Circuit()
+    circuit.add_element(VoltageSource("V1", 'a', '0', 2.0))
+    circuit.add_element(Resistor("R1", 'a', 'm', 100.0))
+    circuit.add_element(Resistor("R2", 'm', 'n', 220.0))
+    circuit.add_element(Resistor("R3", 'n', '0', 330.0))
+    circuit.add_element(Resistor("R4", 'm', '0', 470.0))
+    result = CircuitAnalysis(circuit).run_sensitivity()
+
+    h = 1e-3
+    for j, resistor in enumerate(circuit.get_resistors()):
+        nominal = resistor.resistance
+        resistor.resistance = nominal + h
+        up = DCSolver(circuit).run_dc_analysis()
+        resistor.resistance = nominal - h
+        down = DCSolver(circuit).run_dc_analysis()
+        resistor.resistance = nominal
+        for i, node in enumerate(result['nodes']):
+            assert result['dV_dR'][i, j] == pytest.approx((up[node] - down[node]) / (2 * h), abs=1e-9)
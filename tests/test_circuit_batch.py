@@ -0,0 +1,110 @@
+import io
+import json
+import os
+import time
+import pytest
+from circuit_verification import circuit_batch
+from circuit_verification.circuit_batch import BatchVerifier, collect_netlists, verify_netlist
+
+DIVIDER = "V1 1 0 5\nR1 1 2 1k\nR2 2 0 1k\n.END\n"
+FLOATING = "V1 1 0 5\nR1 1 0 1k\nR2 a b 1k\n.END\n"
+BROKEN = "R1 a 0 xyz\n.END\n"
+
+def write_tree(root):
+    files = {'a.net': DIVIDER, 'bad.net': BROKEN, 'float.cir': FLOATING,
+             'sub/b.sp': DIVIDER, 'notes.txt': 'not a netlist'}
+    for name, text in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+    return root
+
+def read_records(text):
+    return sorted((json.loads(line) for line in text.splitlines()), key=lambda r: r['index'])
+
+def test_collect_netlists_directory_glob_and_manifest(tmp_path):
+    root = write_tree(tmp_path)
+    names = [os.path.relpath(p, root) for p in collect_netlists(str(root))]
+    assert names == ['a.net', 'bad.net', 'float.cir', os.path.join('sub', 'b.sp')]
+
+    assert collect_netlists(str(root / '*.net')) == [str(root / 'a.net'), str(root / 'bad.net')]
+
+    manifest = root / 'manifest.txt'
+    manifest.write_text(f"# batch\nsub/b.sp\n\n{root / 'a.net'}\n")
+    assert collect_netlists(str(manifest)) == [str(root / 'sub' / 'b.sp'), str(root / 'a.net')]
+
+    with pytest.raises(FileNotFoundError):
+        collect_netlists(str(root / 'missing'))
+
+def test_verify_netlist_ok_error_and_floating(tmp_path):
+    root = write_tree(tmp_path)
+    ok = verify_netlist(str(root / 'a.net'), {'include_voltages': True})
+    assert ok['status'] == 'ok' and ok['passed']
+    assert ok['node_voltages'] == pytest.approx({'0': 0.0, '1': 5.0, '2': 2.5})
+
+    bad = verify_netlist(str(root / 'bad.net'))
+    assert bad['status'] == 'error' and not bad['passed']
+    assert 'xyz' in bad['error']
+
+    floating = verify_netlist(str(root / 'float.cir'))
+    assert floating['status'] == 'ok' and not floating['passed']
+    assert floating['verification']['no_floating_nodes'] is False
+    assert 'dc_error' in floating
+
+@pytest.mark.parametrize('workers', [0, 2])
+def test_batch_run_writes_one_line_per_netlist(tmp_path, workers):
+    paths = collect_netlists(str(write_tree(tmp_path)))
+    out = io.StringIO()
+    stats = BatchVerifier(workers=workers, timeout=30).run(paths, out)
+
+    records = read_records(out.getvalue())
+    assert [r['netlist'] for r in records] == paths
+    assert [r['status'] for r in records] == ['ok', 'error', 'ok', 'ok']
+    assert [r['passed'] for r in records] == [True, False, False, True]
+    assert stats['netlists'] == 4 and stats['passed'] == 2
+    assert (stats['ok'], stats['error'], stats['timeout']) == (3, 1, 0)
+
+def slow_or_crashing(path, options=None):
+    if path.endswith('slow.net'):
+        time.sleep(60)
+    if path.endswith('crash.net'):
+        os._exit(3)
+    return {'netlist': path, 'status': 'ok', 'passed': True}
+
+def test_batch_pool_survives_timeouts_and_crashes(tmp_path, monkeypatch):
+    # Workers are forked, so they see the patched function
+    monkeypatch.setattr(circuit_batch, 'verify_netlist', slow_or_crashing)
+    paths = [str(tmp_path / name) for name in ['a.net', 'slow.net', 'b.net', 'crash.net', 'c.net']]
+    out = io.StringIO()
+    start = time.perf_counter()
+    stats = BatchVerifier(workers=2, timeout=1.0).run(paths, out)
+    assert time.perf_counter() - start < 30
+
+    records = read_records(out.getvalue())
+    assert [r['status'] for r in records] == ['ok', 'timeout', 'ok', 'error', 'ok']
+    assert 'code 3' in records[3]['error']
+    assert (stats['ok'], stats['error'], stats['timeout']) == (3, 1, 1)
+
+def one_shot_worker(conn, options):
+    index, path = conn.recv()
+    conn.send((index, {'netlist': path, 'status': 'ok', 'passed': True}))
+    os._exit(0)
+
+def test_batch_survives_sending_to_a_dead_worker(tmp_path, monkeypatch):
+    # Every worker quits after one netlist; the pause lets it exit before
+    # the next path is sent, so that send hits a closed pipe
+    monkeypatch.setattr(circuit_batch, '_worker_main', one_shot_worker)
+    original_wait = circuit_batch.wait
+    def slow_wait(*args, **kwargs):
+        time.sleep(0.3)
+        return original_wait(*args, **kwargs)
+    monkeypatch.setattr(circuit_batch, 'wait', slow_wait)
+    paths = [str(tmp_path / f'{name}.net') for name in 'abc']
+    out = io.StringIO()
+    stats = BatchVerifier(workers=1, timeout=10.0).run(paths, out)
+
+    records = read_records(out.getvalue())
+    assert [r['index'] for r in records] == [0, 1, 2]
+    assert [r['status'] for r in records] == ['ok', 'error', 'ok']
+    assert 'worker exited' in records[1]['error']
+    assert (stats['ok'], stats['error']) == (2, 1)
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from circuit_verification.circuit_analysis import CircuitAnalysis
+from circuit_verification.circuit_parser import CircuitParser
+
+BRIDGE = """V1 1 0 5
+V2 5 0 2
+R1 1 2 1k
+R2 2 3 2k
+R3 3 0 1.5k
+R4 2 4 3k
+R5 4 5 1k
+R6 4 0 4k
+R7 3 4 500
+.END
+"""
+
+@pytest.fixture
+def bridge(tmp_path):
+    netlist = tmp_path / 'bridge.net'
+    netlist.write_text(BRIDGE)
+    return CircuitAnalysis(CircuitParser(str(netlist)).parse_compiled())
+
+def test_bounds_enclose_every_corner_and_sample(bridge):
+    for tolerance in (0.01, 0.05, 0.2):
+        bounds = bridge.run_worst_case(tolerance=tolerance, vertices=False)
+        full = bridge.run_corners('full', tolerance=tolerance)
+        assert (bounds['lower'] <= full['min']).all() and (full['max'] <= bounds['upper']).all()
+        samples = bridge.run_monte_carlo_batch(runs=2000, tolerance=tolerance, seed=0)['voltages']
+        assert (bounds['lower'] <= samples.min(axis=0)).all() and (samples.max(axis=0) <= bounds['upper']).all()
+        # Second-order slack only
+        assert (bounds['upper'] - full['max']).max() < 2 * tolerance ** 2 * 5
+
+def test_small_tolerances_are_proven_exact(bridge):
+    bounds = bridge.run_worst_case(tolerance=0.01)
+    full = bridge.run_corners('full', tolerance=0.01)
+    assert bounds['proven'].all()
+    assert np.allclose(bounds['lower'], full['min']) and np.allclose(bounds['upper'], full['max'])
+    assert (bounds['lower'] == bounds['lower_attained']).all()
+
+def test_unproven_bounds_bracket_attained_values(bridge):
+    bounds = bridge.run_worst_case(nodes=['3'], tolerance=0.2)
+    assert not bounds['proven'][0]
+    assert bounds['lower'][0] <= bounds['lower_attained'][0] < bounds['nominal'][0]
+    assert bounds['nominal'][0] < bounds['upper_attained'][0] <= bounds['upper'][0]
+
+def test_bounds_reject_source_tolerances(bridge):
+    with pytest.raises(ValueError, match='resistor tolerances only'):
+        bridge.run_worst_case(tolerances={'V1': 0.1})
+    with pytest.raises(ValueError, match='below 50%'):
+        bridge.run_worst_case(tolerance=0.6)
+
+def test_bounds_reject_subcircuit_instances(tmp_path, capsys):
+    netlist = tmp_path / 'hier.net'
+    netlist.write_text("V1 in 0 5\n.SUBCKT DIV a b\nRA a b 1k\nRB b 0 1k\n.ENDS\nX1 in out DIV\nR1 out 0 2k\n.END\n")
+    analysis = CircuitAnalysis(CircuitParser(str(netlist)).parse_compiled())
+    with pytest.raises(ValueError, match='subcircuit instances'):
+        analysis.run_worst_case(tolerance=0.05)
+    analysis.run_corners('full', tolerance=0.05)
+    assert "Corner analysis varies top-level resistors only" in capsys.readouterr().out
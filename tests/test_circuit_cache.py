@@ -0,0 +1,81 @@
+import os
+import numpy as np
+import pytest
+from circuit_verification import circuit_cache
+from circuit_verification.circuit_parser import CircuitParser, PARSER_VERSION
+
+NETLIST = """V1 in 0 DC 5
+R1 in mid 1k
+R2 mid 0 2k
+"""
+
+def write_netlist(tmp_path, text=NETLIST):
+    path = tmp_path / 'circuit.net'
+    path.write_text(text)
+    return str(path)
+
+def test_cache_roundtrip_uses_memmap(tmp_path):
+    netlist = write_netlist(tmp_path)
+    first = CircuitParser(netlist, use_cache=True)
+    compiled = first.parse_compiled()
+    assert first.stats['source'] == 'netlist'
+    assert os.path.exists(netlist + circuit_cache.CACHE_SUFFIX)
+
+    second = CircuitParser(netlist, use_cache=True)
+    cached = second.parse_compiled()
+    assert second.stats['source'] == 'cache'
+    assert isinstance(cached.res_node1, np.memmap)
+    assert list(cached.node_names) == list(compiled.node_names)
+    assert list(cached.res_names) == ['R1', 'R2']
+    assert cached.vs_names[0] == 'V1'
+    assert cached.has_ground
+    assert cached.resistances.tolist() == [1000.0, 2000.0]
+    assert (cached.conductances == compiled.conductances).all()
+
+def test_cache_rebuilt_when_netlist_changes(tmp_path):
+    netlist = write_netlist(tmp_path)
+    CircuitParser(netlist, use_cache=True).parse_compiled()
+
+    with open(netlist, 'a') as f:
+        f.write("R3 mid 0 3k\n")
+    parser = CircuitParser(netlist, use_cache=True)
+    assert parser.parse_compiled().resistor_count == 3
+    assert parser.stats['source'] == 'netlist'
+
+def test_cache_rebuilt_when_parser_version_differs(tmp_path):
+    netlist = write_netlist(tmp_path)
+    compiled = CircuitParser(netlist).parse_compiled()
+    cache_path = netlist + circuit_cache.CACHE_SUFFIX
+    source = circuit_cache.source_fingerprint(netlist)
+    circuit_cache.save_compiled(compiled, cache_path, source, PARSER_VERSION - 1)
+
+    with pytest.raises(circuit_cache.CacheError):
+        circuit_cache.load_compiled(cache_path, netlist, PARSER_VERSION)
+    parser = CircuitParser(netlist, use_cache=True)
+    parser.parse_compiled()
+    assert parser.stats['source'] == 'netlist'
+
+@pytest.mark.parametrize("damage", ['truncate', 'garbage', 'flip_data', 'flip_names'])
+def test_corrupt_cache_is_detected(tmp_path, damage):
+    netlist = write_netlist(tmp_path)
+    CircuitParser(netlist, use_cache=True).parse_compiled()
+    cache_path = netlist + circuit_cache.CACHE_SUFFIX
+    header = circuit_cache.read_header(cache_path)
+
+    data = bytearray(open(cache_path, 'rb').read())
+    if damage == 'truncate':
+        data = data[:len(data) // 2]
+    elif damage == 'garbage':
+        data[20:40] = b'x' * 20
+    elif damage == 'flip_data':
+        data[header['arrays']['resistances']['offset']] ^= 0xFF
+    else:
+        data[header['strings']['res_names']['offset']] ^= 0x01
+    open(cache_path, 'wb').write(bytes(data))
+
+    # Default options: a damaged section is never used, the netlist is re-parsed
+    with pytest.raises(circuit_cache.CacheError):
+        circuit_cache.load_compiled(cache_path, netlist, PARSER_VERSION)
+    parser = CircuitParser(netlist, use_cache=True)
+    assert parser.parse_compiled().resistances.tolist() == [1000.0, 2000.0]
+    assert parser.stats['source'] == 'netlist'
@@ -0,0 +1,79 @@
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+from circuit_verification.circuit_parser import CircuitParser
+from circuit_verification.circuit_connectivity import Connectivity, UnionFind
+from circuit_verification.circuit_analysis import CircuitAnalysis
+from circuit_verification.circuit_verifier import CircuitVerifier
+
+FLOATING_NETLIST = """* divider plus an isolated chain
+V1 1 0 5
+R1 1 2 1k
+R2 2 0 2k
+R3 a b 1k
+R4 b c 1k
+V2 x y 1
+.END
+"""
+
+def same_partition(roots, labels):
+    pairs = set(zip(roots.tolist(), labels.tolist()))
+    return len(pairs) == len(set(roots.tolist())) == len(set(labels.tolist()))
+
+def test_union_find_matches_csgraph_incrementally():
+    rng = np.random.default_rng(3)
+    n = 2000
+    a, b = rng.integers(0, n, 1500), rng.integers(0, n, 1500)
+    uf = UnionFind()
+    for k in range(0, len(a), 100):
+        uf.union(a[k:k + 100], b[k:k + 100])
+    uf.grow(n)
+    roots = uf.roots(n)
+
+    graph = sp.coo_matrix((np.ones(len(a)), (a, b)), shape=(n, n))
+    _, labels = connected_components(graph, directed=False)
+    assert same_partition(roots, labels)
+    assert (roots <= np.arange(n)).all()
+
+def test_union_find_long_chain():
+    n = 10000
+    uf = UnionFind()
+    order = np.random.default_rng(0).permutation(n - 1)
+    uf.union(order, order + 1)
+    assert (uf.roots(n) == 0).all()
+
+def test_connectivity_report(tmp_path):
+    netlist = tmp_path / "floating.net"
+    netlist.write_text(FLOATING_NETLIST)
+    compiled = CircuitParser(str(netlist), chunk_size=16).parse_compiled()
+    report = compiled.connectivity.report()
+
+    assert report['component_count'] == 3
+    assert not report['is_connected']
+    assert report['ungrounded_components'] == 2
+    assert report['unsourced_components'] == 1
+    assert report['components'][0] == {'root': '0', 'size': 3, 'has_ground': True, 'has_source': True}
+    assert {'root': 'x', 'size': 2, 'has_ground': False, 'has_source': True} in report['components']
+    assert sorted(report['floating_nodes']) == ['a', 'b', 'c', 'x', 'y']
+
+    # Roots from the parser's incremental union-find match a fresh build
+    assert (Connectivity(compiled).roots == compiled.connectivity.roots).all()
+
+def test_floating_nodes_in_analysis_and_verifier(tmp_path):
+    netlist = tmp_path / "floating.net"
+    netlist.write_text(FLOATING_NETLIST)
+    circuit = CircuitParser(str(netlist)).parse()
+
+    results = CircuitAnalysis(circuit).run_analysis()
+    assert results['is_connected'] is False
+    assert results['component_count'] == 3
+    assert results['floating_node_count'] == 5
+
+    verifier = CircuitVerifier(circuit, {}, results)
+    assert verifier.verify()['no_floating_nodes'] is False
+    assert sorted(verifier.floating_nodes()) == ['a', 'b', 'c', 'x', 'y']
+
+def test_connected_example_has_no_floating_nodes():
+    compiled = CircuitParser('examples/example_circuit.net').parse_compiled()
+    assert compiled.connectivity.is_connected
+    assert compiled.connectivity.floating_nodes() == []
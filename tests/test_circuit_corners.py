@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from circuit_verification.circuit_analysis import CircuitAnalysis
+from circuit_verification.circuit_corners import CornerAnalysis, corner_design
+from circuit_verification.circuit_parser import CircuitParser
+from circuit_verification.circuit_simulation import DCSolver
+
+BRIDGE = """V1 1 0 5
+V2 5 0 2
+R1 1 2 1k
+R2 2 3 2k
+R3 3 0 1.5k
+R4 2 4 3k
+R5 4 5 1k
+R6 4 0 4k
+R7 3 4 500
+.END
+"""
+
+@pytest.fixture
+def bridge(tmp_path):
+    netlist = tmp_path / 'bridge.net'
+    netlist.write_text(BRIDGE)
+    return CircuitAnalysis(CircuitParser(str(netlist)).parse_compiled())
+
+def test_designs():
+    full = corner_design(3, 'full')
+    assert full.shape == (8, 3) and len(np.unique(full, axis=0)) == 8
+    fractional = corner_design(5, 'fractional')
+    assert fractional.shape == (16, 5)
+    # Balanced, orthogonal columns
+    assert (fractional.sum(axis=0) == 0).all()
+    assert (fractional.T.astype(int) @ fractional == 16 * np.eye(5)).all()
+    with pytest.raises(ValueError, match='full-factorial'):
+        corner_design(30, 'full')
+
+def test_sensitivity_corners_match_full_factorial(bridge):
+    full = bridge.run_corners('full', tolerance=0.05, source_tolerance=0.1)
+    pruned = bridge.run_corners('sensitivity', tolerance=0.05, source_tolerance=0.1)
+    assert full['corners'] == 2 ** 9 and pruned['corners'] <= 2 * len(pruned['nodes'])
+    assert np.allclose(pruned['min'], full['min']) and np.allclose(pruned['max'], full['max'])
+    assert (full['min'] <= full['nominal']).all() and (full['nominal'] <= full['max']).all()
+    # V1 sits exactly at its source tolerance
+    assert full['min'][0] == pytest.approx(4.5) and full['max'][0] == pytest.approx(5.5)
+
+def test_corner_levels_reproduce_extremes(bridge, tmp_path):
+    corners = CornerAnalysis(bridge, tolerance=0.02, tolerances={'V1': (4.8, 5.1), 'R7': 0.0})
+    assert 'R7' not in corners.factors and 'V2' not in corners.factors
+    result = corners.run('sensitivity', nodes=['3'])
+    values = corners.corner_values(result['max_corner'][0])
+    assert values['V1'] == 5.1 and values['R1'] == pytest.approx(980.0)
+
+    # The reported corner, written out as a netlist, reaches the maximum
+    lines = []
+    for line in BRIDGE.splitlines():
+        name = line.split()[0]
+        lines.append(f"{' '.join(line.split()[:3])} {values[name]!r}" if name in values else line)
+    netlist = tmp_path / 'corner.net'
+    netlist.write_text('\n'.join(lines) + '\n')
+    voltages = DCSolver(CircuitParser(str(netlist)).parse_compiled()).run_dc_analysis()
+    assert voltages['3'] == pytest.approx(result['max'][0])
+
+def test_sparse_corner_solves_match_dense(bridge, monkeypatch):
+    dense = bridge.run_corners('fractional', tolerance=0.05)
+    monkeypatch.setattr(DCSolver, 'SPARSE_THRESHOLD', 1)
+    sparse = bridge.run_corners('fractional', tolerance=0.05)
+    assert np.allclose(dense['min'], sparse['min']) and np.allclose(dense['max'], sparse['max'])
+
+def test_invalid_tolerances(bridge):
+    with pytest.raises(ValueError, match='unknown element'):
+        bridge.run_corners(tolerances={'R99': 0.1})
+    with pytest.raises(ValueError, match='low corner'):
+        bridge.run_corners(tolerances={'R1': 1.5})
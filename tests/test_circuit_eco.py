@@ -0,0 +1,128 @@
+import numpy as np
+import pytest
+from circuit_verification.circuit_analysis import CircuitAnalysis
+from circuit_verification.circuit_eco import IncrementalVerifier, diff_region
+from circuit_verification.circuit_parser import CircuitParser
+from circuit_verification.circuit_rules import Rule, RuleSet
+from circuit_verification.circuit_simulation import DCSolver, SolvedCircuit
+from circuit_verification.circuit_verifier import CircuitVerifier
+
+BRIDGE = """* bridge
+V1 1 0 5
+V2 5 0 2
+R1 1 2 1k
+R2 2 3 2k
+R3 3 0 1.5k
+R4 2 4 3k
+R5 4 5 1k
+R6 4 0 4k
+R7 3 4 500
+.END
+"""
+# A second, separate divider: edits to the bridge never move it
+DIVIDER = "V9 a 0 1\nRA a b 1k\nRB b 0 1k\n"
+
+RULES = RuleSet([Rule('bridge', quantity='voltage', select=['2', '3', '4'], max=2.0),
+                 Rule('power', quantity='power', select='R?', max=5e-3),
+                 Rule('load', quantity='source_current', select='V2', abs=True, max=1e-3),
+                 Rule('divider', quantity='voltage', select='b', min=0.45, max=0.55)])
+
+@pytest.fixture
+def netlist(tmp_path):
+    path = tmp_path / 'eco.net'
+    path.write_text(BRIDGE.replace('.END', DIVIDER + '.END'))
+    return path
+
+def edit(path, old, new):
+    path.write_text(path.read_text().replace(old, new))
+
+def assert_matches_fresh_run(eco, path):
+    compiled = CircuitParser(str(path)).parse_compiled()
+    reference = DCSolver(compiled).run_dc_analysis()
+    voltages = eco.node_voltages()
+    assert set(voltages) == set(reference)
+    assert all(voltages[node] == pytest.approx(reference[node], abs=1e-12) for node in reference)
+    checks = CircuitVerifier(compiled, reference, CircuitAnalysis(compiled).run_analysis()).verify()
+    assert {key: eco.verification[key] for key in checks} == checks
+    if eco.rules is None:
+        return
+    fresh = RULES.compile(compiled).evaluate(reference)
+    for name, entry in fresh.rules.items():
+        assert eco.rule_report.rules[name]['violations'] == entry['violations']
+        assert [v['element'] for v in eco.rule_report.rules[name]['first']] == [v['element'] for v in entry['first']]
+
+def test_diff_region():
+    old = "A 1\nB 2\nC 3\n"
+    assert diff_region(old, "A 1\nB 4\nC 3\n") == (4, 7, 7)
+    assert diff_region(old, "A 1\nC 3\n") == (4, 11, 7)
+    assert diff_region(old, old + "D 5\n") == (12, 12, 16)
+
+def test_value_edits_reuse_the_factorization(netlist):
+    eco = IncrementalVerifier(str(netlist), rules=RULES)
+    edit(netlist, 'R2 2 3 2k', 'R2 2 3 2.2k')
+    edit(netlist, 'V1 1 0 5', 'V1 1 0 DC 4.5')
+    result = eco.reverify()
+    assert result['mode'] == 'incremental' and result['values'] == ['R2', 'V1']
+    assert not result['refactorized'] and result['rank'] == 1 and eco.refactorizations == 1
+    assert_matches_fresh_run(eco, netlist)
+    # Only rules over the bridge are checked again
+    assert result['rules_checked'] == ['bridge', 'power', 'load']
+
+    edit(netlist, 'RB b 0 1k', 'RB b 0 1.5k')
+    result = eco.reverify()
+    assert result['changed_nodes'] == 1 and result['rules_checked'] == ['power', 'divider']
+    assert_matches_fresh_run(eco, netlist)
+    assert eco.reverify()['mode'] == 'unchanged'
+
+def test_topology_edits_match_a_fresh_parse(netlist):
+    eco = IncrementalVerifier(str(netlist), rules=RULES)
+    edit(netlist, 'R7 3 4 500\n', 'R7 3 4 500\nR8 2 0 10k\n')
+    result = eco.reverify()
+    assert result['added'] == ['R8'] and not result['refactorized']
+    assert_matches_fresh_run(eco, netlist)
+
+    # The branch at V2's pinned node is gone: its load is checked again
+    edit(netlist, 'R5 4 5 1k\n', '')
+    result = eco.reverify()
+    assert result['removed'] == ['R5'] and 'load' in result['rules_checked']
+    assert_matches_fresh_run(eco, netlist)
+
+    # New and vanished nodes refactorize
+    edit(netlist, 'R8 2 0 10k\n', 'R8 2 6 10k\nR9 6 0 1k\n')
+    assert eco.reverify()['refactorized']
+    assert_matches_fresh_run(eco, netlist)
+    edit(netlist, 'R8 2 6 10k\nR9 6 0 1k\n', '')
+    assert eco.reverify()['refactorized'] and '6' not in eco.node_voltages()
+    assert_matches_fresh_run(eco, netlist)
+
+    # Connecting the divider merges the components incrementally
+    edit(netlist, 'RB b 0 1k\n', 'RB b 0 1k\nRC b 3 1k\n')
+    eco.reverify()
+    assert eco.compiled.connectivity.component_count == 1
+    assert_matches_fresh_run(eco, netlist)
+
+def test_rank_limit_refactorizes(netlist, monkeypatch):
+    monkeypatch.setattr(SolvedCircuit, 'MAX_RANK', 2)
+    eco = IncrementalVerifier(str(netlist))
+    results = []
+    for line in ('R1 1 2 1k', 'R4 2 4 3k', 'R6 4 0 4k'):
+        edit(netlist, line, line.replace('k', '.1k'))
+        results.append(eco.reverify())
+    assert [r['refactorized'] for r in results] == [False, False, True]
+    assert results[-1]['rank'] == 0
+    assert_matches_fresh_run(eco, netlist)
+
+def test_unsupported_edits_fall_back_to_a_full_parse(tmp_path):
+    path = tmp_path / 'sub.net'
+    path.write_text(".SUBCKT DIV in out\nRA in out 1k\nRB out 0 1k\n.ENDS\n" + BRIDGE.replace('.END\n', 'X1 2 7 DIV\n.END\n'))
+    eco = IncrementalVerifier(str(path))
+    edit(path, 'RB out 0 1k', 'RB out 0 2k')
+    result = eco.reverify()
+    assert result['mode'] == 'rebuild' and 'SUBCKT' in result['reason']
+    edit(path, 'R1 1 2 1k', 'R1 1 2 1.2k')
+    assert eco.reverify()['mode'] == 'incremental'
+    edit(path, '\n.END\n', '\n.DC V1 0 5 1\n.END\n')
+    assert eco.reverify()['reason'] == "edited line '.DC'"
+    voltages = eco.node_voltages()
+    reference = DCSolver(CircuitParser(str(path)).parse_compiled()).run_dc_analysis()
+    assert np.allclose([voltages[n] for n in reference], list(reference.values()))
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from circuit_verification.circuit_parser import CircuitParser
+from circuit_verification.circuit_elements import Circuit, CompiledCircuit, Resistor, VoltageSource
+
+def test_compile_interns_nodes():
+    circuit = CircuitParser('examples/example_circuit.net').parse()
+    compiled = circuit.compile()
+
+    assert isinstance(compiled, CompiledCircuit)
+    assert compiled.node_names[0] == '0'
+    assert compiled.has_ground
+    assert compiled.get_all_nodes() == circuit.get_all_nodes()
+    assert compiled.res_node1.dtype == np.int32
+    assert compiled.conductances.tolist() == [1 / 1000.0, 1 / 2000.0]
+    assert compiled.element_index['R2'] == ('R', 1)
+    assert compiled.element_index['V1'] == ('V', 0)
+
+def test_compiled_views_behave_like_elements():
+    compiled = CircuitParser('examples/example_circuit.net').parse().compile()
+
+    resistors = compiled.get_resistors()
+    assert all(isinstance(r, Resistor) for r in resistors)
+    assert [(r.name, r.node1, r.node2, r.resistance) for r in resistors] == [
+        ('R1', '1', '2', 1000.0), ('R2', '2', '0', 2000.0)]
+    (source,) = compiled.get_voltage_sources()
+    assert isinstance(source, VoltageSource)
+    assert source.voltage == 5.0
+    with pytest.raises(AttributeError):
+        source.extra = 1
+
+def test_compile_without_ground():
+    circuit = Circuit()
+    circuit.add_element(Resistor('R1', 'a', 'b', 10.0))
+    compiled = circuit.compile()
+
+    assert not compiled.has_ground
+    assert compiled.node_count == 2
+    assert compiled.get_all_nodes() == {'a', 'b'}
+    assert len(compiled.to_circuit().elements) == 1
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from circuit_verification.circuit_parser import CircuitParser
+from circuit_verification.circuit_simulation import DCSolver
+from circuit_verification.circuit_hierarchy import SubcircuitDefinition, kron_reduce, reduce_subcircuit
+
+HIERARCHICAL = """* ladder of divider cells
+V1 in 0 5
+.SUBCKT CELL a b
+R1 a m 1k
+R2 m b 1k
+R3 m 0 2k
+.ENDS CELL
+X1 in n1 CELL
+X2 n1 n2 CELL
+.subckt PAIR p q
+X1 p mid CELL
+XB mid q CELL
+.ends
+XP n2 n4 PAIR
+RL n4 0 1k
+.END
+"""
+
+FLAT = """V1 in 0 5
+R1 in m1 1k
+R2 m1 n1 1k
+R3 m1 0 2k
+R4 n1 m2 1k
+R5 m2 n2 1k
+R6 m2 0 2k
+R7 n2 m3 1k
+R8 m3 n3 1k
+R9 m3 0 2k
+R10 n3 m4 1k
+R11 m4 n4 1k
+R12 m4 0 2k
+RL n4 0 1k
+.END
+"""
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+def test_kron_reduce_series_resistors():
+    # 1 ohm + 3 ohm in series between two ports, through internal node 2
+    G = np.array([[1.0, 0.0, -1.0], [0.0, 1 / 3, -1 / 3], [-1.0, -1 / 3, 4 / 3]])
+    reduced = kron_reduce(G, 2)
+    assert reduced == pytest.approx(np.array([[0.25, -0.25], [-0.25, 0.25]]))
+
+@pytest.mark.parametrize("chunk_size", [None, 24])
+def test_hierarchical_matches_flat(tmp_path, chunk_size):
+    hierarchical = CircuitParser(write(tmp_path, "h.net", HIERARCHICAL), chunk_size=chunk_size).parse_compiled()
+    flat = DCSolver(CircuitParser(write(tmp_path, "f.net", FLAT)).parse()).run_dc_analysis()
+
+    # Only the top-level nodes are assembled
+    assert sorted(hierarchical.get_all_nodes()) == ['0', 'in', 'n1', 'n2', 'n4']
+    assert hierarchical.instance_count == 3
+    voltages = DCSolver(hierarchical).run_dc_analysis()
+    for node, voltage in voltages.items():
+        assert voltage == pytest.approx(flat[node], abs=1e-12)
+    assert hierarchical.connectivity.is_connected
+
+def test_identical_definitions_share_a_reduction():
+    first, second = SubcircuitDefinition('A', ['x', 'y']), SubcircuitDefinition('B', ['p', 'q'])
+    first.add_resistor('R1', 'x', 'i', 100.0)
+    first.add_resistor('R2', 'i', 'y', 200.0)
+    second.add_resistor('RA', 'p', 'k', 100.0)
+    second.add_resistor('RB', 'k', 'q', 200.0)
+    definitions = {'A': first, 'B': second}
+
+    a, b = reduce_subcircuit('A', definitions), reduce_subcircuit('B', definitions)
+    assert a.digest == b.digest
+    assert a.matrix is b.matrix
+    assert a.matrix == pytest.approx(np.array([[1, -1], [-1, 1]]) / 300.0)
+
+def test_instances_survive_cache_and_round_trip(tmp_path):
+    path = write(tmp_path, "h.net", HIERARCHICAL)
+    expected = DCSolver(CircuitParser(path).parse_compiled()).run_dc_analysis()
+    CircuitParser(path, use_cache=True).parse_compiled()
+    parser = CircuitParser(path, use_cache=True)
+    cached = parser.parse_compiled()
+
+    assert parser.stats['source'] == 'cache'
+    assert [m.name for m in cached.port_models] == ['CELL', 'PAIR']
+    assert DCSolver(cached).run_dc_analysis() == pytest.approx(expected)
+    assert DCSolver(cached.to_circuit()).run_dc_analysis() == pytest.approx(expected)
+
+@pytest.mark.parametrize("text, message", [
+    ("V1 a 0 1\nX1 a 0 MISSING\n.END\n", "Unknown subcircuit"),
+    ("V1 a 0 1\n.SUBCKT C p q\nR1 p q 1\n.ENDS\nX1 a C\n.END\n", "1 nodes for 2 ports"),
+    ("V1 a 0 1\n.SUBCKT C p q\nR1 p q 1\nX1 a 0 C\n", "no .ENDS"),
+    ("V1 a 0 1\n.SUBCKT C p q\nV2 p q 1\n.ENDS\n.END\n", "only R and X"),
+    (".SUBCKT C p q\nX1 p q C\n.ENDS\nV1 a 0 1\nX1 a 0 C\n.END\n", "instantiates itself"),
+])
+def test_subcircuit_errors(tmp_path, text, message):
+    with pytest.raises(ValueError, match=message):
+        CircuitParser(write(tmp_path, "bad.net", text)).parse_compiled()
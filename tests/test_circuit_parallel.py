@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from circuit_verification.circuit_parser import CircuitParser
+from circuit_verification.circuit_analysis import CircuitAnalysis
+from circuit_verification.circuit_parallel import ParallelMonteCarlo
+
+def example_analysis():
+    return CircuitAnalysis(CircuitParser('examples/example_circuit.net').parse_compiled())
+
+def test_results_independent_of_worker_count():
+    analysis = example_analysis()
+    serial = ParallelMonteCarlo(analysis, workers=1, chunk_size=64).run(500, tolerance=0.05, seed=3)
+    parallel = ParallelMonteCarlo(analysis, workers=2, chunk_size=64).run(500, tolerance=0.05, seed=3)
+
+    assert np.array_equal(serial['voltages'], parallel['voltages'])
+    assert np.array_equal(serial['resistances'], parallel['resistances'])
+
+def test_chunks_stream_with_progress():
+    calls = []
+    mc = ParallelMonteCarlo(example_analysis(), workers=2, chunk_size=30,
+                            progress=lambda done, total: calls.append((done, total)))
+    chunks = list(mc.iter_chunks(100, tolerance=0.1, seed=0))
+
+    assert sorted((start, stop) for start, stop, _, _ in chunks) == [(0, 30), (30, 60), (60, 90), (90, 100)]
+    assert calls[-1] == (100, 100)
+    for _, _, voltages, resistances in chunks:
+        # Voltage divider: V2 = 5 * R2 / (R1 + R2)
+        expected = 5.0 * resistances[:, 1] / resistances.sum(axis=1)
+        assert voltages[:, 1] == pytest.approx(expected)
+
+def test_unseeded_run_is_reproducible_from_entropy():
+    mc = ParallelMonteCarlo(example_analysis(), workers=1, chunk_size=10)
+    first = mc.run(25)
+    again = mc.run(25, seed=mc.entropy)
+    assert np.array_equal(first['voltages'], again['voltages'])
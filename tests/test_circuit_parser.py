@@ -1,7 +1,66 @@
 import pytest
-from circuit_verification.circuit_parser import CircuitParser
+from circuit_verification.circuit_parser import CircuitParser, parse_value
 
 def test_circuit_parser():
     parser = CircuitParser('examples/example_circuit.net')
     circuit = parser.parse()
     assert len(circuit.elements) == 3, "Should have 1 voltage source and 2 resistors."
+
+def test_parse_value_suffixes():
+    assert parse_value('1000') == 1000.0
+    assert parse_value('4.7k') == pytest.approx(4700.0)
+    assert parse_value('2MEG') == pytest.approx(2e6)
+    assert parse_value('3m') == pytest.approx(3e-3)
+    assert parse_value('10u') == pytest.approx(1e-5)
+    assert parse_value('5n') == pytest.approx(5e-9)
+    assert parse_value('1kOhm') == pytest.approx(1000.0)
+    with pytest.raises(ValueError):
+        parse_value('abc')
+
+NETLIST = """* header comment
+V1 in 0
++ DC 5
+R1 in mid 1k
+Rload mid 0
+* comment between a line and its continuation
++ 2k
+C1 mid 0 1u
+C2 mid 0 1u
+.TRAN 1n 1u
+.END
+R99 in 0 1
+"""
+
+@pytest.mark.parametrize("chunk_size", [None, 7, 16])
+def test_parse_compiled_continuations_and_suffixes(tmp_path, capsys, chunk_size):
+    path = tmp_path / 'netlist.net'
+    path.write_text(NETLIST)
+
+    parser = CircuitParser(str(path), chunk_size=chunk_size)
+    compiled = parser.parse_compiled()
+
+    assert compiled.res_names == ['R1', 'RLOAD']
+    assert compiled.resistances.tolist() == [1000.0, 2000.0]
+    assert compiled.vs_names == ['V1']
+    assert compiled.voltages.tolist() == [5.0]
+    assert compiled.get_all_nodes() == {'in', 'mid', '0'}
+    assert parser.stats['elements'] == 3
+    assert parser.stats['mb_per_s'] > 0
+
+    # One summary line per unsupported kind, not one per line
+    out = capsys.readouterr().out
+    assert "Skipping 2 unsupported line(s) of type 'C'" in out
+    assert "type '.TRAN'" in out
+
+def test_parse_malformed_line_raises(tmp_path):
+    path = tmp_path / 'bad.net'
+    path.write_text("R1 1 2\n")
+    with pytest.raises(ValueError):
+        CircuitParser(str(path)).parse_compiled()
+
+def test_parse_misaligned_resistor_lines_raise(tmp_path):
+    # 5 + 3 tokens add up to two 4-token lines: must not shift the columns
+    path = tmp_path / 'bad.net'
+    path.write_text("V1 1 0 5\nR1 1 2 1k 5\nR2 2 0\n.END\n")
+    with pytest.raises(ValueError, match="cannot parse 'R2 2 0'"):
+        CircuitParser(str(path)).parse_compiled()
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from circuit_verification.circuit_elements import CircuitBuilder
+from circuit_verification.circuit_parser import CircuitParser
+from circuit_verification.circuit_partition import PartitionedSolver, partition_nodes
+from circuit_verification.circuit_simulation import DCSolver
+
+def mesh(n, floating=False):
+    """ n x n resistor mesh with two corner sources and loads to ground (none if floating). """
+    rng = np.random.default_rng(1)
+    builder = CircuitBuilder()
+    builder.add_voltage_source('V1', 'n0_0', '0', 1.0)
+    builder.add_voltage_source('V2', f'n{n - 1}_{n - 1}', '0', 2.0)
+    a, b = [], []
+    for i in range(n):
+        for j in range(n):
+            if j + 1 < n:
+                a.append(f'n{i}_{j}'), b.append(f'n{i}_{j + 1}')
+            if i + 1 < n:
+                a.append(f'n{i}_{j}'), b.append(f'n{i + 1}_{j}')
+            if not floating and (i * n + j) % 5 == 0:
+                a.append(f'n{i}_{j}'), b.append('0')
+    builder.add_resistors([f'R{k}' for k in range(len(a))], a, b, rng.uniform(1, 10, len(a)))
+    if floating:
+        builder.add_resistor('RF', 'island1', 'island2', 5.0)
+    return builder.build()
+
+def test_partition_separates_parts():
+    G, _ = DCSolver(mesh(30), method='sparse').assemble()
+    labels = partition_nodes(G, 4)
+    assert set(labels.tolist()) == {-1, 0, 1, 2, 3}
+    sizes = np.bincount(labels[labels >= 0])
+    assert sizes.min() > 0.8 * sizes.max()
+    assert (labels < 0).sum() < 4 * 30
+    rows, cols = sp.coo_matrix(G).nonzero()
+    inside = (labels[rows] >= 0) & (labels[cols] >= 0)
+    assert (labels[rows][inside] == labels[cols][inside]).all()
+
+@pytest.mark.parametrize("parts, workers", [(1, 0), (4, 0), (5, 2)])
+def test_partitioned_solve_matches_monolithic(parts, workers):
+    circuit = mesh(25)
+    expected = DCSolver(circuit, method='sparse').run_dc_analysis()
+    solver = PartitionedSolver(circuit, parts=parts, workers=workers)
+    result = solver.run_dc_analysis()
+    assert list(result) == list(expected)
+    assert all(result[node] == pytest.approx(expected[node], abs=1e-10) for node in expected)
+    assert sum(solver.partition_info['part_sizes']) + solver.partition_info['separator'] == 25 * 25
+
+def test_partitioned_solve_with_subcircuits_and_sweeps(tmp_path):
+    netlist = tmp_path / 'cells.net'
+    netlist.write_text("V1 in 0 5\n.SUBCKT CELL a b\nR1 a m 1k\nR2 m b 1k\nR3 m 0 2k\n.ENDS\n"
+                       + "".join(f"X{k} n{k} n{k + 1} CELL\n" for k in range(12))
+                       + "R0 in n0 10\nRL n12 0 1k\n.DC V1 0 5 5\n.END\n")
+    circuit = CircuitParser(str(netlist), use_cache=False).parse_compiled()
+    expected = DCSolver(circuit).run_dc_analysis()
+    solver = PartitionedSolver(circuit, parts=3, workers=0)
+    result = solver.run_dc_analysis()
+    assert all(result[node] == pytest.approx(expected[node], abs=1e-12) for node in expected)
+    sweep = solver.run_dc_sweep('V1', [0.0, 5.0])
+    assert np.allclose(sweep['voltages'][1], [expected[node] for node in sweep['nodes']])
+
+def test_singular_circuit_raises_from_workers():
+    with pytest.raises(np.linalg.LinAlgError):
+        PartitionedSolver(mesh(6, floating=True), parts=2, workers=2).run_dc_analysis()
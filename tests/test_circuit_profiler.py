@@ -0,0 +1,87 @@
+import json
+import sys
+import threading
+import numpy as np
+import pytest
+from circuit_verification import circuit_profiler
+from circuit_verification.circuit_profiler import Profiler
+from circuit_verification.circuit_parser import CircuitParser
+from circuit_verification.circuit_simulation import DCSolver
+from circuit_verification.circuit_analysis import CircuitAnalysis
+
+DIVIDER = "V1 1 0 5\nR1 1 2 1k\nR2 2 0 1k\nR3 2 3 2k\nR4 3 0 4k\n.END\n"
+
+def test_disabled_profiling_records_nothing():
+    assert not circuit_profiler.enabled()
+    with circuit_profiler.span('stage', size=3) as span:
+        span.set(more=1)
+    circuit_profiler.count('nodes', 3)
+    assert circuit_profiler.span('a') is circuit_profiler.span('b')
+
+def test_profiling_without_resource_module(monkeypatch):
+    # Windows has no resource module: memory reads as 0 instead of failing
+    monkeypatch.setitem(sys.modules, 'resource', None)
+    with Profiler() as profiler:
+        with circuit_profiler.span('stage'):
+            pass
+    assert profiler.summary()['stage']['max_rss_mb'] == 0.0
+
+def test_nested_spans_counters_and_chrome_trace(tmp_path):
+    with Profiler() as profiler:
+        assert circuit_profiler.enabled()
+        with circuit_profiler.span('outer', netlist='x.net'):
+            for _ in range(2):
+                with circuit_profiler.span('outer.inner') as span:
+                    span.set(rows=5)
+            circuit_profiler.count('samples', 10)
+        thread = threading.Thread(target=lambda: circuit_profiler.span('worker').__enter__().__exit__())
+        thread.start()
+        thread.join()
+    assert not circuit_profiler.enabled()
+
+    summary = profiler.summary()
+    assert list(summary) == ['outer', 'outer.inner', 'worker']
+    assert summary['outer.inner']['calls'] == 2
+    assert summary['outer']['seconds'] >= summary['outer.inner']['seconds']
+    depths = {event['name']: event['depth'] for event in profiler.to_json()['events']}
+    assert depths == {'outer': 0, 'outer.inner': 1, 'worker': 0}
+
+    path = tmp_path / 'trace.json'
+    profiler.save(str(path))
+    trace = json.loads(path.read_text())['traceEvents']
+    spans = [e for e in trace if e['ph'] == 'X']
+    assert len(spans) == 4 and all(e['dur'] >= 0 for e in spans)
+    assert [e['args']['rows'] for e in spans if e['name'] == 'outer.inner'] == [5, 5]
+    assert [(e['name'], e['args']['value']) for e in trace if e['ph'] == 'C'] == [('samples', 10)]
+
+    profiler.save(str(path), format='json')
+    assert json.loads(path.read_text())['counters'] == {'samples': 10}
+
+def test_pipeline_stages_are_instrumented(tmp_path):
+    netlist = tmp_path / 'div.net'
+    netlist.write_text(DIVIDER)
+    with Profiler() as profiler:
+        compiled = CircuitParser(str(netlist)).parse_compiled()
+        solver = DCSolver(compiled, method='dense')
+        solver.run_dc_analysis()
+        CircuitAnalysis(compiled).run_analysis()
+        CircuitAnalysis(compiled).run_monte_carlo(runs=20, seed=1)
+
+    names = set(profiler.summary())
+    assert {'parse', 'parse.block', 'stamp', 'factorize', 'solve', 'connectivity',
+            'monte_carlo', 'monte_carlo.solve'} <= names
+    counters = profiler.counters
+    assert counters['nodes'] == 4 and counters['elements'] == 5 and counters['mc_samples'] == 20
+    G, _ = solver.assemble()
+    assert counters['G_nnz'] == np.count_nonzero(G)
+    assert counters['condition_estimate'] == pytest.approx(np.linalg.cond(G, 1), rel=0.1)
+
+def test_cg_iterations_counted():
+    from circuit_verification.circuit_elements import CircuitBuilder
+    builder = CircuitBuilder()
+    builder.add_voltage_source('V1', '1', '0', 1.0)
+    builder.add_resistors(['R1', 'R2', 'R3'], ['1', '2', '3'], ['2', '3', '0'], np.array([1.0, 2.0, 3.0]))
+    with Profiler() as profiler:
+        DCSolver(builder.build(), method='cg').run_dc_analysis()
+    assert profiler.counters['cg_iterations'] >= 1
+    assert 'solve.cg' in profiler.summary()
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+from circuit_verification.circuit_elements import CircuitBuilder
+from circuit_verification.circuit_parser import CircuitParser
+from circuit_verification.circuit_reduction import CircuitReduction
+from circuit_verification.circuit_simulation import DCSolver
+
+def extracted_network():
+    """ Series chains, parallel bundles, a dangling tree and two sources at 5 V around a loop. """
+    rng = np.random.default_rng(0)
+    builder = CircuitBuilder()
+    builder.add_voltage_source('V1', '1', '0', 5.0)
+    builder.add_voltage_source('V2', '9', '0', 5.0)
+    builder.add_voltage_source('V3', '8', '0', 2.0)
+    a = [str(i) for i in range(1, 40)] + ['40', '1', '9', '9', '20', 't1', 't1', '30', '8', '12', '12']
+    b = [str(i) for i in range(2, 41)] + ['0', '9', '5', '5', 't1', 't2', 't3', '8', '9', '33', '33']
+    builder.add_resistors([f'R{k}' for k in range(len(a))], a, b, rng.uniform(1, 100, len(a)))
+    return builder.build()
+
+def test_reduced_solution_matches_full_solve():
+    circuit = extracted_network()
+    full = DCSolver(circuit, method='dense').run_dc_analysis()
+    reduction = CircuitReduction(circuit)
+    assert len(reduction.compiled.node_names) - 1 <= 5
+    assert reduction.stats['merged_constants'] == 1   # V2's node joins V1's
+
+    reduced = DCSolver(reduction.compiled, method='dense').run_dc_analysis()
+    recovered = reduction.node_voltages(reduced)
+    assert list(recovered) == list(full)
+    assert all(recovered[node] == pytest.approx(full[node], abs=1e-12) for node in full)
+    assert reduction.node_voltage('t3', reduced) == pytest.approx(full['t3'], abs=1e-12)
+    assert reduction.node_voltage('9', reduced) == 5.0
+
+def test_ladder_collapses_and_keep_nodes_survive():
+    builder = CircuitBuilder()
+    builder.add_voltage_source('V1', 'n0', '0', 1.0)
+    sections = 200
+    builder.add_resistors([f'RS{k}' for k in range(sections)], [f'n{k}' for k in range(sections)],
+                          [f'n{k + 1}' for k in range(sections)], np.full(sections, 100.0))
+    builder.add_resistors([f'RP{k}' for k in range(sections)], [f'n{k + 1}' for k in range(sections)],
+                          ['0'] * sections, np.full(sections, 10e3))
+    circuit = builder.build()
+    assert CircuitReduction(circuit).compiled.node_names == ['0', 'n0']
+
+    # Only the open end beyond a kept node folds up
+    reduction = CircuitReduction(circuit, keep=['n150'])
+    assert reduction.compiled.node_names == ['0'] + [f'n{k}' for k in range(151)]
+    reduced = DCSolver(reduction.compiled, method='sparse').run_dc_analysis()
+    x = np.array([reduced[node] for node in reduction.compiled.node_names[1:]])
+    batch = reduction.expand(np.vstack([x, 2 * x]))
+    full = DCSolver(circuit, method='sparse').run_dc_analysis()
+    assert np.allclose(batch[0], [full[node] for node in DCSolver(circuit).node_list])
+    assert np.allclose(batch[1], 2 * batch[0])
+    with pytest.raises(ValueError, match='Unknown node'):
+        CircuitReduction(circuit, keep=['nowhere'])
+
+def test_swept_sources_and_subcircuit_ports_are_kept(tmp_path):
+    netlist = tmp_path / 'cells.net'
+    netlist.write_text("V1 in 0 5\nV2 ref 0 5\n.SUBCKT CELL a b\nR1 a m 1k\nR2 m b 1k\nR3 m 0 2k\n.ENDS\n"
+                       "R1 in x 1k\nR2 x y 1k\nX1 y out CELL\nR3 out ref 3k\n.DC V1 0 5 1\n.END\n")
+    circuit = CircuitParser(str(netlist), use_cache=False).parse_compiled()
+    reduction = CircuitReduction(circuit)
+    assert reduction.stats['merged_constants'] == 0
+    assert set(reduction.compiled.node_names) == {'0', 'in', 'ref', 'y', 'out'}
+
+    solver = DCSolver(reduction.compiled, method='dense')
+    sweep = solver.run_dc_sweep('V1', [0.0, 5.0])
+    expected = DCSolver(circuit, method='dense').run_dc_sweep('V1', [0.0, 5.0])
+    assert np.allclose(reduction.expand(sweep['voltages']), expected['voltages'])
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from circuit_verification.circuit_results import ResultDataset, ResultStore
+from circuit_verification.circuit_parallel import ParallelMonteCarlo
+from circuit_verification.circuit_analysis import CircuitAnalysis
+from circuit_verification.circuit_parser import CircuitParser
+
+def test_append_and_query(tmp_path):
+    store = ResultStore(str(tmp_path / 'store'))
+    data = store.dataset('mc', {'voltages': ['a', 'b', 'c'], 'resistances': ['R1']})
+    rng = np.random.default_rng(0)
+    voltages, resistances = rng.random((250, 3)), rng.random((250, 1))
+    # Chunks appended out of run order come back in run order
+    data.append(100, voltages=voltages[100:], resistances=resistances[100:])
+    data.append(0, voltages=voltages[:100], resistances=resistances[:100])
+    assert data.runs == 250 and data.next_run == 250
+
+    reopened = store['mc']
+    runs, values = reopened.read()
+    assert np.array_equal(runs, np.arange(250)) and np.array_equal(values, voltages)
+    runs, values = reopened.read(columns=['c', 'a'], start=90, stop=110)
+    assert np.array_equal(runs, np.arange(90, 110)) and np.array_equal(values, voltages[90:110][:, [2, 0]])
+    assert np.array_equal(reopened.column('R1', 'resistances'), resistances[:, 0])
+
+    runs, values = reopened.query(columns=['b'], where={'a': (0.2, 0.5), 'c': (None, 0.5)})
+    expected = np.flatnonzero((voltages[:, 0] >= 0.2) & (voltages[:, 0] <= 0.5) & (voltages[:, 2] <= 0.5))
+    assert np.array_equal(runs, expected) and np.array_equal(values[:, 0], voltages[expected, 1])
+    runs, _ = reopened.query(where=lambda columns: columns['R1'] > 0.9, where_group='resistances', start=50)
+    assert np.array_equal(runs, 50 + np.flatnonzero(resistances[50:, 0] > 0.9))
+    # Each column of a chunk is contiguous on disk
+    assert reopened.chunk('voltages', 0).flags['C_CONTIGUOUS']
+    assert reopened.chunk('voltages', 0).shape == (3, 150)
+
+    assert store.datasets() == ['mc']
+    with pytest.raises(ValueError, match='different columns'):
+        store.dataset('mc', {'voltages': ['a', 'b']})
+    with pytest.raises(KeyError):
+        reopened.read(columns=['missing'])
+
+def test_interrupted_append_is_ignored(tmp_path):
+    data = ResultDataset.create(str(tmp_path / 'dc'), {'voltages': ['n1', 'n2']})
+    data.append(voltages=[[1.0, 2.0]])
+    # A torn append: data bytes and half a chunk record, but no full record
+    with open(tmp_path / 'dc' / 'voltages.f64', 'ab') as f:
+        f.write(np.zeros(6).tobytes())
+    with open(tmp_path / 'dc' / 'chunks.i64', 'ab') as f:
+        f.write(np.array([1], dtype='<i8').tobytes())
+    data = ResultDataset(str(tmp_path / 'dc'))
+    assert data.runs == 1
+    data.append(voltages=[[3.0, 4.0]])
+    assert np.array_equal(ResultDataset(str(tmp_path / 'dc')).read()[1], [[1.0, 2.0], [3.0, 4.0]])
+
+def test_monte_carlo_chunks_go_to_store(tmp_path):
+    netlist = tmp_path / 'div.net'
+    netlist.write_text("V1 1 0 5\nR1 1 2 1k\nR2 2 3 1k\nR3 3 0 2k\n.END\n")
+    analysis = CircuitAnalysis(CircuitParser(str(netlist)).parse_compiled())
+    compiled = analysis.compiled
+    data = ResultStore(str(tmp_path / 'store')).dataset(
+        'monte_carlo', {'voltages': compiled.node_names[1:], 'resistances': compiled.res_names})
+    for _ in range(2):
+        analysis.run_monte_carlo_stats(runs=2500, seed=4, chunk_size=1000, store=data)
+    batch = ParallelMonteCarlo(analysis, workers=0, chunk_size=1000).run(2500, seed=4)
+
+    assert data.runs == 5000
+    runs, voltages = data.read(stop=2500)
+    assert np.array_equal(voltages, batch['voltages'])
+    assert np.array_equal(data.read('resistances', start=2500)[1], batch['resistances'])
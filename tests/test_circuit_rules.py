@@ -0,0 +1,117 @@
+import json
+import numpy as np
+import pytest
+from circuit_verification import circuit_rules
+from circuit_verification.circuit_analysis import CircuitAnalysis
+from circuit_verification.circuit_parser import CircuitParser
+from circuit_verification.circuit_rules import Rule, RuleSet
+from circuit_verification.circuit_simulation import DCSolver
+from circuit_verification.circuit_verifier import CircuitVerifier
+
+# V1 drives 5 V into 1k + 1k to ground: 2.5 mA, 6.25 mW per resistor
+DIVIDER = "V1 in 0 5\nR1 in out 1k\nR2 out 0 1k\n.END\n"
+
+@pytest.fixture
+def divider(tmp_path):
+    netlist = tmp_path / 'div.net'
+    netlist.write_text(DIVIDER)
+    return CircuitParser(str(netlist)).parse_compiled()
+
+def rules(*specs):
+    return RuleSet([Rule(**spec) for spec in specs])
+
+def test_quantities_on_the_nominal_solution(divider):
+    engine = rules(
+        {'name': 'window', 'quantity': 'voltage', 'select': 'out', 'min': 2.4, 'max': 2.6},
+        {'name': 'current', 'quantity': 'current', 'abs': True, 'max': 2.4e-3},
+        {'name': 'power', 'quantity': 'power', 'select': ['R*'], 'max': 7e-3},
+        {'name': 'load', 'quantity': 'source_current', 'min': 2.6e-3},
+        {'name': 'source_power', 'quantity': 'source_power', 'max': 12.5e-3 + 1e-9},
+        {'name': 'ratio', 'expr': "V('out') / V('in')", 'min': 0.49, 'max': 0.51},
+    ).compile(divider)
+    report = engine.evaluate(DCSolver(divider).run_dc_analysis())
+    assert report.failed() == ['current', 'load']
+    first = report.rules['current']['first']
+    assert [v['element'] for v in first] == ['R1', 'R2'] and first[0]['value'] == pytest.approx(2.5e-3)
+    assert report.rules['load']['first'][0] == {'sample': 0, 'element': 'V1', 'value': pytest.approx(2.5e-3)}
+
+def test_batches_exit_early_per_rule(divider, monkeypatch):
+    monkeypatch.setattr(circuit_rules, 'BLOCK_ROWS', 100)
+    engine = rules({'name': 'window', 'quantity': 'voltage', 'select': 'out', 'min': 2.45, 'max': 2.55},
+                   {'name': 'loose', 'quantity': 'voltage', 'min': 0.0, 'max': 5.0}).compile(divider)
+    batch = CircuitAnalysis(divider).run_monte_carlo_batch(runs=1000, tolerance=0.05, seed=0)
+    column = batch['nodes'].index('out')
+    outside = np.flatnonzero(np.abs(batch['voltages'][:, column] - 2.5) > 0.05)
+
+    report = engine.evaluate(batch['voltages'], batch['resistances'], first_sample=1000)
+    entry = report.rules['window']
+    assert entry['first'][0]['sample'] == 1000 + outside[0]
+    assert entry['checked'] == 100 * (outside[0] // 100 + 1) and not entry['complete']
+    assert report.rules['loose'] == {'passed': True, 'violations': 0, 'checked': 1000, 'complete': True,
+                                     'first': []}
+
+    full = engine.evaluate(batch['voltages'], batch['resistances'], early_exit=False)
+    assert full.rules['window']['violations'] == len(outside) and full.rules['window']['complete']
+
+def test_reports_accumulate_monte_carlo_chunks(divider):
+    engine = rules({'name': 'window', 'quantity': 'voltage', 'select': 'out',
+                    'min': 2.45, 'max': 2.55}).compile(divider)
+    report = engine.report(early_exit=False)
+    analysis = CircuitAnalysis(divider)
+    analysis.run_monte_carlo_stats(runs=3000, tolerance=0.05, seed=1, chunk_size=1000, rules=report)
+    entry = report.rules['window']
+    assert entry['checked'] == 3000 and 0 < entry['violations'] < 3000
+    assert len(entry['first']) == circuit_rules.MAX_REPORTS
+
+    corners = engine.report(early_exit=False)
+    analysis.run_corners('full', tolerance=0.05, rules=corners)
+    assert corners.rules['window']['checked'] == 4 and corners.rules['window']['violations'] == 2
+
+def test_verifier_checks_rules_from_a_file(divider, tmp_path):
+    path = tmp_path / 'rules.json'
+    path.write_text(json.dumps({'rules': [{'name': 'out', 'quantity': 'voltage', 'select': 'out', 'max': 2.0}]}))
+    node_voltages = DCSolver(divider).run_dc_analysis()
+    verifier = CircuitVerifier(divider, node_voltages, CircuitAnalysis(divider).run_analysis(), rules=str(path))
+    checks = verifier.verify()
+    assert checks['rules_passed'] is False
+    assert verifier.rule_report.summary()['out']['first'] == [{'sample': 0, 'element': 'out', 'value': 2.5}]
+
+def test_invalid_rules(divider, capsys):
+    with pytest.raises(ValueError, match="unknown quantity"):
+        Rule('bad', quantity='temperature', max=1)
+    with pytest.raises(ValueError, match="min' and/or 'max"):
+        Rule('bad', quantity='voltage')
+    with pytest.raises(ValueError, match="unknown field"):
+        Rule.from_dict({'quantity': 'voltage', 'max': 1, 'maximum': 2}, 'rule0')
+    with pytest.raises(ValueError, match="Duplicate"):
+        rules({'name': 'a', 'quantity': 'voltage', 'max': 1}, {'name': 'a', 'quantity': 'power', 'max': 1})
+    with pytest.raises(ValueError, match="no node named 'missing'"):
+        rules({'name': 'expr', 'expr': "V('missing')", 'max': 1}).compile(divider)
+    rules({'name': 'none', 'quantity': 'power', 'select': 'Q*', 'max': 1}).compile(divider)
+    assert "selects no resistor" in capsys.readouterr().out
+
+def test_expressions_are_restricted(divider):
+    engine = rules({'name': 'ok', 'expr': "(maximum(abs(V('out') - 2.5), -I('R1')) < 1) | ~(P('R2') > 1)",
+                    'min': 1},
+                   {'name': 'window', 'expr': "where((V('out') > 2.45) & (V('out') < 2.55), 0, 1)",
+                    'max': 0}).compile(divider)
+    assert engine.evaluate(DCSolver(divider).run_dc_analysis()).failed() == []
+    # Elementwise over a block of samples, where 'and'/'or' would need one truth value
+    batch = CircuitAnalysis(divider).run_monte_carlo_batch(runs=200, tolerance=0.1, seed=0)
+    outside = np.abs(batch['voltages'][:, batch['nodes'].index('out')] - 2.5) >= 0.05
+    report = engine.evaluate(batch['voltages'], batch['resistances'])
+    assert report.rules['ok']['violations'] == 0
+    assert report.rules['window']['violations'] == outside.sum() > 0
+    for expr in ("V('out') < 2.6 or V('out') > 3", "not V('out') > 3", "2.4 < V('out') < 2.6"):
+        with pytest.raises(ValueError, match="chained comparisons"):
+            rules({'name': 'bad', 'expr': expr, 'max': 1}).compile(divider)
+    for expr, message in (("V.__globals__", "Attribute"),
+                          ("().__class__.__bases__[0]", "Subscript"),
+                          ("[V][0]('out')", "Subscript"),
+                          ("(lambda: 1)()", "Lambda"),
+                          ("open('x')", "unknown name 'open'"),
+                          ("where(V('out'), x=1)", "keyword"),
+                          ("V('out')('in')", "only calls of"),
+                          ("V('out') +", "invalid expression")):
+        with pytest.raises(ValueError, match=message):
+            rules({'name': 'bad', 'expr': expr, 'max': 1}).compile(divider)
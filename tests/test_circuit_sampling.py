@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from scipy.optimize import brentq
+from scipy.special import ndtr
+from circuit_verification.circuit_sampling import tolerance_factors, wilson_interval
+from circuit_verification.circuit_analysis import CircuitAnalysis
+from circuit_verification.circuit_parser import CircuitParser
+
+SIGMA = 0.05 / 3
+
+def divider_failure(high):
+    """ Exact P(V2 > high) of a 5 V divider of two equal resistors with normal 5% (3 sigma) tolerances. """
+    c = high / (5.0 - high)
+    return 1.0 - ndtr((c - 1.0) / (SIGMA * np.sqrt(1.0 + c * c)))
+
+@pytest.fixture
+def divider(tmp_path):
+    netlist = tmp_path / 'div.net'
+    netlist.write_text("V1 1 0 5\nR1 1 2 1k\nR2 2 0 1k\n.END\n")
+    return CircuitAnalysis(CircuitParser(str(netlist)).parse_compiled())
+
+def test_samplers_and_distributions_stay_in_tolerance():
+    for sampler in ('random', 'lhs', 'sobol'):
+        factors = tolerance_factors(256, 3, 0.05, sampler, 'uniform', seed=0)
+        assert factors.shape == (256, 3) and (np.abs(factors - 1) <= 0.05).all()
+    lhs = tolerance_factors(100, 2, 0.05, 'lhs', 'uniform', seed=0)
+    # One sample in each of the 100 strata per dimension
+    strata = np.floor((lhs - 0.95) / 0.1 * 100).astype(int)
+    assert all(sorted(strata[:, k]) == list(range(100)) for k in range(2))
+    truncated = tolerance_factors(5000, 2, 0.05, 'random', 'truncnormal', seed=0)
+    assert (np.abs(truncated - 1) <= 0.05).all()
+    assert np.std(tolerance_factors(20000, 1, 0.05, 'sobol', 'normal', seed=0)) == pytest.approx(SIGMA, rel=0.02)
+    with pytest.raises(ValueError, match='Unknown sampler'):
+        tolerance_factors(10, 1, sampler='grid')
+
+def test_wilson_interval_at_zero_failures():
+    low, high = wilson_interval(0, 1000)
+    assert low == pytest.approx(0.0, abs=1e-12) and 0.0 < high < 0.005
+
+def test_yield_samplers_agree_with_exact_probability(divider):
+    high = 2.56
+    exact = divider_failure(high)
+    for sampler in ('random', 'lhs', 'sobol', 'importance'):
+        result = divider.estimate_yield({'2': (None, high)}, runs=4096, sampler=sampler,
+                                        distribution='normal', seed=3)
+        low_ci, high_ci = result['failure_ci']
+        assert low_ci <= exact <= high_ci, sampler
+        assert result['yield'] == pytest.approx(1 - result['failure_probability'])
+
+def test_importance_sampling_resolves_ppm_failures(divider):
+    high = brentq(lambda h: divider_failure(h) - 1e-6, 2.5, 3.0)
+    result = divider.estimate_yield({'2': (None, high)}, runs=2000, sampler='importance',
+                                    distribution='normal', seed=0)
+    assert result['solves'] <= 2000
+    assert result['failure_probability'] == pytest.approx(1e-6, rel=0.2)
+    assert result['failure_ci'][0] <= 1e-6 <= result['failure_ci'][1]
+    assert result['shift'] == pytest.approx(4.75, abs=0.5)
+
+def test_failure_ci_keeps_an_upper_bound_without_failures(divider):
+    # 4 V is tens of sigma away: no sample fails, not even while exploring
+    for sampler in ('random', 'sobol', 'importance'):
+        result = divider.estimate_yield({'2': (None, 4.0)}, runs=1024, sampler=sampler,
+                                        distribution='normal', seed=0)
+        low_ci, high_ci = result['failure_ci']
+        assert result['failure_probability'] == 0.0 and low_ci == pytest.approx(0.0, abs=1e-12), sampler
+        assert 0.0 < high_ci < 0.01 and result['yield_ci'][0] < 1.0, sampler
+
+def test_monte_carlo_batch_accepts_sampler(divider):
+    batch = divider.run_monte_carlo_batch(runs=64, seed=1, sampler='sobol', distribution='truncnormal')
+    assert batch['voltages'].shape == (64, 2)
+    assert np.allclose(batch['voltages'][:, 0], 5.0)
@@ -0,0 +1,105 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import pytest
+from circuit_verification.circuit_parser import CircuitParser
+from circuit_verification.circuit_server import (CircuitCache, CircuitSession, VerificationClient,
+                                                 VerificationServer)
+
+DIVIDER = "V1 1 0 5\nR1 1 2 1k\nR2 2 0 1k\n.END\n"
+
+@pytest.fixture
+def server():
+    # Unix socket paths are limited to ~100 characters, so not under tmp_path
+    directory = tempfile.mkdtemp(prefix='cv')
+    server = VerificationServer(os.path.join(directory, 's'), workers=4, use_cache=False)
+    ready = threading.Event()
+
+    async def run():
+        await server.start()
+        ready.set()
+        await server.serve_forever()
+
+    thread = threading.Thread(target=asyncio.run, args=(run(),), daemon=True)
+    thread.start()
+    assert ready.wait(10)
+    yield server
+    with VerificationClient(server.socket_path) as client:
+        client.request('shutdown')
+    thread.join(10)
+    assert not os.path.exists(server.socket_path)
+    os.rmdir(directory)
+
+def test_requests_are_answered_and_cached(server, tmp_path):
+    netlist = tmp_path / 'div.net'
+    netlist.write_text(DIVIDER)
+    with VerificationClient(server.socket_path) as client:
+        assert client.request('parse', str(netlist))['resistors'] == 2
+        assert client.request('solve', str(netlist), nodes=['2']) == {'node_voltages': {'2': 2.5}}
+        assert client.last_reply['cached'] is False
+        assert client.request('solve', str(netlist), nodes=['2']) == {'node_voltages': {'2': 2.5}}
+        assert client.last_reply['cached'] is True
+
+        assert client.request('verify', str(netlist))['passed'] is True
+        assert client.request('analyze', str(netlist))['is_connected'] is True
+        mc = client.request('monte_carlo', str(netlist), runs=50, seed=1, nodes=['2'])
+        assert mc['runs'] == 50 and 2.3 < mc['nodes']['2']['mean'] < 2.7
+
+        stats = client.request('stats')
+        assert stats['entries'] == 1 and stats['misses'] == 1
+
+def test_edited_netlist_is_reparsed(server, tmp_path):
+    netlist = tmp_path / 'div.net'
+    netlist.write_text(DIVIDER)
+    with VerificationClient(server.socket_path) as client:
+        assert client.request('solve', str(netlist))['node_voltages']['2'] == pytest.approx(2.5)
+        mtime = netlist.stat().st_mtime_ns
+        netlist.write_text(DIVIDER.replace('R2 2 0 1k', 'R2 2 0 3k'))  # same size
+        os.utime(netlist, ns=(mtime + 10**9, mtime + 10**9))
+        assert client.request('solve', str(netlist))['node_voltages']['2'] == pytest.approx(3.75)
+        assert client.last_reply['cached'] is False
+
+def test_errors_are_replies(server, tmp_path):
+    with VerificationClient(server.socket_path) as client:
+        with pytest.raises(RuntimeError, match='FileNotFoundError'):
+            client.request('solve', str(tmp_path / 'missing.net'))
+        with pytest.raises(RuntimeError, match='Unknown op'):
+            client.request('transient', str(tmp_path / 'missing.net'))
+        assert client.request('ping') == 'pong'
+
+def test_slow_request_does_not_block_other_clients(server, tmp_path):
+    netlist = tmp_path / 'div.net'
+    netlist.write_text(DIVIDER)
+    server.OPS = {**server.OPS, 'slow': lambda session, params: time.sleep(2) or 'done'}
+    results = []
+    with VerificationClient(server.socket_path) as slow, VerificationClient(server.socket_path) as fast:
+        thread = threading.Thread(target=lambda: results.append(slow.request('slow', str(netlist))))
+        thread.start()
+        time.sleep(0.2)
+        start = time.perf_counter()
+        assert fast.request('solve', str(netlist))['node_voltages']['2'] == pytest.approx(2.5)
+        assert time.perf_counter() - start < 1.0
+        thread.join()
+    assert results == ['done']
+
+def test_cache_is_lru_bounded(tmp_path):
+    netlist = tmp_path / 'div.net'
+    netlist.write_text(DIVIDER)
+    compiled = CircuitParser(str(netlist)).parse_compiled()
+    cache = CircuitCache(max_entries=2)
+    sessions = [CircuitSession(f'/n{k}.net', (1, k), compiled, {}) for k in range(3)]
+    cache.put(sessions[0])
+    cache.put(sessions[1])
+    assert cache.get('/n0.net', (1, 0)) is sessions[0]
+    cache.put(sessions[2])
+    assert cache.get('/n1.net', (1, 1)) is None
+    assert cache.get('/n0.net', (1, 0)) is sessions[0]
+    assert cache.get('/n0.net', (2, 0)) is None  # file changed
+    assert len(cache) == 2
+
+    small = CircuitCache(max_bytes=1)
+    small.put(sessions[0])
+    small.put(sessions[1])
+    assert len(small) == 1 and small.get('/n1.net', (1, 1)) is sessions[1]
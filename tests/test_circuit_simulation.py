@@ -0,0 +1,238 @@
+import tracemalloc
+import numpy as np
+import pytest
+from circuit_verification import circuit_simulation
+from circuit_verification.circuit_analysis import CircuitAnalysis
+from circuit_verification.circuit_parser import CircuitParser
+from circuit_verification.circuit_simulation import DCSolver, SolvedCircuit, conjugate_gradient, sweep_points
+from circuit_verification.circuit_elements import Circuit, Resistor, VoltageSource
+
+def build_mesh(rows, cols, resistance=100.0, voltage=1.0):
+    """ rows x cols resistor grid, corner driven by a source, opposite corner grounded. """
+    circuit = Circuit()
+    def node(r, c):
+        return f"n{r}_{c}"
+    for r in range(rows):
+        for c in range(cols):
+            if c + 1 < cols:
+                circuit.add_element(Resistor(f"RH{r}_{c}", node(r, c), node(r, c + 1), resistance))
+            if r + 1 < rows:
+                circuit.add_element(Resistor(f"RV{r}_{c}", node(r, c), node(r + 1, c), resistance))
+    circuit.add_element(VoltageSource("V1", node(0, 0), '0', voltage))
+    circuit.add_element(Resistor("RGND", node(rows - 1, cols - 1), '0', resistance))
+    return circuit
+
+def test_dc_solver_example():
+    circuit = CircuitParser('examples/example_circuit.net').parse()
+    node_voltages = DCSolver(circuit).run_dc_analysis()
+
+    assert node_voltages['1'] == pytest.approx(5.0)
+    assert node_voltages['2'] == pytest.approx(5.0 * 2000 / 3000)
+    assert node_voltages['0'] == 0.0
+
+@pytest.mark.parametrize("ordering", ['amd', 'colamd', 'rcm', 'natural'])
+def test_sparse_matches_dense(ordering):
+    circuit = build_mesh(6, 7)
+    dense = DCSolver(circuit, method='dense').run_dc_analysis()
+    sparse = DCSolver(circuit, method='sparse', ordering=ordering).run_dc_analysis()
+
+    assert list(sparse) == list(dense)
+    for node, voltage in dense.items():
+        assert sparse[node] == pytest.approx(voltage, abs=1e-12)
+
+def test_auto_selects_sparse_above_threshold():
+    solver = DCSolver(build_mesh(3, 3))
+    solver.SPARSE_THRESHOLD = 4
+    solver.run_dc_analysis()
+    assert solver._use_sparse()
+
+def test_sparse_singular_raises_linalg_error():
+    circuit = Circuit()
+    circuit.add_element(Resistor("R1", 'a', 'b', 100.0))
+    with pytest.raises(np.linalg.LinAlgError):
+        DCSolver(circuit, method='sparse').run_dc_analysis()
+
+def two_source_circuit(v1=5.0, v2=1.0):
+    circuit = Circuit()
+    circuit.add_element(VoltageSource("V1", 'a', '0', v1))
+    circuit.add_element(VoltageSource("V2", 'b', '0', v2))
+    circuit.add_element(Resistor("R1", 'a', 'm', 1000.0))
+    circuit.add_element(Resistor("R2", 'b', 'm', 2000.0))
+    circuit.add_element(Resistor("R3", 'm', '0', 3000.0))
+    return circuit
+
+def test_sweep_points_inclusive():
+    assert sweep_points(0.0, 1.0, 0.25).tolist() == [0.0, 0.25, 0.5, 0.75, 1.0]
+    assert sweep_points(1.0, 0.0, -0.5).tolist() == [1.0, 0.5, 0.0]
+    with pytest.raises(ValueError):
+        sweep_points(0.0, 1.0, -0.1)
+
+@pytest.mark.parametrize("method", ['dense', 'sparse'])
+def test_dc_sweep_matches_repeated_solves(method):
+    values = sweep_points(0.0, 10.0, 2.5)
+    result = DCSolver(two_source_circuit(), method=method).run_dc_sweep('V1', values)
+
+    assert result['voltages'].shape == (len(values), 3)
+    for k, value in enumerate(values):
+        expected = DCSolver(two_source_circuit(v1=value)).run_dc_analysis()
+        for j, node in enumerate(result['nodes']):
+            assert result['voltages'][k, j] == pytest.approx(expected[node], abs=1e-12)
+
+def test_nested_dc_sweep():
+    values, values2 = sweep_points(0.0, 5.0, 1.0), sweep_points(-1.0, 1.0, 1.0)
+    result = DCSolver(two_source_circuit()).run_dc_sweep('V1', values, 'V2', values2)
+
+    assert result['voltages'].shape == (3, 6, 3)
+    m = result['nodes'].index('m')
+    expected = DCSolver(two_source_circuit(v1=4.0, v2=-1.0)).run_dc_analysis()['m']
+    assert result['voltages'][0, 4, m] == pytest.approx(expected)
+
+def test_dc_sweep_rejects_non_source():
+    with pytest.raises(ValueError):
+        DCSolver(two_source_circuit()).run_dc_sweep('R1', [1.0, 2.0])
+
+def test_dc_directive_is_parsed(tmp_path):
+    path = tmp_path / 'sweep.net'
+    path.write_text("V1 1 0 DC 5\nV2 3 0 1\nR1 1 2 1k\nR2 2 3 2k\n.DC V1 0 5 1 v2 0 1 0.5\n.END\n")
+    compiled = CircuitParser(str(path)).parse_compiled()
+
+    assert compiled.dc_sweeps == [{'source': 'V1', 'start': 0.0, 'stop': 5.0, 'step': 1.0,
+                                   'source2': 'V2', 'start2': 0.0, 'stop2': 1.0, 'step2': 0.5}]
+
+def with_values(circuit, changes):
+    for element in circuit.elements:
+        if element.name in changes:
+            if isinstance(element, Resistor):
+                element.resistance = changes[element.name]
+            else:
+                element.voltage = changes[element.name]
+    return circuit
+
+@pytest.mark.parametrize("changes", [
+    {'RH1_1': 500.0},
+    {'RH1_1': 500.0, 'RV2_2': 10.0, 'RGND': 150.0},
+    {'V1': 2.5, 'RV0_0': 1e4},
+])
+def test_what_if_matches_full_solve(changes):
+    solved = SolvedCircuit(build_mesh(5, 5))
+    expected = DCSolver(with_values(build_mesh(5, 5), changes)).run_dc_analysis()
+    result = solved.what_if(changes)
+
+    assert set(result) == set(expected)
+    for node, voltage in expected.items():
+        assert result[node] == pytest.approx(voltage, abs=1e-12)
+    assert solved.node_voltages() == pytest.approx(DCSolver(build_mesh(5, 5)).run_dc_analysis())
+
+def test_what_if_node_subset():
+    solved = SolvedCircuit(build_mesh(4, 4))
+    expected = DCSolver(with_values(build_mesh(4, 4), {'RH2_1': 7.0})).run_dc_analysis()
+
+    result = solved.what_if({'RH2_1': 7.0}, nodes=['n3_3', '0'])
+    assert list(result) == ['n3_3', '0']
+    assert result['n3_3'] == pytest.approx(expected['n3_3'], abs=1e-12)
+
+def test_update_refactorizes_past_max_rank():
+    circuit = build_mesh(6, 6)
+    solved = SolvedCircuit(circuit)
+    resistors = [r.name for r in circuit.get_resistors()][:SolvedCircuit.MAX_RANK + 1]
+    changes = {name: 150.0 + k for k, name in enumerate(resistors)}
+
+    for name in resistors[:-1]:
+        solved.update({name: changes[name]})
+    assert solved.refactorizations == 1
+    result = solved.update({resistors[-1]: changes[resistors[-1]]})
+    assert solved.refactorizations == 2
+
+    expected = DCSolver(with_values(build_mesh(6, 6), changes)).run_dc_analysis()
+    for node, voltage in expected.items():
+        assert result[node] == pytest.approx(voltage, abs=1e-12)
+
+def test_what_if_rejects_unknown_and_floating_sources():
+    circuit = two_source_circuit()
+    circuit.add_element(VoltageSource("VF", 'a', 'b', 1.0))
+    solved = SolvedCircuit(circuit)
+    with pytest.raises(KeyError):
+        solved.what_if({'RX': 1.0})
+    with pytest.raises(ValueError):
+        solved.what_if({'VF': 2.0})
+
+@pytest.mark.parametrize("preconditioner", ['jacobi', 'sgs', None])
+def test_cg_matches_direct_solve(preconditioner):
+    circuit = build_mesh(12, 9)
+    circuit.add_element(VoltageSource("V2", 'n6_4', '0', 0.25))
+    direct = DCSolver(circuit, method='dense').run_dc_analysis()
+    solver = DCSolver(circuit, method='cg', preconditioner=preconditioner, tol=1e-12)
+    iterative = solver.run_dc_analysis()
+
+    for node, voltage in direct.items():
+        assert iterative[node] == pytest.approx(voltage, abs=1e-9)
+    info = solver.last_solve_info
+    assert info['converged']
+    assert info['iterations'] == len(info['residuals']) - 1
+    assert info['residual'] <= 1e-12
+    assert info['unknowns'] == len(solver.node_list) - 2
+
+def test_cg_warm_start_and_iteration_limit(capsys):
+    circuit = build_mesh(10, 10)
+    solver = DCSolver(circuit, method='cg', tol=1e-10)
+    cold = solver.run_dc_analysis()
+    cold_iterations = solver.last_solve_info['iterations']
+
+    nearby = {node: voltage * 1.001 for node, voltage in cold.items()}
+    solver.run_dc_analysis(x0=nearby)
+    assert 0 < solver.last_solve_info['iterations'] < cold_iterations
+
+    DCSolver(circuit, method='cg', maxiter=3).run_dc_analysis()
+    assert "CG stopped after 3 iterations" in capsys.readouterr().out
+
+def test_solve_batch_chunks_count_the_resistor_dimension(monkeypatch):
+    # Two nodes, thousands of parallel resistors: A^T diag(g) dwarfs G
+    circuit = Circuit()
+    circuit.add_element(VoltageSource("V1", 'in', '0', 1.0))
+    for k in range(2000):
+        circuit.add_element(Resistor(f"R{k}", 'in', 'out', 1e3))
+        circuit.add_element(Resistor(f"S{k}", 'out', '0', 1e3))
+    solver = DCSolver(circuit)
+    A = solver.incidence_matrix()
+    conductances = np.full((64, A.shape[0]), 1e-3)
+    monkeypatch.setattr(circuit_simulation, 'BATCH_BYTES', 4 * 8 * A.shape[1] * (A.shape[1] + A.shape[0]))
+
+    tracemalloc.start()
+    try:
+        V = solver.solve_batch(A, conductances)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert V[:, solver.node_list.index('out')] == pytest.approx(0.5)
+    # One chunk of 4 runs is 256 kB; all 64 at once would be 4 MB
+    assert peak < 1e6 + A.nbytes
+
+@pytest.mark.parametrize("preconditioner", ['jacobi', 'sgs'])
+def test_cg_sweeps_and_sensitivities_never_factorize(preconditioner):
+    circuit = build_mesh(8, 7)
+    circuit.add_element(VoltageSource("V2", 'n5_3', '0', 0.25))
+    solver = DCSolver(circuit, method='cg', preconditioner=preconditioner, tol=1e-13)
+    values, values2 = sweep_points(0.0, 2.0, 0.5), sweep_points(-0.5, 0.5, 0.5)
+    sweep = solver.run_dc_sweep('V1', values, 'V2', values2)
+    expected = DCSolver(circuit, method='dense').run_dc_sweep('V1', values, 'V2', values2)
+    assert sweep['voltages'] == pytest.approx(expected['voltages'], abs=1e-9)
+    assert solver.last_solve_info['converged']
+
+    nodes = ['n3_3', 'n7_6']
+    sensitivity = CircuitAnalysis(circuit).run_sensitivity(nodes=nodes, solver=solver)
+    reference = CircuitAnalysis(circuit).run_sensitivity(nodes=nodes)
+    assert sensitivity['dV_dR'] == pytest.approx(reference['dV_dR'], abs=1e-12)
+    assert solver.factorization is None
+
+def test_conjugate_gradient_on_spd_matrix():
+    rng = np.random.default_rng(0)
+    M = rng.normal(size=(20, 20))
+    A = M @ M.T + 20 * np.eye(20)
+    b = rng.normal(size=20)
+    x, info = conjugate_gradient(lambda v: A @ v, b, tol=1e-12)
+    assert info['converged']
+    assert x == pytest.approx(np.linalg.solve(A, b))
+
+def test_cg_rejects_unknown_preconditioner():
+    with pytest.raises(ValueError):
+        DCSolver(build_mesh(2, 2), method='cg', preconditioner='ilu')
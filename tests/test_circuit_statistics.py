@@ -0,0 +1,64 @@
+import json
+import numpy as np
+import pytest
+from circuit_verification.circuit_statistics import RunningStats, StreamingHistogram
+from circuit_verification.circuit_parallel import ParallelMonteCarlo
+from circuit_verification.circuit_analysis import CircuitAnalysis
+from circuit_verification.circuit_parser import CircuitParser
+
+def test_running_stats_match_numpy_over_batches():
+    rng = np.random.default_rng(0)
+    batches = [np.column_stack([rng.normal(3.0 + 0.1 * k, 0.5, size), rng.exponential(1.0, size),
+                                np.full(size, 5.0)])
+               for k, size in enumerate([1, 7, 500, 2000, 33])]
+    data = np.vstack(batches)
+    stats = RunningStats(['a', 'b', 'c'])
+    for batch in batches:
+        stats.update(batch)
+
+    assert stats.count == len(data)
+    assert np.allclose(stats.mean, data.mean(axis=0))
+    assert np.allclose(stats.std, data.std(axis=0, ddof=1))
+    assert np.array_equal(stats.min, data.min(axis=0)) and np.array_equal(stats.max, data.max(axis=0))
+    q = (0.01, 0.25, 0.5, 0.75, 0.99)
+    span = data.max(axis=0) - data.min(axis=0)
+    error = np.abs(stats.quantiles(q) - np.quantile(data, q, axis=0))
+    assert (error[:, :2] <= 4 * span[:2] / 256).all()
+    assert np.allclose(stats.quantiles(q)[:, 2], 5.0)
+
+def test_histogram_grows_in_both_directions():
+    hist = StreamingHistogram(1, bins=8)
+    hist.update(np.array([[0.0], [1.0]]))
+    hist.update(np.array([[-10.0], [25.0]]))
+    assert hist.counts.sum() == 4
+    assert hist.lo[0] <= -10.0 and hist.lo[0] + hist.width[0] * 8 > 25.0
+    assert hist.quantiles([0.0])[0, 0] == pytest.approx(hist.lo[0])
+
+def test_spec_limit_failures_and_yield():
+    stats = RunningStats(['out', 'ref'], limits={'out': (1.0, 2.0), 'ref': (None, 0.5)})
+    stats.update(np.array([[1.5, 0.0], [0.5, 0.0], [2.5, 1.0], [1.2, 0.7]]))
+    summary = stats.summary()
+    assert summary['nodes']['out']['failures'] == 2
+    assert summary['nodes']['ref']['failures'] == 2
+    assert summary['failed_runs'] == 3 and summary['yield'] == pytest.approx(0.25)
+    with pytest.raises(ValueError, match='unknown node'):
+        RunningStats(['out'], limits={'missing': (0, 1)})
+
+def test_streaming_monte_carlo_matches_materialized_runs(tmp_path):
+    netlist = tmp_path / 'div.net'
+    netlist.write_text("V1 1 0 5\nR1 1 2 1k\nR2 2 3 1k\nR3 3 0 2k\n.END\n")
+    analysis = CircuitAnalysis(CircuitParser(str(netlist)).parse_compiled())
+    samples = tmp_path / 'samples'
+    stats = analysis.run_monte_carlo_stats(runs=2500, seed=4, chunk_size=1000, limits={'2': (None, 3.2)},
+                                           samples_dir=str(samples))
+    batch = ParallelMonteCarlo(analysis, workers=0, chunk_size=1000).run(2500, seed=4)
+
+    assert stats.names == batch['nodes']
+    assert np.allclose(stats.mean, batch['voltages'].mean(axis=0))
+    assert np.allclose(stats.std, batch['voltages'].std(axis=0, ddof=1))
+    column = batch['nodes'].index('2')
+    assert stats.failures[column] == (batch['voltages'][:, column] > 3.2).sum()
+
+    assert np.array_equal(np.load(samples / 'voltages.npy'), batch['voltages'])
+    assert np.array_equal(np.load(samples / 'resistances.npy'), batch['resistances'])
+    assert json.loads((samples / 'names.json').read_text())['nodes'] == batch['nodes']